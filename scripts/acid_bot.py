@@ -1,34 +1,32 @@
-from utils import _set_paths, load_yaml, setup_config, download_ta_lib
-
-download_ta_lib()
-
-from gmx_python_sdk.scripts.v2.gmx_utils import ConfigManager, create_connection, convert_to_checksum_address
-from gmx_python_sdk.scripts.v2.order.create_increase_order import IncreaseOrder
-from gmx_python_sdk.scripts.v2.order.create_decrease_order import DecreaseOrder
-from gmx_python_sdk.scripts.v2.order.create_decrease_order import Order
-from get_gmx_stats import GetGMXv2Stats
-from gmx_python_sdk.scripts.v2.order.order_argument_parser import OrderArgumentParser
-from utils import _set_paths, load_yaml, setup_config, download_ta_lib
-import pandas as pd
-import numpy as np
-import talib as ta
-import requests
 import time
-from datetime import datetime
-import yfinance as yf
-from web3 import Web3
-from hexbytes import HexBytes
-from web3.exceptions import ValidationError
-import json
-import os
-import yaml
-import sys
-import subprocess
+
+_import_started = time.perf_counter()
+
 import argparse
+import asyncio
+import os
+import threading
+
+from utils import _set_paths, load_yaml, setup_config
+from logger import get_logger, setup_logging
+from market_cache import MarketCache
+from metrics import metrics
+from preflight import OrderPreflight
+
+# pandas, the indicator backend, yfinance, web3 and the GMX SDK are imported inside the
+# functions that use them, so importing this module is fast, downloads
+# nothing and does not parse any configuration.
 
 # Set paths for relative imports
 _set_paths()
 
+log = get_logger("acid_bot")
+
+import_time = time.perf_counter() - _import_started
+import_time_budget = 0.25  # Seconds the module import may take before startup warns
+
+strategy = None
+config = None
 rpc_url = None
 w3 = None
 stats = None
@@ -39,6 +37,24 @@ rsi_overbought = None
 rsi_oversold = None
 stats = None
 market = None
+price_service = None
+market_cache = None
+order_preflight = None
+tx_pipeline = None
+last_signal_time = None  # perf_counter() when the latest signal was computed
+candle_store_dir = os.path.join("data", "candles")
+yahoo_history_days = {"1m": 30, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "90m": 60, "60m": 730, "1h": 730}  # Days of intraday bars Yahoo Finance serves
+yahoo_request_days = {"1m": 7}  # Days per download where Yahoo Finance caps a single request
+metrics_dir = os.path.join("data", "metrics")  # acid.prom (Prometheus text) and acid.jsonl snapshots; None disables export
+use_async = False
+position_locks = {}  # Market symbol -> lock serializing position changes between the trading loop and the risk monitor
+multi_market = False
+trade_markets = None  # Market symbols for the multi-market runner, None for every market
+io_timeout = 30  # Seconds before a network call in the async loop is abandoned
+sleep = time.sleep  # Waits between iterations; replay mode swaps in a virtual clock
+journal_path = os.path.join("data", "journal", "positions.jsonl")  # Position journal for warm restarts; None disables it
+journal = None
+dry_run = False  # Build and log orders without sending them
 
 def get_config():
     """
@@ -64,8 +80,35 @@ def get_config():
         help="Path to the strategy YAML file.",
         default=os.path.join("utils", "strategy.yaml"),
     )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Run the bot on an asyncio event loop with concurrent I/O.",
+    )
+    parser.add_argument(
+        "--log-level",
+        help="Minimum log level: DEBUG, INFO, WARNING or ERROR (default: ACID_LOG_LEVEL or INFO).",
+        default=None,
+    )
+    parser.add_argument(
+        "--log-file",
+        help="Also append JSON log lines to this file.",
+        default=None,
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Build every order transaction but do not send it.",
+    )
+    parser.add_argument(
+        "--markets",
+        help="Comma-separated market symbols to trade in one process (e.g. ETH,BTC,SOL), or 'all'.",
+        default=None,
+    )
 
     args = parser.parse_args()
+    setup_logging(args.log_level, args.log_file)
 
     # Load configurations
     print("[DEBUG] Loading configuration files...")
@@ -74,16 +117,26 @@ def get_config():
 
     strategy = load_yaml(strategy_path)
     config = setup_config(config_path)
+
+    global use_async, multi_market, trade_markets, dry_run
+    use_async = args.use_async
+    dry_run = args.dry_run
+    if args.markets is not None:
+        trade_markets = None if args.markets == "all" else [symbol.strip() for symbol in args.markets.split(",")]
+        multi_market = True
     
     return strategy, config
-    
-strategy, config = get_config()
 
 def setup(config, strategy):
-   """
+    """
     Set up the bot environment, including the RPC connection and strategy trading parameters.
-   """
-    global rpc_url, w3, stats
+    """
+    from web3 import Web3
+    from get_gmx_stats import GetGMXv2Stats
+    from price_service import build_price_service
+    from tx_pipeline import TransactionPipeline
+
+    global rpc_url, w3, stats, price_service, market_cache, order_preflight, tx_pipeline
     
     print("[DEBUG] Setting up configuration...")
     rpc_url = config.rpc
@@ -101,6 +154,27 @@ def setup(config, strategy):
     # Modify the instantiation of GetGMXv2Stats with additional arguments
     stats = GetGMXv2Stats(config, to_json=True, to_csv=False)  # Adjust these flags as needed
     print("[DEBUG] GMX Stats initialized.")
+
+    # Shared, cached price feed so every consumer in an iteration sees the same price
+    price_service = build_price_service(strategy.get("price_feed"), chain=config.chain)
+    print("[DEBUG] Price service initialized.")
+
+    # Market and token addresses from disk, refreshed in the background
+    market_cache = MarketCache(config)
+    market_cache.start_background_refresh()
+    print("[DEBUG] Market metadata cache initialized.")
+
+    # Warm gas estimates, allowances and order templates for fast submission
+    order_preflight = OrderPreflight(config, w3, market_cache)
+    order_preflight.build_templates()
+    order_preflight.refresh()
+    order_preflight.start_background_refresh()
+    print("[DEBUG] Order preflight initialized.")
+
+    # Local nonces and background receipt tracking for back-to-back orders
+    tx_pipeline = TransactionPipeline(w3, config.user_wallet_address, config.private_key, config.chain_id, stuck_after=60)
+    tx_pipeline.start()
+    print("[DEBUG] Transaction pipeline initialized.")
     
 def get_market_data():
     """
@@ -112,10 +186,9 @@ def get_market_data():
         ETH market data, including token addresses and collateral details.
     """
     print("[DEBUG] Fetching available markets...")
-    # Assuming markets is a dictionary where keys are addresses and values contain market details
+    # Markets come from the persistent metadata cache instead of a fresh on-chain scan
     try:
-        markets = stats.get_available_markets()
-        eth_market = next((details for address, details in markets.items() if details.get("market_symbol") == "ETH"), None)
+        eth_market = market_cache.find_market("ETH")
     except AttributeError as e:
         print(f"[ERROR] Error accessing market details: {e}")
         return None
@@ -132,124 +205,262 @@ def get_market_data():
         print(f"Long Token Address: {LONG_TOKEN_ADDRESS}")
         print(f"Short Token Address: {SHORT_TOKEN_ADDRESS}")
         print(f"Collateral Address: {COLLATERAL_ADDRESS}")
+        return eth_market
     else:
         print("[ERROR] ETH market not found in GMX markets.")
         exit()
 
-# Function to get the ETH to USD conversion rate using CoinGecko's API
+# Function to get the ETH to USD conversion rate from the shared price service
 def get_eth_to_usd_price():
     """
-    Fetch the current price of ETH in USD from the CoinGecko API.
+    Fetch the current price of ETH in USD.
+
+    Prices come from the shared price service (CoinGecko with GMX oracle
+    failover by default) and are cached for its TTL, so repeated calls in
+    one iteration return the same price without another request.
 
     Returns
     -------
     float
         The current ETH price in USD.
     """
-    print("[DEBUG] Fetching ETH price from CoinGecko...")
-    url = 'https://api.coingecko.com/api/v3/simple/price'
-    params = {
-        'ids': 'ethereum',
-        'vs_currencies': 'usd'
-    }
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()  # Check for HTTP errors
-        data = response.json()
-        eth_price_usd = data['ethereum']['usd']
-        print(f"[DEBUG] ETH price: ${eth_price_usd}")
-        return eth_price_usd
-    except requests.exceptions.HTTPError as http_err:
-        print(f"[ERROR] HTTP error: {http_err}")
-    except Exception as err:
-        print(f"[ERROR] General error: {err}")
-    return None
+    global price_service
+    log.debug("Fetching ETH price")
+    if price_service is None:
+        from price_service import build_price_service
+        price_service = build_price_service()
+    eth_price_usd = price_service.get_price("ETH")
+    if eth_price_usd is not None:
+        log.debug("ETH price", extra={"fields": {"price_usd": eth_price_usd}})
+    return eth_price_usd
 
 # Function to fetch wallet balance in USD
-def get_wallet_balance():
+def get_wallet_balance(eth_price_usd=None):
     """
     Fetch the user's wallet balance in ETH and its USD equivalent.
 
+    Parameters
+    ----------
+    eth_price_usd : float, optional
+        ETH price to convert with. Read from the price service if None.
+
     Returns
     -------
     tuple
         A tuple containing the wallet balance in ETH and USD.
     """
-    print("[DEBUG] Fetching wallet balance...")
-    print("Connecting to RPC URL:", config.rpc)
+    log.debug("Fetching wallet balance")
     try:
         wallet_address = config.user_wallet_address
-        print("Fetching balance for wallet address")
 
         # Step 1: Get balance in native token (ETH)
         native_balance_wei = w3.eth.get_balance(wallet_address)
-        print("Native balance (in Wei):", native_balance_wei)
 
         # Step 2: Convert Wei to ETH manually
         native_balance_eth = native_balance_wei / 1e18
-        print("Native balance (in ETH):", native_balance_eth)
 
         # Ensure balance is in a compatible format
         native_balance_eth = float(native_balance_eth)
-        print("Native balance (converted to float):", native_balance_eth, "ETH")
 
-        # Step 3: Fetch ETH to USD conversion rate from CoinGecko
-        max_price_in_usd = get_eth_to_usd_price()  # Fetch ETH price in USD equivalent
+        # Step 3: Fetch ETH to USD conversion rate from the price service
+        max_price_in_usd = eth_price_usd if eth_price_usd is not None else get_eth_to_usd_price()
         if max_price_in_usd is None:
-            print("Error: Unable to fetch ETH price for USD conversion.")
+            log.error("Unable to fetch ETH price for USD conversion")
             return None
 
         # Step 4: Calculate wallet balance in USD
         wallet_balance = native_balance_eth * max_price_in_usd
-        print(f"Wallet balance in USD: ${wallet_balance:.2f}")
+        log.debug("Wallet balance", extra={"fields": {"balance_wei": native_balance_wei, "balance_eth": native_balance_eth, "balance_usd": wallet_balance}})
         return native_balance_eth, wallet_balance
 
     except AttributeError as e:
-        print("[ERROR] fetching balance or price from oracle:", e)
+        log.error("Fetching balance or price from oracle failed: %s", e)
         return None
     except Exception as e:
-        print(f"[ERROR] fetching wallet balance: {e}")
+        log.error("Fetching wallet balance failed: %s", e)
         return None
 
 
 # Helper function to calculate size_delta_usd for opening position
 def calculate_open_position_amount(wallet_balance, open_percentage):
     if wallet_balance is None:
-        print("[ERROR]: Wallet balance is None. Skipping position calculation.")
+        log.error("Wallet balance is None. Skipping position calculation.")
         return None
     return wallet_balance * open_percentage
 
 # Helper function to calculate size_delta_usd for closing position
 def calculate_close_position_amount(current_position_value, close_percentage):
     if current_position_value is None:
-        print("[ERROR]: Current position value is None. Skipping position calculation.")
+        log.error("Current position value is None. Skipping position calculation.")
         return None
     return current_position_value * (1 - close_percentage)
 
-# Initialize historical data
-def initialize_historical_data():
+# Fetch candles from Yahoo Finance in a flat Timestamp/OHLCV layout
+def fetch_candles(symbol, interval, start=None):
     """
-    Fetch historical ETH price data and calculate moving averages.
+    Download OHLCV candles from Yahoo Finance.
+
+    Intraday bars are only served for the last `yahoo_history_days` and
+    1m bars for a week per request, so the range is downloaded in requests
+    that fit, and a start further back is moved up to the oldest bar
+    served with a warning.
+
+    Parameters
+    ----------
+    symbol : str
+        Ticker, e.g. "ETH-USD".
+    interval : str
+        Bar interval, e.g. "15m".
+    start : datetime-like, optional
+        Only fetch bars from this time on. Fetches the last month, or as
+        much of it as is served, if None.
 
     Returns
     -------
     pandas.DataFrame
-        A DataFrame containing historical data with Bollinger Band indicators.
+        Candles with 'Timestamp', 'Open', 'High', 'Low', 'Close' and 'Volume' columns.
+    """
+    import pandas as pd
+    import yfinance as yf
+
+    now = pd.Timestamp.now(tz="UTC")
+    history_days = yahoo_history_days.get(interval)
+    # An hour inside the limit, which Yahoo Finance measures from the time of the request
+    earliest = None if history_days is None else now - pd.Timedelta(days=history_days) + pd.Timedelta(hours=1)
+    if start is None:
+        start = now - pd.DateOffset(months=1)
+        if earliest is not None:
+            start = max(start, earliest)
+    else:
+        start = pd.Timestamp(start)
+        if start.tzinfo is None:
+            start = start.tz_localize("UTC")
+        if earliest is not None and start < earliest:
+            log.warning("Yahoo Finance only serves %s bars for the last %d days, %s bars from %s to %s are missing",
+                        interval, history_days, symbol, start, earliest)
+            start = earliest
+
+    request_days = yahoo_request_days.get(interval)
+    frames = []
+    while True:
+        # The last request runs open-ended so it includes the still-forming candle
+        end = None
+        if request_days is not None and start + pd.Timedelta(days=request_days) < now:
+            end = start + pd.Timedelta(days=request_days)
+        candles = yf.download(symbol, start=start, end=end, interval=interval)
+        if len(candles):
+            if isinstance(candles.columns, pd.MultiIndex):
+                candles.columns = candles.columns.get_level_values(0)
+            candles = candles.reset_index()
+            candles = candles.rename(columns={candles.columns[0]: 'Timestamp'})
+            frames.append(candles[['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume']])
+        if end is None:
+            break
+        start = end
+    if not frames:
+        return pd.DataFrame(columns=['Timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
+    candles = pd.concat(frames, ignore_index=True)
+    return candles.drop_duplicates('Timestamp', keep='last').reset_index(drop=True)
+
+# Initialize historical data
+def initialize_historical_data(candle_store=None, window=200, resampler=None):
     """
-    print("[DEBUG] Fetching historical price data for ETH...")
-    eth_data = yf.download("ETH-USD", period="1mo", interval="15m").tail(200)
-    eth_data = eth_data.reset_index()[['Datetime', 'Close', 'Volume']]
-    eth_data.columns = ['Timestamp', 'Close', 'Volume']
+    Fetch historical ETH price data.
 
-    # Calculate the moving average explicitly using .loc
-    eth_data.loc[:, 'Volume_MA'] = ta.SMA(eth_data['Volume'], timeperiod=200)
+    Indicators are left to `generate_signals` and the incremental
+    indicator engine, which compute the volume MA with the strategy's length.
+
+    With a candle store, only bars newer than the last stored one are
+    downloaded and the window is read back from the memory-mapped store.
+    With a resampler as well, only its base interval is downloaded and the
+    strategy's signal timeframe is resampled from it.
+
+    Parameters
+    ----------
+    candle_store : CandleStore, optional
+        Local OHLCV store to sync. Downloads a full month if None.
+    window : int
+        Number of most recent bars to return.
+    resampler : Resampler, optional
+        Multi-timeframe resampler from `build_resampler`; needs a candle store.
 
-    print("Historical data initialized.")
+    Returns
+    -------
+    pandas.DataFrame
+        Timestamp, Close and Volume of the most recent bars.
+    """
+    import pandas as pd
+
+    log.debug("Fetching historical price data for ETH")
+    if candle_store is None:
+        import yfinance as yf
+
+        eth_data = yf.download("ETH-USD", period="1mo", interval="15m").tail(window)
+        eth_data = eth_data.reset_index()[['Datetime', 'Close', 'Volume']]
+        eth_data.columns = ['Timestamp', 'Close', 'Volume']
+    elif resampler is not None:
+        # One base series is downloaded and stored; every timeframe is built from it
+        base_interval = resampler.base_interval
+        last_timestamp = candle_store.last_timestamp("ETH-USD", base_interval)
+        new_candles = fetch_candles("ETH-USD", base_interval, start=last_timestamp)
+        written = candle_store.append("ETH-USD", base_interval, new_candles)
+        log.debug("Stored %d new or revised %s candles", written, base_interval)
+
+        if resampler.last_timestamp is None:
+            # First iteration: seed every timeframe from the stored history
+            history_bars = resampler.history_bars()
+            columns = candle_store.window("ETH-USD", base_interval, history_bars)
+            if len(columns['timestamp']) < history_bars:
+                log.warning("Only %d of the %d %s bars the longest timeframe needs are stored, it fills up as the bot runs",
+                            len(columns['timestamp']), history_bars, base_interval)
+            resampler.update(columns['timestamp'], columns['open'], columns['high'], columns['low'], columns['close'], columns['volume'])
+        else:
+            resampler.update_frame(new_candles)
+
+        columns = resampler.window_arrays(strategy["timeframes"]["signal_interval"], window)
+        eth_data = pd.DataFrame({
+            'Timestamp': pd.to_datetime(columns['timestamp'], utc=True),
+            'Close': columns['close'],
+            'Volume': columns['volume'],
+        })
+    else:
+        # Refetch from the last stored bar so the still-forming candle gets revised
+        last_timestamp = candle_store.last_timestamp("ETH-USD", "15m")
+        new_candles = fetch_candles("ETH-USD", "15m", start=last_timestamp)
+        written = candle_store.append("ETH-USD", "15m", new_candles)
+        log.debug("Stored %d new or revised candles", written)
+
+        columns = candle_store.window("ETH-USD", "15m", window)
+        eth_data = pd.DataFrame({
+            'Timestamp': pd.to_datetime(columns['timestamp'], utc=True),
+            'Close': columns['close'],
+            'Volume': columns['volume'],
+        })
+
+    log.debug("Historical data initialized")
     return eth_data
 
 
+def build_resampler(window=200):
+    """
+    Resampler for the strategy's optional `timeframes` section.
+
+    Returns
+    -------
+    Resampler or None
+        Keeps `intervals` and `signal_interval` built from `base_interval`
+        bars, or None when the strategy downloads 15m candles directly.
+    """
+    from resampler import Resampler
+
+    settings = strategy.get("timeframes")
+    if not settings:
+        return None
+    intervals = list(dict.fromkeys(list(settings.get("intervals", [])) + [settings["signal_interval"]]))
+    return Resampler(intervals, settings["base_interval"], window)
+
 # Generate trading signals based on Bollinger Bands, RSI, and Volume
-def generate_signals(data, strategy):
+def generate_signals(data, strategy, rules=None):
     """
     Generate trading signals based on technical indicators: Bollinger Bands, RSI, and Volume.
 
@@ -259,53 +470,51 @@ def generate_signals(data, strategy):
         Historical data containing at least 'Close' and 'Volume' columns.
     strategy : dict
         Strategy configuration dictionary containing parameters for Bollinger Bands, RSI, and Volume.
+    rules : CompiledRules, optional
+        Long and short rules compiled from `strategy`. Compiled on every
+        call if None, so callers that run repeatedly compile them once and
+        pass them in.
 
     Returns
     -------
     pandas.Series
         A row of the DataFrame with the latest generated signal and indicator values.
     """
-    print("[DEBUG] Generating trading signals...")
+    from indicators import get_ta
+    from rules import INDICATORS, compile_rules
+
+    ta = get_ta()
+    rules = rules or compile_rules(strategy)
+    log.debug("Generating trading signals")
 
     # Bollinger Bands setup
     bb_length = strategy["bollinger_bands"]["length"]
     bb_multiplier = strategy["bollinger_bands"]["multiplier"]
-    print(f"[DEBUG] Bollinger Bands parameters: Length={bb_length}, Multiplier={bb_multiplier}")
     data['BB_MA'] = ta.SMA(data['Close'], timeperiod=bb_length)
     data['BB_Upper'] = data['BB_MA'] + bb_multiplier * ta.STDDEV(data['Close'], timeperiod=bb_length, nbdev=1)
     data['BB_Lower'] = data['BB_MA'] - bb_multiplier * ta.STDDEV(data['Close'], timeperiod=bb_length, nbdev=1)
 
     # RSI setup
     rsi_length = strategy["rsi"]["length"]
-    rsi_overbought = strategy["rsi"]["overbought"]
-    rsi_oversold = strategy["rsi"]["oversold"]
-    print(f"[DEBUG] RSI parameters: Length={rsi_length}, Overbought={rsi_overbought}, Oversold={rsi_oversold}")
     data['RSI'] = ta.RSI(data['Close'], timeperiod=rsi_length)
 
     # Volume setup
     vol_ma_length = strategy["volume"]["moving_avg_length"]
-    print(f"[DEBUG] Volume moving average length: {vol_ma_length}")
     data['Volume_MA'] = ta.SMA(data['Volume'], timeperiod=vol_ma_length)
     data['High_Volume'] = data['Volume'] > data['Volume_MA']
 
-    # Long condition: Price touches lower Bollinger Band, RSI < Oversold, Volume > MA
-    data['Long_Signal'] = (data['Close'] <= data['BB_Lower']) & (data['RSI'] < rsi_oversold) & (data['High_Volume'])
-
-    # Short condition: Price touches upper Bollinger Band, RSI > Overbought, Volume > MA
-    data['Short_Signal'] = (data['Close'] >= data['BB_Upper']) & (data['RSI'] > rsi_overbought) & (data['High_Volume'])
-
-    # Generate signals
-    data['Position'] = 0
-    data.loc[data['Long_Signal'], 'Position'] = 1
-    data.loc[data['Short_Signal'], 'Position'] = -1
+    # Long and short conditions from the strategy's rules (by default: price beyond
+    # the Bollinger Band, RSI past its oversold/overbought level, Volume > MA)
+    columns = {name: data[name].to_numpy(dtype=float) for name in INDICATORS}
+    data['Long_Signal'], data['Short_Signal'], data['Position'] = rules.signals(columns)
 
     # Extract the latest signal
     latest_signal = data.iloc[-1]
-    print(f"[DEBUG] Latest Signal: RSI={latest_signal['RSI']}, Position={latest_signal['Position']}")
+    log.info("Latest signal", extra={"fields": {"rsi": latest_signal["RSI"], "position": int(latest_signal["Position"])}})
     return latest_signal
 
 #Function to build order parser
-def build_order(leverage, is_long, size_delta, percentage, increase):
+def build_order(leverage, is_long, size_delta, percentage, increase, index_token_symbol="ETH"):
     """
     Build order parameters for submitting a trade order.
 
@@ -321,6 +530,8 @@ def build_order(leverage, is_long, size_delta, percentage, increase):
         Slippage percentage as a decimal (e.g., 0.003 for 0.3%).
     increase : bool
         True if this is an increase order, False for a decrease order.
+    index_token_symbol : str
+        Market to trade, e.g. "ETH".
 
     Returns
     -------
@@ -328,45 +539,54 @@ def build_order(leverage, is_long, size_delta, percentage, increase):
         Order parameters dictionary ready for submission.
     """
     size_delta_usd = size_delta * leverage
-    # Initialize and submit the IncreaseOrder
-    parameters = {
-        "chain": 'arbitrum',
-        # the market you want to trade on
-        "index_token_symbol": "ETH",
-        # token to use as collateral. Start token swaps into collateral token
-        # if different
-        "collateral_token_symbol": "ETH",
-
-        # the token to start with - WETH not supported yet
-        "start_token_symbol": "USDC",
-
-        # True for long, False for short
-        "is_long": is_long,
-
-        # Position size in in USD
-        "size_delta_usd": size_delta_usd,
-
-        # if leverage is passed, will calculate number of tokens in
-        # start_token_symbol amount
-        "leverage": leverage,
-
-        # as a decimal ie 0.003 == 0.3%
-        "slippage_percent": percentage
-    }
-    print(f"The parameters for this order is the following: {parameters}")
-
-    order_parameters = OrderArgumentParser(
-    config,
-    is_increase=True
-    ).process_parameters_dictionary(
-    parameters
+    # Prebuilt template for this side with addresses already resolved; only the size changes per order
+    parameters = order_preflight.order_parameters(
+        is_long=is_long,
+        is_increase=increase,
+        size_delta_usd=size_delta_usd,
+        leverage=leverage,
+        slippage_percent=percentage,
+        index_token_symbol=index_token_symbol,
     )
-    print(f"Order Parser: {order_parameters}")
+    log.debug("Order parameters", extra={"fields": {"parameters": dict(parameters)}})
+
+    # Sizes from the cached start token price instead of the parser's chain and oracle reads
+    order_parameters = order_preflight.order_arguments(parameters)
+    if order_parameters is None:
+        # No cached swap route or start token price; the SDK parser resolves them
+        order_parameters = order_preflight.parse_order_arguments(parameters)
+    log.debug("Parsed order parameters", extra={"fields": {"order_parameters": dict(order_parameters)}})
 
     return order_parameters
 
+def submit_order(transaction, label):
+    """
+    Send an order transaction through the transaction pipeline.
+
+    Parameters
+    ----------
+    transaction : dict
+        Unsigned order transaction from `OrderPreflight.order_transaction`.
+    label : str
+        Name used in log lines.
+
+    Returns
+    -------
+    concurrent.futures.Future or None
+        Resolves to the receipt, or None in dry-run mode, where nothing is sent.
+    """
+    if dry_run:
+        log.info("Dry run, order not sent", extra={"fields": {"order": label, "value": transaction["value"], "gas": transaction["gas"]}})
+        return None
+    future = tx_pipeline.submit(transaction, label=label)
+    if future.done() and future.exception() is not None:
+        # Signing or sending failed and the pipeline already logged it; the position did not change
+        raise future.exception()
+    order_preflight.record_latency(label, last_signal_time)
+    return future
+
 # Function to open position based on a percentage of wallet balance in USD
-def open_position(is_long, eth_price, leverage, size_delta_usd, percentage):
+def open_position(is_long, eth_price, leverage, size_delta_usd, percentage, index_token_symbol="ETH"):
     """
     Open a trading position (long or short) based on the given parameters.
 
@@ -382,48 +602,30 @@ def open_position(is_long, eth_price, leverage, size_delta_usd, percentage):
         Position size in USD.
     percentage : float
         Slippage percentage as a decimal (e.g., 0.003 for 0.3%).
+    index_token_symbol : str
+        Market to trade, e.g. "ETH".
     """
-    print(f"[DEBUG] Initiating open_position: Is_Long={is_long}, ETH_Price={eth_price}, Leverage={leverage}, Size_Delta_USD={size_delta_usd}")
-
-    order_parameters = build_order(leverage, is_long, size_delta_usd, percentage, True)
-
-    order = IncreaseOrder(
-        config=config,
-        market_key=order_parameters['market_key'],
-        collateral_address=order_parameters['start_token_address'],
-        index_token_address=order_parameters['index_token_address'],
-        is_long=order_parameters['is_long'],
-        size_delta=order_parameters['size_delta'],
-        initial_collateral_delta_amount=(
-            order_parameters['initial_collateral_delta']
-        ),
-        slippage_percent=order_parameters['slippage_percent'],
-        swap_path=order_parameters['swap_path'],
-        debug_mode=True,
-        execution_buffer=1.5
-    )
+    log.debug("Opening position", extra={"fields": {"market": index_token_symbol, "is_long": is_long, "price": eth_price, "leverage": leverage, "size_delta_usd": size_delta_usd}})
 
-    # Calculate gas limits and submit the transaction
-    print("[DEBUG] Calculating gas limits for transaction...")
-    order.determine_gas_limits()
-    print(f"[DEBUG] Gas limits determined: {order._gas_limits}")
-
-    print("[DEBUG] Checking token approval...")
-    order.check_for_approval()
-
-    print("[DEBUG] Submitting transaction to open position...")
-    order._submit_transaction(
-        user_wallet_address=config.user_wallet_address,
-        value_amount=order_parameters["initial_collateral_delta"],  # Collateral amount in Wei
-        multicall_args=[
-          #HexBytes(order._send_wnt(order_parameters['initial_collateral_delta'])),  # Ensure this matches value_amount
-          #HexBytes(order._create_order((config.user_wallet_address,)))
-        ],
-        gas_limits=order._gas_limits,
-    )
-    print(f"[DEBUG] Position opened with ETH amount: {eth_amount_to_use:.6f} ETH")
+    with metrics.timer("order_build"):
+        order_parameters = build_order(leverage, is_long, size_delta_usd, percentage, True, index_token_symbol)
+
+    # Cached allowance; the SDK approval check only runs when it does not cover the collateral
+    with metrics.timer("approval"):
+        order_preflight.ensure_approval(order_parameters['start_token_address'], order_parameters['initial_collateral_delta'])
 
-def close_position(is_long, eth_price, leverage, size_delta_usd, percentage):
+    # Encoded from the warm gas, fee and price cache; the node's gas estimate is the only RPC
+    with metrics.timer("gas_estimation"):
+        transaction = order_preflight.order_transaction(order_parameters, is_increase=True)
+
+    log.debug("Submitting transaction to open position")
+    if journal is not None:
+        journal.record_order(index_token_symbol, "open", is_long, size_delta_usd, eth_price)
+    with metrics.timer("submission"):
+        submit_order(transaction, label=f"open {'long' if is_long else 'short'} {index_token_symbol}")
+    log.info("Position opened", extra={"fields": {"market": index_token_symbol, "is_long": is_long, "size_delta_usd": size_delta_usd}})
+
+def close_position(is_long, eth_price, leverage, size_delta_usd, percentage, index_token_symbol="ETH"):
     """
     Function to close a position using similar logic to opening a position.
 
@@ -439,53 +641,29 @@ def close_position(is_long, eth_price, leverage, size_delta_usd, percentage):
         Size of the position to close in USD.
     percentage : float
         Percentage for slippage and initial collateral delta.
+    index_token_symbol : str
+        Market to trade, e.g. "ETH".
     """
-    print(f"[DEBUG] Starting close_position. Parameters - is_long: {is_long}, eth_price: {eth_price}, leverage: {leverage}, size_delta_usd: {size_delta_usd}, percentage: {percentage}")
+    log.debug("Closing position", extra={"fields": {"market": index_token_symbol, "is_long": is_long, "price": eth_price, "leverage": leverage, "size_delta_usd": size_delta_usd, "slippage_percent": percentage}})
 
     # Calculate the size of the position to close
     size_delta = size_delta_usd / leverage
 
     # Build order parameters for decreasing the position
-    order_parameters = build_order(leverage, is_long, size_delta, percentage, increase=False)
-
-    print(f"[DEBUG] Processed order parameters for closing position: {order_parameters}")
-
-    # Instantiate and configure DecreaseOrder
-    order = DecreaseOrder(
-        config=config,
-        market_key=order_parameters['market_key'],
-        collateral_address=order_parameters['start_token_address'],
-        index_token_address=order_parameters['index_token_address'],
-        is_long=order_parameters['is_long'],
-        size_delta=order_parameters['size_delta'],
-        initial_collateral_delta_amount=(
-            order_parameters['initial_collateral_delta']
-        ),
-        slippage_percent=order_parameters['slippage_percent'],
-        swap_path=order_parameters['swap_path'],
-        debug_mode=True,
-        execution_buffer=1.5
-    )
+    with metrics.timer("order_build"):
+        order_parameters = build_order(leverage, is_long, size_delta, percentage, increase=False, index_token_symbol=index_token_symbol)
 
-    print("[DEBUG] DecreaseOrder instantiated successfully.")
-
-    # Determine gas limits for the transaction
-    print("[DEBUG] Determining gas limits...")
-    order.determine_gas_limits()
-    print(f"[DEBUG] Gas limits determined: {order._gas_limits}")
+    # Encoded from the warm gas, fee and price cache; the node's gas estimate is the only RPC
+    with metrics.timer("gas_estimation"):
+        transaction = order_preflight.order_transaction(order_parameters, is_increase=False)
 
     # Submit transaction
-    print("[DEBUG] Preparing to submit transaction for closing position...")
-    order._submit_transaction(
-        user_wallet_address=config.user_wallet_address,
-        value_amount=order_parameters['initial_collateral_delta'],  # Collateral amount in Wei
-        multicall_args=[
-            # HexBytes(order._send_wnt(order_parameters['initial_collateral_delta'])),  # Ensure this matches value_amount
-            # HexBytes(order._create_order((config.user_wallet_address,)))
-        ],
-        gas_limits=order._gas_limits
-    )
-    print(f"[DEBUG] Position closed. Long position: {is_long}, Size: {size_delta_usd} USD.")
+    log.debug("Submitting transaction to close position")
+    if journal is not None:
+        journal.record_order(index_token_symbol, "close", is_long, size_delta_usd, eth_price)
+    with metrics.timer("submission"):
+        submit_order(transaction, label=f"close {'long' if is_long else 'short'} {index_token_symbol}")
+    log.info("Position closed", extra={"fields": {"market": index_token_symbol, "is_long": is_long, "size_delta_usd": size_delta_usd}})
 
 def check_risk_management(is_long, entry_price, current_price, take_profit_percent, stop_loss_percent):
     """
@@ -531,107 +709,434 @@ def check_risk_management(is_long, entry_price, current_price, take_profit_perce
 
     return None
 
-def run_trading_bot():
-    global current_position
-    print("Starting trading bot...")
-    current_position = 0
-    current_position_value = 0  # Track the value of the current position
-    entry_price = 0  # Track the entry price of the position
+def position_lock(index_token_symbol="ETH"):
+    """
+    Lock held while a market's position is being changed.
+    """
+    return position_locks.setdefault(index_token_symbol, threading.Lock())
 
-    while True:
-        print("Running bot iteration...")
+def update_position(state, index_token_symbol, reason, **changes):
+    """
+    Apply a position transition to `state` and record it in the position journal.
+
+    Parameters
+    ----------
+    state : dict
+        Position state, see `manage_position`. Updated in place.
+    index_token_symbol : str
+        Market of the position, e.g. "ETH".
+    reason : str
+        What caused the transition, e.g. "open_long" or "stop_loss".
+    **changes
+        New values of 'current_position', 'current_position_value' and 'entry_price'.
+    """
+    state.update(changes)
+    if journal is not None:
+        journal.record_position(index_token_symbol, state, reason)
+
+def restore_positions(symbols):
+    """
+    Rebuild position state from the journal and check it against the chain.
+
+    The journal is replayed first; then one read of every open position of
+    the wallet corrects markets the chain disagrees with, and the
+    corrections are journaled. If the chain cannot be read, the journal
+    state is kept.
 
-        # Update historical data and calculate signals
-        historical_data = initialize_historical_data()
-        latest_signal = generate_signals(historical_data, strategy)
+    Parameters
+    ----------
+    symbols : list of str
+        Markets the bot trades.
 
-        # Get wallet balance and calculate appropriate size_delta_usd for open/close
-        wallet_balance_eth, wallet_balance_usd = get_wallet_balance()
+    Returns
+    -------
+    dict
+        Market symbol -> position state, see `manage_position`.
+    """
+    from position_journal import PositionJournal, flat_state, read_onchain_positions, reconcile
+
+    global journal
+    states = {symbol: flat_state() for symbol in symbols}
+    if journal_path is None:
+        return states
+
+    started = time.perf_counter()
+    if journal is None:
+        journal = PositionJournal(journal_path)
+        recorded = journal.open()
+    else:
+        recorded = journal.states
+    for symbol in symbols:
+        states[symbol].update(recorded.get(symbol, {}))
+    log.info("Position journal replayed", extra={"fields": {
+        "open_positions": {symbol: state["current_position"] for symbol, state in states.items() if state["current_position"] != 0},
+        "pending_orders": list(journal.pending_orders),
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+    }})
+
+    try:
+        onchain = read_onchain_positions(config, config.user_wallet_address)
+    except Exception as e:
+        log.error("Reading on-chain positions failed, keeping the journal state: %s", e)
+        return states
+    for symbol, reason in reconcile(states, onchain).items():
+        log.warning("Journal position differs from the chain, corrected", extra={"fields": {"market": symbol, "reason": reason, "state": dict(states[symbol])}})
+        journal.record_position(symbol, states[symbol], reason)
+    return states
+
+def close_on_risk_event(state, risk_event, price, index_token_symbol="ETH"):
+    """
+    Close the position in `state` after its take-profit or stop-loss level was hit.
+
+    Parameters
+    ----------
+    state : dict
+        Position state, see `manage_position`. Updated in place.
+    risk_event : str
+        "take_profit" or "stop_loss".
+    price : float
+        Current USD price of the market's index token.
+    index_token_symbol : str
+        Market of the position, e.g. "ETH".
+    """
+    close_percentage = strategy["trade_settings"]["close_position_percentage"]
+    leverage = strategy["trade_settings"].get("leverage", 5)
+    if risk_event == "take_profit":
+        log.info("Take profit hit, closing position", extra={"fields": {"market": index_token_symbol, "price": price, "entry_price": state["entry_price"]}})
+    elif risk_event == "stop_loss":
+        log.info("Stop loss hit, closing position", extra={"fields": {"market": index_token_symbol, "price": price, "entry_price": state["entry_price"]}})
+
+    size_delta_usd = calculate_close_position_amount(state["current_position_value"], close_percentage)
+    close_position(is_long=(state["current_position"] == 1), eth_price=price, leverage=leverage, size_delta_usd=size_delta_usd, percentage=0.01, index_token_symbol=index_token_symbol)
+    update_position(state, index_token_symbol, risk_event, current_position=0, current_position_value=0)  # Reset position value after closing
+
+def start_risk_monitor(states):
+    """
+    Watch take-profit and stop-loss on oracle prices between trading iterations.
+
+    Only runs if the strategy sets `risk_management.monitor_interval_seconds`.
+    Triggered positions are re-checked and closed under their market's
+    position lock, so they never race the trading loop.
+
+    Parameters
+    ----------
+    states : dict
+        Market symbol -> position state, shared with the trading loop.
+
+    Returns
+    -------
+    RiskMonitor or None
+        The running monitor, or None if it is not configured.
+    """
+    from risk_monitor import RiskMonitor
+
+    risk_settings = strategy["risk_management"]
+    interval = risk_settings.get("monitor_interval_seconds")
+    if not interval:
+        return None
+
+    def on_trigger(symbol, risk_event, price):
+        state = states[symbol]
+        with position_lock(symbol):
+            # The trading loop may have closed or replaced the position since the tick
+            if state["current_position"] == 0:
+                return
+            risk_event = check_risk_management(
+                is_long=(state["current_position"] == 1),
+                entry_price=state["entry_price"],
+                current_price=price,
+                take_profit_percent=risk_settings["take_profit_percent"],
+                stop_loss_percent=risk_settings["stop_loss_percent"]
+            )
+            if risk_event is not None:
+                close_on_risk_event(state, risk_event, price, symbol)
+
+    monitor = RiskMonitor(
+        states,
+        {symbol: market_cache.index_token(symbol) for symbol in states},
+        on_trigger,
+        risk_settings["take_profit_percent"],
+        risk_settings["stop_loss_percent"],
+        interval=interval,
+        chain=config.chain,
+    )
+    monitor.start()
+    log.info("Risk monitor started", extra={"fields": {"markets": list(states), "interval_seconds": interval}})
+    return monitor
+
+def manage_position(state, latest_signal, wallet_balance_usd, eth_price_usd, index_token_symbol="ETH"):
+    """
+    Apply risk management and the latest signal to the current position.
+
+    Parameters
+    ----------
+    state : dict
+        Position state with 'current_position' (1 long, -1 short, 0 flat),
+        'current_position_value' and 'entry_price'. Updated in place.
+    latest_signal : pandas.Series
+        Latest signal row, see `generate_signals`.
+    wallet_balance_usd : float
+        Wallet balance in USD used to size new positions.
+    eth_price_usd : float
+        Current USD price of the market's index token.
+    index_token_symbol : str
+        Market to trade, e.g. "ETH".
+
+    Returns
+    -------
+    str
+        "take_profit" or "stop_loss" if a risk event closed the position, None otherwise.
+    """
+    with position_lock(index_token_symbol):
         open_percentage = strategy["trade_settings"]["open_position_percentage"]
         close_percentage = strategy["trade_settings"]["close_position_percentage"]
+        leverage = strategy["trade_settings"].get("leverage", 5)
         take_profit_percent = strategy["risk_management"]["take_profit_percent"]
         stop_loss_percent = strategy["risk_management"]["stop_loss_percent"]
-
-        # Fetch current ETH price
-        eth_price_usd = get_eth_to_usd_price()
-        if eth_price_usd is None:
-            print("Error fetching ETH price. Retrying in the next iteration.")
-            time.sleep(60)
-            continue
+        current_position = state["current_position"]
 
         # Check risk management for open positions
         if current_position != 0:
             risk_event = check_risk_management(
                 is_long=(current_position == 1),
-                entry_price=entry_price,
+                entry_price=state["entry_price"],
                 current_price=eth_price_usd,
                 take_profit_percent=take_profit_percent,
                 stop_loss_percent=stop_loss_percent
             )
 
-            if risk_event == "take_profit":
-                print(f"Take profit hit! Closing position. Current Price: ${eth_price_usd}, Entry Price: ${entry_price}")
-                size_delta_usd = calculate_close_position_amount(current_position_value, close_percentage)
-                close_position(is_long=(current_position == 1), eth_price=eth_price_usd, size_delta_usd=size_delta_usd, percentage=0.01)
-                current_position = 0
-                current_position_value = 0  # Reset position value after closing
-                print("Position closed after hitting take profit.")
-                continue
-
-            elif risk_event == "stop_loss":
-                print(f"Stop loss hit! Closing position. Current Price: ${eth_price_usd}, Entry Price: ${entry_price}")
-                size_delta_usd = calculate_close_position_amount(current_position_value, close_percentage)
-                close_position(is_long=(current_position == 1), eth_price=eth_price_usd, size_delta_usd=size_delta_usd, percentage=0.01)
-                current_position = 0
-                current_position_value = 0  # Reset position value after closing
-                print("Position closed after hitting stop loss.")
-                continue
+            if risk_event is not None:
+                close_on_risk_event(state, risk_event, eth_price_usd, index_token_symbol)
+                return risk_event
 
         # Open a Long Position
         if latest_signal['Position'] == 1 and current_position == 0:
             size_delta_usd = calculate_open_position_amount(wallet_balance_usd, open_percentage)
-            print(f"Opening position with amount: ${size_delta_usd}")
-            open_position(is_long=True, eth_price=eth_price_usd, leverage=5, size_delta_usd=size_delta_usd, percentage=0.01)
-            current_position = 1
-            current_position_value = size_delta_usd  # Track the initial position value
-            entry_price = eth_price_usd  # Record entry price
-            print(f"Long position opened with size {size_delta_usd} USD.")
+            open_position(is_long=True, eth_price=eth_price_usd, leverage=leverage, size_delta_usd=size_delta_usd, percentage=0.01, index_token_symbol=index_token_symbol)
+            # Track the initial position value and entry price
+            update_position(state, index_token_symbol, "open_long", current_position=1, current_position_value=size_delta_usd, entry_price=eth_price_usd)
 
         # Open a Short Position
         elif latest_signal['Position'] == -1 and current_position == 0:
             size_delta_usd = calculate_open_position_amount(wallet_balance_usd, open_percentage)
-            print(f"Opening position with amount: ${size_delta_usd}")
-            open_position(is_long=False, eth_price=eth_price_usd, leverage=5, size_delta_usd=size_delta_usd, percentage=0.01)
-            current_position = -1
-            current_position_value = size_delta_usd  # Track the initial position value
-            entry_price = eth_price_usd  # Record entry price
-            print(f"Short position opened with size {size_delta_usd} USD.")
+            open_position(is_long=False, eth_price=eth_price_usd, leverage=leverage, size_delta_usd=size_delta_usd, percentage=0.01, index_token_symbol=index_token_symbol)
+            # Track the initial position value and entry price
+            update_position(state, index_token_symbol, "open_short", current_position=-1, current_position_value=size_delta_usd, entry_price=eth_price_usd)
 
         # Close Long Position
         elif current_position == 1 and latest_signal['Position'] == 0:
-            size_delta_usd = calculate_close_position_amount(current_position_value, close_percentage)
-            close_position(is_long=True, eth_price=eth_price_usd, size_delta_usd=size_delta_usd, percentage=0.01)
-            current_position = 0
-            current_position_value = 0  # Reset position value after closing
-            print(f"Long position closed with size {size_delta_usd} USD.")
+            size_delta_usd = calculate_close_position_amount(state["current_position_value"], close_percentage)
+            close_position(is_long=True, eth_price=eth_price_usd, leverage=leverage, size_delta_usd=size_delta_usd, percentage=0.01, index_token_symbol=index_token_symbol)
+            update_position(state, index_token_symbol, "close_long", current_position=0, current_position_value=0)  # Reset position value after closing
 
         # Close Short Position
         elif current_position == -1 and latest_signal['Position'] == 0:
-            size_delta_usd = calculate_close_position_amount(current_position_value, close_percentage)
-            close_position(is_long=False, eth_price=eth_price_usd, size_delta_usd=size_delta_usd, percentage=0.01)
-            current_position = 0
-            current_position_value = 0  # Reset position value after closing
-            print(f"Short position closed with size {size_delta_usd} USD.")
+            size_delta_usd = calculate_close_position_amount(state["current_position_value"], close_percentage)
+            close_position(is_long=False, eth_price=eth_price_usd, leverage=leverage, size_delta_usd=size_delta_usd, percentage=0.01, index_token_symbol=index_token_symbol)
+            update_position(state, index_token_symbol, "close_short", current_position=0, current_position_value=0)  # Reset position value after closing
+
+        return None
+
+def finish_iteration(started):
+    """
+    Record the iteration time and export the metrics to `metrics_dir`, unless it is None.
+    """
+    metrics.observe("iteration_duration_seconds", time.perf_counter() - started, help="Wall time per trading loop iteration, excluding sleeps.")
+    if metrics_dir is None:
+        return
+    try:
+        metrics.export(metrics_dir)
+    except OSError as e:
+        log.error("Exporting metrics failed: %s", e)
+
+def run_trading_bot():
+    from candle_store import CandleStore
+    from indicator_engine import IndicatorEngine
+
+    global current_position, last_signal_time
+    log.info("Starting trading bot")
+    state = restore_positions(["ETH"])["ETH"]  # Open position from the journal, checked on-chain
+    indicator_engine = IndicatorEngine(strategy)  # Keeps indicator state between iterations
+    candle_store = CandleStore(candle_store_dir)  # Local candles, only deltas are downloaded
+    resampler = build_resampler()  # Higher timeframes from one base feed, if configured
+    start_risk_monitor({"ETH": state})  # Take-profit/stop-loss between iterations, if configured
+
+    while True:
+        log.debug("Running bot iteration")
+        iteration_started = time.perf_counter()
+
+        # Update historical data and feed only the new bars into the indicator engine
+        with metrics.timer("candle_fetch"):
+            historical_data = initialize_historical_data(candle_store, resampler=resampler)
+        with metrics.timer("signals"):
+            latest_signal = indicator_engine.update_from_frame(historical_data)
+        last_signal_time = time.perf_counter()
+        log.info("Latest signal", extra={"fields": {"rsi": latest_signal["RSI"], "position": int(latest_signal["Position"])}})
+
+        # Fetch current ETH price
+        with metrics.timer("price"):
+            eth_price_usd = get_eth_to_usd_price()
+        if eth_price_usd is None:
+            log.error("Error fetching ETH price. Retrying in the next iteration.")
+            finish_iteration(iteration_started)
+            sleep(60)
+            continue
+
+        # Get wallet balance at the same price and calculate appropriate size_delta_usd for open/close
+        with metrics.timer("balance"):
+            wallet_balance_eth, wallet_balance_usd = get_wallet_balance(eth_price_usd)
+
+        risk_event = manage_position(state, latest_signal, wallet_balance_usd, eth_price_usd)
+        current_position = state["current_position"]
+        finish_iteration(iteration_started)
+        if risk_event is not None:
+            continue
 
         # Wait for the next iteration
-        print("Sleeping for 5 minutes...")
-        time.sleep(300)
-        print("\n")
-    
+        log.debug("Sleeping for 5 minutes")
+        sleep(300)
+
+def run_multi_market_bot():
+    """
+    Trade many GMX markets from one process with `MultiMarketRunner`.
+
+    Candle windows and position state are kept per market, signals for all
+    markets are computed in one batched pass and orders are submitted
+    concurrently.
+    """
+    from candle_store import CandleStore
+    from multi_market import MultiMarketRunner
+
+    global last_signal_time
+    log.info("Starting multi-market trading bot")
+    runner = MultiMarketRunner(
+        strategy,
+        market_cache,
+        CandleStore(candle_store_dir),
+        fetch_candles,
+        manage_position,
+        symbols=trade_markets,
+        chain=config.chain,
+    )
+    for symbol in runner.markets:
+        order_preflight.build_templates(symbol)
+    runner.states.update(restore_positions(runner.markets))  # Open positions from the journal, checked on-chain
+    start_risk_monitor(runner.states)  # Take-profit/stop-loss between iterations, if configured
+
+    while True:
+        log.debug("Running bot iteration")
+        iteration_started = time.perf_counter()
+        with metrics.timer("balance"):
+            balance = get_wallet_balance()
+        wallet_balance_usd = balance[1] if balance is not None else None
+
+        with metrics.timer("candle_fetch"):
+            runner.sync_candles()
+        with metrics.timer("signals"):
+            signals = runner.signals()
+        last_signal_time = time.perf_counter()
+        with metrics.timer("trade"):
+            risk_events = runner.trade(signals, wallet_balance_usd)
+        log.info("Signals", extra={"fields": {"positions": signals["Position"].to_dict()}})
+        finish_iteration(iteration_started)
+        if risk_events:
+            log.info("Risk events", extra={"fields": {"risk_events": risk_events}})
+            continue
+
+        # Wait for the next iteration
+        log.debug("Sleeping for 5 minutes")
+        sleep(300)
+
+async def _run_with_timeout(func, *args, timeout=None):
+    # Run a blocking call on a worker thread; on timeout the result is dropped and None returned
+    timeout = io_timeout if timeout is None else timeout
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=timeout)
+    except asyncio.TimeoutError:
+        log.error("%s timed out after %ss", func.__name__, timeout)
+    except Exception as e:
+        log.error("%s failed: %s", func.__name__, e)
+    return None
+
+async def run_trading_bot_async():
+    """
+    Event-loop version of `run_trading_bot`.
+
+    Candle fetch, wallet balance and ETH price lookups run concurrently with
+    timeouts, so an iteration waits for the slowest single call instead of
+    their sum. Sleeps are awaitable, so other tasks can share the loop.
+    """
+    from candle_store import CandleStore
+    from indicator_engine import IndicatorEngine
+
+    global current_position, last_signal_time
+    log.info("Starting trading bot (async)")
+    state = restore_positions(["ETH"])["ETH"]  # Open position from the journal, checked on-chain
+    indicator_engine = IndicatorEngine(strategy)  # Keeps indicator state between iterations
+    candle_store = CandleStore(candle_store_dir)  # Local candles, only deltas are downloaded
+    resampler = build_resampler()  # Higher timeframes from one base feed, if configured
+    start_risk_monitor({"ETH": state})  # Take-profit/stop-loss between iterations, if configured
+
+    while True:
+        log.debug("Running bot iteration")
+        iteration_started = time.perf_counter()
+
+        # Candle fetch, balance and price overlap, so they are timed as one stage
+        with metrics.timer("concurrent_fetch"):
+            historical_data, native_balance_wei, eth_price_usd = await asyncio.gather(
+                _run_with_timeout(initialize_historical_data, candle_store, 200, resampler),
+                _run_with_timeout(w3.eth.get_balance, config.user_wallet_address),
+                _run_with_timeout(get_eth_to_usd_price),
+            )
+        if historical_data is None or eth_price_usd is None:
+            log.error("Error fetching candles or ETH price. Retrying in the next iteration.")
+            finish_iteration(iteration_started)
+            await asyncio.sleep(60)
+            continue
+
+        with metrics.timer("signals"):
+            latest_signal = indicator_engine.update_from_frame(historical_data)
+        last_signal_time = time.perf_counter()
+        log.info("Latest signal", extra={"fields": {"rsi": latest_signal["RSI"], "position": int(latest_signal["Position"])}})
+
+        wallet_balance_usd = None
+        if native_balance_wei is not None:
+            wallet_balance_usd = native_balance_wei / 1e18 * eth_price_usd
+            log.debug("Wallet balance", extra={"fields": {"balance_usd": wallet_balance_usd}})
+
+        # Order submission is not cancelled mid-way, so it runs without a timeout
+        risk_event = await asyncio.to_thread(manage_position, state, latest_signal, wallet_balance_usd, eth_price_usd)
+        current_position = state["current_position"]
+        finish_iteration(iteration_started)
+        if risk_event is not None:
+            continue
+
+        # Wait for the next iteration
+        log.debug("Sleeping for 5 minutes")
+        await asyncio.sleep(300)
+
+async def main_async(*tasks):
+    """
+    Run the async bot alongside other coroutines (e.g. monitoring or stats) on one event loop.
+    """
+    await asyncio.gather(run_trading_bot_async(), *tasks)
+
 def main():    
-    setup()
+    global strategy, config
+    strategy, config = get_config()
+
+    print(f"[DEBUG] Module import took {import_time * 1000:.1f} ms (budget {import_time_budget * 1000:.0f} ms).")
+    if import_time > import_time_budget:
+        print("[WARNING] Module import exceeded its time budget; check for new top-level imports.")
+
+    setup(config, strategy)
     # Run the trading bot
-    run_trading_bot()
+    if multi_market:
+        run_multi_market_bot()
+    elif use_async:
+        asyncio.run(main_async())
+    else:
+        run_trading_bot()
     
 # Run the bot
 if __name__ == "__main__":
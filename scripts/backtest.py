@@ -3,11 +3,21 @@ url = 'https://anaconda.org/conda-forge/libta-lib/0.4.0/download/linux-64/libta-
 url = 'https://anaconda.org/conda-forge/ta-lib/0.4.19/download/linux-64/ta-lib-0.4.19-py310hde88566_4.tar.bz2'
 !curl -L $url | tar xj -C /usr/local/lib/python3.10/dist-packages/ lib/python3.10/site-packages/talib --strip-components=3
 # Import the required libraries
+import os
 import yfinance as yf  # Library for downloading historical data
 import pandas as pd  # Library for data manipulation
-import talib as ta  # Library for technical indicators like RSI, Bollinger Bands
+from indicators import get_ta  # TA-Lib or its NumPy stand-in, see ACID_TA_BACKEND
 import numpy as np  # Library for numerical operations
 import matplotlib.pyplot as plt  # Library for plotting graphs
+from backtest_engine import apply_strategy, load_strategy, run_backtest  # Strategy signals and vectorized backtest simulation
+from rules import compile_rules  # Long and short rules of the strategy
+
+ta = get_ta()  # Library for technical indicators like RSI, Bollinger Bands
+
+# Indicator settings and rules from strategy.yaml; settings it leaves as placeholders use the built-in ones
+strategy_path = os.path.join('utils', 'strategy.yaml')
+strategy = load_strategy(strategy_path)
+rules = compile_rules(strategy)
 
 # Fetch historical data using yfinance
 symbol = 'ETH-USD'  # You can change this to another asset (e.g., 'ETH-USD' or 'AAPL')
@@ -17,54 +27,19 @@ data = yf.download(symbol, start='2024-09-01', end='2024-10-12', interval='15m')
 data.dropna(inplace=True)
 
 # Calculate Bollinger Bands
+bb_length = strategy['bollinger_bands']['length']
+bb_multiplier = strategy['bollinger_bands']['multiplier']
 data['upperband'], data['middleband'], data['lowerband'] = ta.BBANDS(
-    data['Close'], timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
+    data['Close'], timeperiod=bb_length, nbdevup=bb_multiplier, nbdevdn=bb_multiplier, matype=0)
 
 # Calculate RSI (Relative Strength Index)
-data['RSI'] = ta.RSI(data['Close'], timeperiod=14)
-
-# Calculate the 200-period moving average for volume
-data['Volume_MA'] = ta.SMA(data['Volume'], timeperiod=200)
-
-# Define the strategy: Long when price touches lower Bollinger Band, RSI < 20, and volume > 200-period MA
-def apply_strategy(df):
-    """
-    This function applies the trading strategy to the given DataFrame.
-    It sets conditions for entering long and short positions based on
-    Bollinger Bands, RSI, and Volume.
-
-    Parameters:
-    df (pd.DataFrame): DataFrame containing historical price, volume, and technical indicators
-
-    Returns:
-    None
-    """
-    # Long condition: RSI < 20, price <= lower Bollinger Band, and volume > volume moving average
-    df['Long'] = np.where(
-        (df['RSI'] < 40) &
-        (df['Close'] <= df['lowerband']) &
-        (df['Volume'] > df['Volume_MA']),
-        1,  # 1 indicates a Buy signal
-        0   # 0 indicates no Buy signal
-    )
-
-    # Short condition: RSI > 80, price >= upper Bollinger Band, and volume > volume moving average
-    df['Short'] = np.where(
-        (df['RSI'] > 60) &
-        (df['Close'] >= df['upperband']) &
-        (df['Volume'] > df['Volume_MA']),
-        -1,  # -1 indicates a Sell signal
-        0    # 0 indicates no Sell signal
-    )
+data['RSI'] = ta.RSI(data['Close'], timeperiod=strategy['rsi']['length'])
 
-    # Combine Long and Short signals into a single column
-    df['Position'] = df['Long'] + df['Short']
-
-    # Shift the position column to ensure trades are made AFTER the signal appears
-    df['Position'] = df['Position'].shift(1)
+# Calculate the moving average for volume
+data['Volume_MA'] = ta.SMA(data['Volume'], timeperiod=strategy['volume']['moving_avg_length'])
 
 # Apply the strategy to the data
-apply_strategy(data)
+apply_strategy(data, rules)
 
 # Plot the historical prices, Bollinger Bands, and the strategy signals (buy/sell)
 plt.figure(figsize=(14, 8))
@@ -79,48 +54,28 @@ plt.show()
 
 # Backtest the strategy to evaluate its performance
 initial_balance = 10000  # Initial balance in USD
-balance = initial_balance
-position = 0  # 1 = long, -1 = short, 0 = no position
-entry_price = 0  # Entry price for the position
-
-# Trade settings
-leverage = 5  # Leverage to use for each trade (e.g., 5x)
-trade_size_percentage = 0.1  # Use 10% of balance for each trade
-
-# Loop through the historical data to simulate the trading strategy
-for i, row in data.iterrows():
-    # Determine how much of the balance is used for each trade
-    trade_size = balance * trade_size_percentage  # Use 10% of balance
-    position_size = trade_size * leverage  # Apply leverage to the trade size
-
-    if row['Position'] == 1 and position == 0:
-        # Enter a long position if currently not in any position
-        position = 1
-        entry_price = row['Close']
-        print(f"Entering long with {position_size} at {entry_price} on {i}")
-
-    elif row['Position'] == -1 and position == 0:
-        # Enter a short position if currently not in any position
-        position = -1
-        entry_price = row['Close']
-        print(f"Entering short with {position_size} at {entry_price} on {i}")
-
-    elif position == 1 and row['Position'] == 0:
-        # Exit the long position if a sell signal appears
-        profit = (row['Close'] - entry_price) * position_size / entry_price  # Calculate profit from leveraged position
-        balance += profit
-        print(f"Exiting long at {row['Close']} on {i}, Profit: {profit}, New Balance: {balance}")
-        position = 0
 
-    elif position == -1 and row['Position'] == 0:
-        # Exit the short position if a buy signal appears
-        profit = (entry_price - row['Close']) * position_size / entry_price  # Calculate profit from leveraged position
-        balance += profit
-        print(f"Exiting short at {row['Close']} on {i}, Profit: {profit}, New Balance: {balance}")
-        position = 0
+# Trade and risk settings from strategy.yaml, as the bot trades them
+leverage = strategy['trade_settings']['leverage']  # Leverage to use for each trade (e.g., 5x)
+trade_size_percentage = strategy['trade_settings']['open_position_percentage']  # Fraction of the balance for each trade
+take_profit_percent = strategy['risk_management']['take_profit_percent']
+stop_loss_percent = strategy['risk_management']['stop_loss_percent']
+
+# Simulate the trading strategy on the whole dataset with array operations
+trades, metrics = run_backtest(
+    data,
+    leverage=leverage,
+    trade_size_percentage=trade_size_percentage,
+    initial_balance=initial_balance,
+    take_profit_percent=take_profit_percent,
+    stop_loss_percent=stop_loss_percent,
+)
+print(trades.to_string())
 
 # Print final balance and performance metrics
-profit_percent = ((balance - initial_balance) / initial_balance) * 100
+balance = metrics["final_balance"]
+profit_percent = metrics["profit_percent"]
 print(f"Initial Balance: ${initial_balance}")
 print(f"Final Balance: ${balance}")
-print(f"Total Profit: {profit_percent:.2f}%")
\ No newline at end of file
+print(f"Total Profit: {profit_percent:.2f}%")
+print(f"Trades: {metrics['trades']}, Win Rate: {metrics['win_rate'] * 100:.2f}%, Max Drawdown: {metrics['max_drawdown_percent']:.2f}%")
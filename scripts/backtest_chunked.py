@@ -0,0 +1,82 @@
+import argparse
+import os
+import resource
+import time
+
+import pandas as pd
+
+from backtest_engine import load_strategy, run_backtest_chunked
+from candle_store import CandleStore
+from cost_tables import CostTable
+from rules import compile_rules
+from stats_store import StatsStore
+
+
+def csv_chunks(path, chunk_size):
+    """
+    Read a Timestamp/Open/High/Low/Close/Volume CSV as consecutive DataFrames.
+    """
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        chunk["Timestamp"] = pd.to_datetime(chunk["Timestamp"], utc=True)
+        yield chunk.set_index("Timestamp")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtest histories larger than memory chunk by chunk - ACID."
+    )
+    parser.add_argument("--candles", help="Candle store directory, or a CSV file.", default=os.path.join("data", "candles"))
+    parser.add_argument("--symbol", help="Series in the candle store.", default="ETH-USD")
+    parser.add_argument("--interval", help="Bar interval of the series.", default="1m")
+    parser.add_argument("--chunk-size", help="Bars read per chunk.", type=int, default=1_000_000)
+    parser.add_argument("--strategy", help="Strategy YAML file with the indicator settings and rules.", default=os.path.join("utils", "strategy.yaml"))
+    parser.add_argument("--leverage", type=float, default=5)
+    parser.add_argument("--trade-size", help="Fraction of the balance per trade.", type=float, default=0.1)
+    parser.add_argument("--balance", help="Starting balance in USD.", type=float, default=10000)
+    parser.add_argument("--take-profit", help="Take-profit level in percent.", type=float, default=None)
+    parser.add_argument("--stop-loss", help="Stop-loss level in percent.", type=float, default=None)
+    parser.add_argument("--fee", help="Position fee in percent of the notional.", type=float, default=0.0)
+    parser.add_argument("--costs", help="GMX stats store directory to charge borrow and funding costs from.", default=None)
+    parser.add_argument("--market", help="Market symbol in the stats store.", default="ETH")
+    parser.add_argument("--trades", help="Write the trades to this CSV file.", default=None)
+    args = parser.parse_args()
+
+    if os.path.isdir(args.candles):
+        chunks = CandleStore(args.candles).iter_chunks(args.symbol, args.interval, args.chunk_size)
+    else:
+        chunks = csv_chunks(args.candles, args.chunk_size)
+    costs = None
+    if args.costs is not None:
+        costs = CostTable.from_store(StatsStore(args.costs), args.market)
+    strategy = load_strategy(args.strategy)
+
+    started = time.perf_counter()
+    trades, metrics = run_backtest_chunked(
+        chunks,
+        leverage=args.leverage,
+        trade_size_percentage=args.trade_size,
+        initial_balance=args.balance,
+        take_profit_percent=args.take_profit,
+        stop_loss_percent=args.stop_loss,
+        bb_length=strategy["bollinger_bands"]["length"],
+        bb_deviation=strategy["bollinger_bands"]["multiplier"],
+        rsi_length=strategy["rsi"]["length"],
+        volume_ma_length=strategy["volume"]["moving_avg_length"],
+        rules=compile_rules(strategy),
+        fee_percent=args.fee,
+        costs=costs,
+    )
+    elapsed = time.perf_counter() - started
+
+    if args.trades is not None:
+        trades.to_csv(args.trades, index=False)
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+    print(f"Backtested in {elapsed:.1f}s, peak memory {peak_mb:.0f} MB.")
+    print(f"Initial Balance: ${metrics['initial_balance']}")
+    print(f"Final Balance: ${metrics['final_balance']:.2f}")
+    print(f"Total Profit: {metrics['profit_percent']:.2f}%")
+    print(f"Trades: {metrics['trades']}, Win Rate: {metrics['win_rate'] * 100:.2f}%, Max Drawdown: {metrics['max_drawdown_percent']:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,577 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from rules import compile_rules
+from ta_numpy import StreamingMeanStd, StreamingRSI
+
+# Settings the backtests have always used, unless a strategy is loaded
+BACKTEST_STRATEGY = {
+    "bollinger_bands": {"length": 20, "multiplier": 2},
+    "rsi": {"length": 14, "oversold": 40, "overbought": 60},
+    "volume": {"moving_avg_length": 200},
+    # No take-profit / stop-loss unless the strategy sets them; the bot trades at 5x with 10% of the balance
+    "risk_management": {"take_profit_percent": None, "stop_loss_percent": None},
+    "trade_settings": {"leverage": 5, "open_position_percentage": 0.1},
+}
+
+# Rule indicator names -> backtest DataFrame columns, where they differ
+BACKTEST_COLUMNS = {"BB_MA": "middleband", "BB_Upper": "upperband", "BB_Lower": "lowerband"}
+
+
+def load_strategy(path):
+    """
+    Backtest settings from a strategy YAML file.
+
+    Settings the file leaves as placeholders or does not have keep their
+    `BACKTEST_STRATEGY` value, and its `rules` section is used if present,
+    so the template in utils/strategy.yaml backtests the built-in rules.
+
+    Parameters
+    ----------
+    path : str
+        Strategy YAML file, with or without its top-level `strategy` key.
+
+    Returns
+    -------
+    dict
+        Strategy with every `BACKTEST_STRATEGY` setting, for `compile_rules`
+        and the `run_backtest` trade and risk settings.
+    """
+    import yaml
+
+    strategy = {section: dict(settings) for section, settings in BACKTEST_STRATEGY.items()}
+    if not os.path.exists(path):
+        return strategy
+    with open(path, "r") as file:
+        loaded = yaml.safe_load(file) or {}
+    loaded = loaded.get("strategy", loaded)
+    for section, settings in strategy.items():
+        for key, value in (loaded.get(section) or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                settings[key] = value
+    if isinstance(loaded.get("rules"), dict):
+        strategy["rules"] = loaded["rules"]
+    return strategy
+
+
+def _next_index(mask):
+    """
+    For every row, the index of the first row at or after it where `mask` is True.
+
+    Rows with no such successor get len(mask).
+    """
+    n = len(mask)
+    candidates = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(candidates[::-1])[::-1]
+
+
+def _signal_trades(signal):
+    """
+    Entry/exit rows when positions are only closed by a flat (0) signal.
+
+    Entries are non-zero signals following a flat one, exits are flat
+    signals following a non-zero one. NaN rows carry no signal.
+    """
+    valid_rows = np.flatnonzero(~np.isnan(signal))
+    values = signal[valid_rows]
+    previous = np.concatenate(([0.0], values[:-1]))
+    entries = valid_rows[(values != 0) & (previous == 0)]
+    exits = valid_rows[(values == 0) & (previous != 0)]
+    reasons = np.full(len(exits), "signal", dtype=object)
+    return entries, exits, reasons
+
+
+def _risk_managed_trades(signal, close, take_profit_percent, stop_loss_percent):
+    """
+    Entry/exit rows with take-profit and stop-loss checks, as in the live bot.
+
+    Risk levels are checked on every bar after the entry bar and before the
+    signal, like `check_risk_management` in `run_trading_bot`. The loop runs
+    once per trade; the bar scan inside a trade is a single array operation.
+    """
+    n = len(signal)
+    valid = ~np.isnan(signal)
+    next_entry = np.append(_next_index(valid & (signal != 0)), n)
+    next_flat = np.append(_next_index(valid & (signal == 0)), n)
+
+    entries, exits, reasons = [], [], []
+    i = next_entry[0]
+    while i < n:
+        direction = signal[i]
+        entry_price = close[i]
+        signal_exit = next_flat[i + 1]
+        held = close[i + 1:signal_exit + 1]
+
+        if direction > 0:
+            take_profit = held >= entry_price * (1 + take_profit_percent / 100)
+            stop_loss = held <= entry_price * (1 - stop_loss_percent / 100)
+        else:
+            take_profit = held <= entry_price * (1 - take_profit_percent / 100)
+            stop_loss = held >= entry_price * (1 + stop_loss_percent / 100)
+
+        hit = take_profit | stop_loss
+        if hit.any():
+            offset = int(np.argmax(hit))
+            exit_row = i + 1 + offset
+            reason = "take_profit" if take_profit[offset] else "stop_loss"
+        elif signal_exit < n:
+            exit_row = signal_exit
+            reason = "signal"
+        else:
+            # Position still open at the end of the data
+            entries.append(i)
+            break
+
+        entries.append(i)
+        exits.append(exit_row)
+        reasons.append(reason)
+        i = next_entry[exit_row + 1]
+
+    return (
+        np.asarray(entries, dtype=np.int64),
+        np.asarray(exits, dtype=np.int64),
+        np.asarray(reasons, dtype=object),
+    )
+
+
+# Define the strategy: Long when price touches lower Bollinger Band, RSI < 20, and volume > 200-period MA
+def apply_strategy(df, rules=None, previous=None):
+    """
+    This function applies the trading strategy to the given DataFrame.
+    It sets conditions for entering long and short positions from the
+    compiled strategy rules, by default the Bollinger Band, RSI and Volume
+    rules with RSI thresholds 40 / 60.
+
+    Parameters:
+    df (pd.DataFrame): DataFrame containing historical price, volume, and technical indicators
+    rules (CompiledRules, optional): Long and short rules, see `rules.compile_rules`
+    previous (dict, optional): Indicator values of the bar before the first row, for crossings
+
+    Returns:
+    None
+    """
+    rules = rules or compile_rules(BACKTEST_STRATEGY)
+    columns = {name: df[BACKTEST_COLUMNS.get(name, name)].to_numpy(dtype=np.float64) for name in rules.indicators}
+    long_signal, short_signal, position = rules.signals(columns, previous)
+
+    df['Long'] = long_signal.astype(np.int64)  # 1 indicates a Buy signal
+    df['Short'] = -short_signal.astype(np.int64)  # -1 indicates a Sell signal
+
+    # Combine Long and Short signals into a single column; a bar matching both is short
+    df['Position'] = position
+
+    # Shift the position column to ensure trades are made AFTER the signal appears
+    df['Position'] = df['Position'].shift(1)
+
+
+def simulate_trades(close, signal, leverage=5, trade_size_percentage=0.1, initial_balance=10000,
+                    take_profit_percent=None, stop_loss_percent=None, fee_percent=0.0, holding_costs=None):
+    """
+    Array core of `run_backtest`, working on plain NumPy arrays.
+
+    Parameters
+    ----------
+    close : numpy.ndarray
+        Close prices.
+    signal : numpy.ndarray
+        Position signal per bar (1 long, -1 short, 0 flat, NaN no signal).
+    holding_costs : dict, optional
+        'long' and 'short' -> cost accrued per unit of notional at every
+        bar, see `CostTable.accrued`. No holding costs if None.
+
+    See `run_backtest` for the remaining parameters.
+
+    Returns
+    -------
+    dict
+        Per-trade arrays ('entries', 'exits', 'direction', 'entry_price', 'exit_price',
+        'position_size', 'profit', 'cost', 'balance', 'exit_reason') plus 'open_position'.
+    """
+    if take_profit_percent is None and stop_loss_percent is None:
+        entries, exits, reasons = _signal_trades(signal)
+    else:
+        entries, exits, reasons = _risk_managed_trades(
+            signal,
+            close,
+            np.inf if take_profit_percent is None else take_profit_percent,
+            np.inf if stop_loss_percent is None else stop_loss_percent,
+        )
+
+    closed = len(exits)
+    open_position = int(signal[entries[-1]]) if len(entries) > closed else 0
+    entries = entries[:closed]
+
+    direction = signal[entries]
+    entry_accrued = exit_accrued = None
+    if holding_costs is not None:
+        entry_accrued = {side: accrued[entries] for side, accrued in holding_costs.items()}
+        exit_accrued = {side: accrued[exits] for side, accrued in holding_costs.items()}
+    cost = _trade_costs(direction, entry_accrued, exit_accrued, fee_percent)
+
+    result = _trade_results(direction, close[entries], close[exits], leverage, trade_size_percentage, initial_balance, cost)
+    result.update(entries=entries, exits=exits, exit_reason=reasons, open_position=open_position)
+    return result
+
+
+def _trade_costs(direction, entry_accrued, exit_accrued, fee_percent):
+    # Fraction of the notional each trade pays: the position fee on open and close, plus holding costs
+    cost = np.full(len(direction), 2 * fee_percent / 100)
+    if entry_accrued is not None:
+        cost += np.where(
+            direction > 0,
+            exit_accrued["long"] - entry_accrued["long"],
+            exit_accrued["short"] - entry_accrued["short"],
+        )
+    return cost
+
+
+def _trade_results(direction, entry_price, exit_price, leverage, trade_size_percentage, initial_balance, cost=0.0):
+    # Sizes, profits and compounded balances of closed trades, net of costs
+    trade_return = direction * (exit_price - entry_price) / entry_price - cost
+
+    # The balance only changes when a trade closes, so it compounds per trade
+    growth = 1 + trade_size_percentage * leverage * trade_return
+    balance = initial_balance * np.cumprod(growth)
+    balance_before = np.concatenate(([initial_balance], balance))[:-1]
+    position_size = balance_before * trade_size_percentage * leverage
+
+    return {
+        "direction": direction,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "position_size": position_size,
+        "profit": position_size * trade_return,
+        "cost": position_size * cost,
+        "balance": balance,
+    }
+
+
+def summarize(trades, initial_balance=10000):
+    """
+    Summary metrics for the output of `simulate_trades`.
+
+    Returns
+    -------
+    dict
+        Final balance, profit percent, trade count, win rate, max drawdown and open position.
+    """
+    balance = trades["balance"]
+    profit = trades["profit"]
+    closed = len(balance)
+
+    final_balance = float(balance[-1]) if closed else initial_balance
+    equity = np.concatenate(([initial_balance], balance))
+    drawdown = 1 - equity / np.maximum.accumulate(equity)
+    return {
+        "initial_balance": initial_balance,
+        "final_balance": final_balance,
+        "profit_percent": (final_balance - initial_balance) / initial_balance * 100,
+        "trades": closed,
+        "win_rate": float((profit > 0).mean()) if closed else 0.0,
+        "max_drawdown_percent": float(drawdown.max()) * 100,
+        "open_position": trades["open_position"],
+    }
+
+
+def run_backtest(data, leverage=5, trade_size_percentage=0.1, initial_balance=10000,
+                 take_profit_percent=None, stop_loss_percent=None, fee_percent=0.0, costs=None):
+    """
+    Simulate the strategy on a DataFrame of signals with array operations.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Historical data with 'Close' and 'Position' (1 long, -1 short, 0 flat, NaN no signal) columns.
+    leverage : float
+        Leverage applied to each trade (e.g., 5 for 5x leverage).
+    trade_size_percentage : float
+        Fraction of the balance used for each trade, as in `trade_settings` (e.g., 0.1 for 10%).
+    initial_balance : float
+        Starting balance in USD.
+    take_profit_percent : float, optional
+        Take-profit level in percent, see `check_risk_management`. Disabled if None.
+    stop_loss_percent : float, optional
+        Stop-loss level in percent, see `check_risk_management`. Disabled if None.
+    fee_percent : float
+        Position fee in percent of the notional, charged on open and close.
+    costs : CostTable, optional
+        Borrow and funding rates over time, looked up on the index of
+        `data`. No holding costs if None.
+
+    Returns
+    -------
+    trades : pandas.DataFrame
+        One row per closed trade with entry/exit times and prices, size, profit net of costs, cost and balance.
+    metrics : dict
+        Summary metrics: final balance, profit percent, trade count, win rate and max drawdown.
+    """
+    result = simulate_trades(
+        data["Close"].to_numpy(dtype=np.float64),
+        data["Position"].to_numpy(dtype=np.float64),
+        leverage=leverage,
+        trade_size_percentage=trade_size_percentage,
+        initial_balance=initial_balance,
+        take_profit_percent=take_profit_percent,
+        stop_loss_percent=stop_loss_percent,
+        fee_percent=fee_percent,
+        holding_costs=None if costs is None else costs.accrued(data.index),
+    )
+
+    trades = _trade_frame(result, data.index[result["entries"]], data.index[result["exits"]])
+    return trades, summarize(result, initial_balance)
+
+
+def _trade_frame(result, entry_times, exit_times):
+    return pd.DataFrame({
+        "Entry_Time": entry_times,
+        "Exit_Time": exit_times,
+        "Direction": result["direction"].astype(np.int64),
+        "Entry_Price": result["entry_price"],
+        "Exit_Price": result["exit_price"],
+        "Position_Size": result["position_size"],
+        "Profit": result["profit"],
+        "Cost": result["cost"],
+        "Balance": result["balance"],
+        "Exit_Reason": result["exit_reason"],
+    })
+
+
+class ChunkedSimulation:
+    """
+    `simulate_trades` over bars pushed in chunks.
+
+    The open trade, the last signal and the pending entry are carried across
+    chunk boundaries, so the trades match a single `simulate_trades` call
+    on the concatenated arrays exactly. Only the closed trades are kept,
+    stored column-wise per chunk.
+
+    Parameters
+    ----------
+    take_profit_percent : float, optional
+        Take-profit level in percent. Disabled if None.
+    stop_loss_percent : float, optional
+        Stop-loss level in percent. Disabled if None.
+    """
+
+    def __init__(self, take_profit_percent=None, stop_loss_percent=None):
+        self.risk_managed = not (take_profit_percent is None and stop_loss_percent is None)
+        self.take_profit_percent = np.inf if take_profit_percent is None else take_profit_percent
+        self.stop_loss_percent = np.inf if stop_loss_percent is None else stop_loss_percent
+        self.previous = 0.0  # Last valid signal, for signal-only exits
+        self.open = None  # (entry time, direction, entry price) of the trade in progress
+        self.index_dtype = None
+        self._closed = []  # Trades closed in the current chunk
+        self._parts = []  # Per chunk: (entry times, exit times, direction, entry price, exit price, reasons)
+
+    def push(self, index, close, signal):
+        """
+        Add one chunk of bars.
+
+        Parameters
+        ----------
+        index : array-like
+            Bar times, used for the trade entry and exit times.
+        close : numpy.ndarray
+            Close prices.
+        signal : numpy.ndarray
+            Position signal per bar (1 long, -1 short, 0 flat, NaN no signal).
+        """
+        index = pd.Index(index)
+        close = np.asarray(close, dtype=np.float64)
+        signal = np.asarray(signal, dtype=np.float64)
+        if self.index_dtype is None:
+            self.index_dtype = index.dtype
+        if self.risk_managed:
+            self._push_risk_managed(index, close, signal)
+        else:
+            self._push_signal(index, close, signal)
+
+        if self._closed:
+            entry_time, exit_time, direction, entry_price, exit_price, reasons = zip(*self._closed)
+            self._parts.append((
+                pd.Index(entry_time, dtype=self.index_dtype),
+                pd.Index(exit_time, dtype=self.index_dtype),
+                np.asarray(direction, dtype=np.float64),
+                np.asarray(entry_price, dtype=np.float64),
+                np.asarray(exit_price, dtype=np.float64),
+                np.asarray(reasons, dtype=object),
+            ))
+            self._closed = []
+
+    def _close(self, time, price, reason):
+        entry_time, direction, entry_price = self.open
+        self._closed.append((entry_time, time, direction, entry_price, price, reason))
+        self.open = None
+
+    def _push_signal(self, index, close, signal):
+        # `_signal_trades` with the previous valid signal carried in
+        valid_rows = np.flatnonzero(~np.isnan(signal))
+        values = signal[valid_rows]
+        previous = np.concatenate(([self.previous], values[:-1]))
+        changes = valid_rows[((values != 0) & (previous == 0)) | ((values == 0) & (previous != 0))]
+        for row in changes:
+            if self.open is None:
+                self.open = (index[row], signal[row], close[row])
+            else:
+                self._close(index[row], close[row], "signal")
+        if len(values):
+            self.previous = values[-1]
+
+    def _push_risk_managed(self, index, close, signal):
+        # `_risk_managed_trades` with the trade in progress carried in
+        n = len(signal)
+        valid = ~np.isnan(signal)
+        next_entry = np.append(_next_index(valid & (signal != 0)), n)
+        next_flat = np.append(_next_index(valid & (signal == 0)), n)
+
+        row = 0
+        while row < n:
+            if self.open is None:
+                row = next_entry[row]
+                if row == n:
+                    break
+                self.open = (index[row], signal[row], close[row])
+                row += 1
+                continue
+
+            _, direction, entry_price = self.open
+            signal_exit = next_flat[row]
+            held = close[row:signal_exit + 1]
+            if direction > 0:
+                take_profit = held >= entry_price * (1 + self.take_profit_percent / 100)
+                stop_loss = held <= entry_price * (1 - self.stop_loss_percent / 100)
+            else:
+                take_profit = held <= entry_price * (1 - self.take_profit_percent / 100)
+                stop_loss = held >= entry_price * (1 + self.stop_loss_percent / 100)
+
+            hit = take_profit | stop_loss
+            if hit.any():
+                offset = int(np.argmax(hit))
+                exit_row = row + offset
+                reason = "take_profit" if take_profit[offset] else "stop_loss"
+            elif signal_exit < n:
+                exit_row = signal_exit
+                reason = "signal"
+            else:
+                # Still open at the end of this chunk
+                break
+            self._close(index[exit_row], close[exit_row], reason)
+            row = exit_row + 1
+
+    def result(self, leverage=5, trade_size_percentage=0.1, initial_balance=10000, fee_percent=0.0, costs=None):
+        """
+        Per-trade arrays in the layout `simulate_trades` returns, with
+        'entry_time' and 'exit_time' indexes in place of row numbers.
+        Holding costs are looked up in `costs` at the entry and exit times.
+        """
+        if self._parts:
+            entry_time, exit_time, direction, entry_price, exit_price, reasons = zip(*self._parts)
+            entry_time = entry_time[0].append(list(entry_time[1:]))
+            exit_time = exit_time[0].append(list(exit_time[1:]))
+            direction, entry_price, exit_price, reasons = (
+                np.concatenate(column) for column in (direction, entry_price, exit_price, reasons)
+            )
+        else:
+            entry_time = exit_time = pd.Index([], dtype=self.index_dtype)
+            direction = entry_price = exit_price = np.empty(0)
+            reasons = np.empty(0, dtype=object)
+        entry_accrued = exit_accrued = None
+        if costs is not None:
+            entry_accrued = costs.accrued(entry_time)
+            exit_accrued = costs.accrued(exit_time)
+        cost = _trade_costs(direction, entry_accrued, exit_accrued, fee_percent)
+        result = _trade_results(direction, entry_price, exit_price, leverage, trade_size_percentage, initial_balance, cost)
+        result.update(
+            entry_time=entry_time,
+            exit_time=exit_time,
+            exit_reason=reasons,
+            open_position=0 if self.open is None else int(self.open[1]),
+        )
+        return result
+
+
+def run_backtest_chunked(chunks, leverage=5, trade_size_percentage=0.1, initial_balance=10000,
+                         take_profit_percent=None, stop_loss_percent=None,
+                         bb_length=20, bb_deviation=2, rsi_length=14, volume_ma_length=200, rules=None,
+                         fee_percent=0.0, costs=None):
+    """
+    Indicators, `apply_strategy` and the backtest over data read in chunks.
+
+    Produces the same trades and metrics as computing the NumPy backend's
+    BBANDS / RSI / SMA columns on the whole history, calling
+    `apply_strategy` and `run_backtest`, while holding only one chunk plus
+    one indicator block (a few thousand bars) in memory.
+
+    Parameters
+    ----------
+    chunks : iterable of pandas.DataFrame
+        Consecutive pieces of the history, oldest first, each with 'Close'
+        and 'Volume' columns on a time index.
+    bb_length, bb_deviation : int, float
+        Bollinger Band period and width in standard deviations.
+    rsi_length : int
+        RSI period.
+    volume_ma_length : int
+        Volume moving average period.
+    rules : CompiledRules, optional
+        Long and short rules, see `apply_strategy`.
+
+    See `run_backtest` for the remaining parameters and the return values.
+    """
+    bands = StreamingMeanStd(bb_length)
+    rsi = StreamingRSI(rsi_length)
+    volume_ma = StreamingMeanStd(volume_ma_length, with_stddev=False)
+    simulation = ChunkedSimulation(take_profit_percent, stop_loss_percent)
+    rules = rules or compile_rules(BACKTEST_STRATEGY)
+
+    # Bars waiting for their slowest indicator, and indicator values waiting for their bars
+    pending = None
+    outputs = {"middleband": [], "deviation": [], "RSI": [], "Volume_MA": []}
+    previous_position = np.nan  # Last unshifted position, shifted into the next chunk
+    previous_values = None  # Indicators of the last released bar, for crossing rules
+
+    def collect(band_values, rsi_values, volume_values):
+        outputs["middleband"].append(band_values[0])
+        outputs["deviation"].append(band_values[1])
+        outputs["RSI"].append(rsi_values)
+        outputs["Volume_MA"].append(volume_values[0])
+
+    def release():
+        nonlocal pending, previous_position, previous_values
+        columns = {name: np.concatenate(values) if values else np.empty(0) for name, values in outputs.items()}
+        ready = min(len(values) for values in columns.values())
+        if ready == 0:
+            return
+        frame = pending.iloc[:ready].copy()
+        frame["upperband"] = columns["middleband"][:ready] + bb_deviation * columns["deviation"][:ready]
+        frame["middleband"] = columns["middleband"][:ready]
+        frame["lowerband"] = columns["middleband"][:ready] - bb_deviation * columns["deviation"][:ready]
+        frame["RSI"] = columns["RSI"][:ready]
+        frame["Volume_MA"] = columns["Volume_MA"][:ready]
+        apply_strategy(frame, rules, previous_values)
+        unshifted = frame["Short"].iloc[-1] or frame["Long"].iloc[-1]
+        if rules.uses_previous:
+            previous_values = {name: frame[BACKTEST_COLUMNS.get(name, name)].iloc[-1] for name in rules.indicators}
+        frame.iloc[0, frame.columns.get_loc("Position")] = previous_position
+        previous_position = unshifted
+        simulation.push(frame.index, frame["Close"].to_numpy(), frame["Position"].to_numpy())
+
+        pending = pending.iloc[ready:]
+        for name, values in columns.items():
+            outputs[name] = [values[ready:]]
+
+    for chunk in chunks:
+        bars = chunk[["Close", "Volume"]].astype(np.float64)
+        pending = bars if pending is None else pd.concat([pending, bars])
+        close = bars["Close"].to_numpy()
+        collect(bands.push(close), rsi.push(close), volume_ma.push(bars["Volume"].to_numpy()))
+        release()
+    if pending is not None:
+        collect(bands.finish(), rsi.finish(), volume_ma.finish())
+        release()
+
+    result = simulation.result(leverage, trade_size_percentage, initial_balance, fee_percent, costs)
+    trades = _trade_frame(result, result["entry_time"], result["exit_time"])
+    return trades, summarize(result, initial_balance)
@@ -0,0 +1,70 @@
+import argparse
+import time
+
+import numpy as np
+
+import ta_numpy
+
+# (function name, keyword arguments) benchmarked on both backends
+CASES = (
+    ("SMA", {"timeperiod": 20}),
+    ("STDDEV", {"timeperiod": 20, "nbdev": 1}),
+    ("BBANDS", {"timeperiod": 20, "nbdevup": 2, "nbdevdn": 2, "matype": 0}),
+    ("RSI", {"timeperiod": 14}),
+    ("SMA", {"timeperiod": 200}),
+)
+
+
+def _best_time(func, values, kwargs, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(values, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _max_relative_error(expected, actual):
+    expected = np.atleast_2d(np.asarray(expected))
+    actual = np.atleast_2d(np.asarray(actual))
+    if not np.array_equal(np.isnan(expected), np.isnan(actual)):
+        return np.inf
+    valid = ~np.isnan(expected)
+    if not valid.any():
+        return 0.0
+    return float(np.max(np.abs(expected[valid] - actual[valid]) / np.maximum(np.abs(expected[valid]), 1e-12)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the NumPy indicator backend against TA-Lib - ACID."
+    )
+    parser.add_argument("--bars", help="Number of bars per array.", type=int, default=1_000_000)
+    parser.add_argument("--repeat", help="Runs per case; the best time is reported.", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    close = 3000 * np.exp(np.cumsum(rng.normal(0, 0.002, args.bars)))
+
+    try:
+        import talib
+    except ImportError:
+        talib = None
+        print("TA-Lib is not installed; timing the NumPy backend only.")
+
+    print(f"{'case':<14}{'numpy Mbars/s':>15}{'talib Mbars/s':>15}{'max rel err':>14}")
+    for name, kwargs in CASES:
+        label = f"{name}({kwargs['timeperiod']})"
+        numpy_time, numpy_result = _best_time(getattr(ta_numpy, name), close, kwargs, args.repeat)
+        numpy_rate = args.bars / numpy_time / 1e6
+        if talib is None:
+            print(f"{label:<14}{numpy_rate:>15.1f}{'-':>15}{'-':>14}")
+            continue
+        talib_time, talib_result = _best_time(getattr(talib, name), close, kwargs, args.repeat)
+        error = _max_relative_error(talib_result, numpy_result)
+        print(f"{label:<14}{numpy_rate:>15.1f}{args.bars / talib_time / 1e6:>15.1f}{error:>14.2e}")
+
+
+if __name__ == "__main__":
+    main()
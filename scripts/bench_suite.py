@@ -0,0 +1,471 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import ta_numpy
+
+# Strategy used by every case, independent of the placeholder values in utils/strategy.yaml
+BENCH_STRATEGY = {
+    "bollinger_bands": {"length": 20, "multiplier": 2.0},
+    "rsi": {"length": 14, "overbought": 70, "oversold": 30},
+    "volume": {"moving_avg_length": 50},
+    "risk_management": {"take_profit_percent": 10, "stop_loss_percent": 5},
+}
+
+# The per-position Python loop is timed on at most this many positions
+MAX_SCALAR_POSITIONS = 1_000_000
+
+# Order parameter builds per timed run
+ORDER_BUILDS = 10_000
+
+DEFAULT_BASELINE = os.path.join("data", "bench", "baseline.json")
+DEFAULT_GMX_FIXTURE = os.path.join("utils", "gmx_snapshot.json")
+
+# Stats in the GMX fixture; the full snapshot would record thousands of calls
+FIXTURE_STATS = ("available_markets", "oracle_prices")
+
+# Token and market metadata in the layout MarketCache stores, for order building without a chain scan
+_WETH = "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1"
+_USDC = "0xaf88d065e77c8cC2239327C5EDb3A432268e5831"
+_ETH_MARKET = "0x70d95587d40A2caf56bd97485aB3Eec10Bee6336"
+MARKET_FIXTURE = {
+    "markets": {
+        _ETH_MARKET: {
+            "gmx_market_address": _ETH_MARKET,
+            "market_symbol": "ETH",
+            "index_token_address": _WETH,
+            "long_token_address": _WETH,
+            "short_token_address": _USDC,
+        },
+    },
+    "tokens": {
+        _WETH: {"symbol": "ETH", "address": _WETH, "decimals": 18},
+        _USDC: {"symbol": "USDC", "address": _USDC, "decimals": 6},
+    },
+}
+
+
+def synthetic_ohlcv(bars, seed=0):
+    """
+    Reproducible OHLCV candles from a geometric random walk.
+
+    Parameters
+    ----------
+    bars : int
+        Number of candles.
+    seed : int
+        Random seed; the same seed always gives the same candles.
+
+    Returns
+    -------
+    pandas.DataFrame
+        'Open', 'High', 'Low', 'Close' and 'Volume' columns on a 15-minute DatetimeIndex.
+    """
+    rng = np.random.default_rng(seed)
+    close = 3000 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.001, bars)) * close
+    volume = rng.lognormal(10, 0.5, bars)
+    index = pd.date_range("2020-01-01", periods=bars, freq="15min", name="Timestamp")
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + spread,
+        "Low": np.minimum(open_, close) - spread,
+        "Close": close,
+        "Volume": volume,
+    }, index=index)
+
+
+def _with_indicators(data):
+    # Columns apply_strategy expects, as backtest.py adds them
+    close = data["Close"].to_numpy()
+    data = data.copy()
+    data["upperband"], data["middleband"], data["lowerband"] = ta_numpy.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2)
+    data["RSI"] = ta_numpy.RSI(close, timeperiod=14)
+    data["Volume_MA"] = ta_numpy.SMA(data["Volume"].to_numpy(), timeperiod=50)
+    return data
+
+
+def _positions(count, price, seed=0):
+    rng = np.random.default_rng(seed)
+    direction = rng.choice([1, -1], count)
+    entry_price = price * np.exp(rng.normal(0, 0.05, count))
+    current_price = entry_price * np.exp(rng.normal(0, 0.05, count))
+    return direction, entry_price, current_price
+
+
+def _case_generate_signals(bars):
+    import acid_bot
+    from rules import compile_rules
+
+    data = synthetic_ohlcv(bars)
+    rules = compile_rules(BENCH_STRATEGY)  # Compiled once, as the bot does at startup
+    return lambda: acid_bot.generate_signals(data, BENCH_STRATEGY, rules)
+
+
+def _case_apply_strategy(bars):
+    from backtest_engine import apply_strategy
+
+    data = _with_indicators(synthetic_ohlcv(bars))
+    return lambda: apply_strategy(data)
+
+
+def _case_backtest(bars):
+    from backtest_engine import apply_strategy, run_backtest
+
+    data = _with_indicators(synthetic_ohlcv(bars))
+    apply_strategy(data)
+    risk = BENCH_STRATEGY["risk_management"]
+    return lambda: run_backtest(data, take_profit_percent=risk["take_profit_percent"], stop_loss_percent=risk["stop_loss_percent"])
+
+
+def _case_risk_scalar(bars):
+    import acid_bot
+
+    direction, entry_price, current_price = _positions(min(bars, MAX_SCALAR_POSITIONS), 3000)
+    is_long = (direction == 1).tolist()
+    entry_price = entry_price.tolist()
+    current_price = current_price.tolist()
+    risk = BENCH_STRATEGY["risk_management"]
+
+    def run():
+        check = acid_bot.check_risk_management
+        return [
+            check(long, entry, current, risk["take_profit_percent"], risk["stop_loss_percent"])
+            for long, entry, current in zip(is_long, entry_price, current_price)
+        ]
+    return run
+
+
+def _case_risk_batch(bars):
+    from risk_monitor import check_risk_management_batch
+
+    direction, entry_price, current_price = _positions(bars, 3000)
+    risk = BENCH_STRATEGY["risk_management"]
+    return lambda: check_risk_management_batch(
+        direction, entry_price, current_price, risk["take_profit_percent"], risk["stop_loss_percent"]
+    )
+
+
+def _case_order_parameters(bars):
+    from market_cache import MarketCache
+    from preflight import OrderPreflight
+
+    # The market cache reads its file from a scratch directory, so nothing touches the chain
+    directory = tempfile.mkdtemp(prefix="acid-bench-")
+    config = SimpleNamespace(chain="bench")
+    with open(os.path.join(directory, "bench.json"), "w") as file:
+        json.dump(dict(MARKET_FIXTURE, updated_at=time.time()), file)
+    preflight = OrderPreflight(config, None, MarketCache(config, directory=directory, max_age=float("inf")))
+    preflight.build_templates("ETH")
+
+    def run():
+        for i in range(ORDER_BUILDS):
+            preflight.order_parameters(i % 2 == 0, i % 4 < 2, 1000.0 + i, 5, 0.003, "ETH")
+    return run
+
+
+def _case_build_order(bars):
+    import acid_bot
+    from market_cache import MarketCache
+    from preflight import OrderPreflight
+
+    directory = tempfile.mkdtemp(prefix="acid-bench-")
+    config = SimpleNamespace(chain="bench")
+    with open(os.path.join(directory, "bench.json"), "w") as file:
+        json.dump(dict(MARKET_FIXTURE, updated_at=time.time()), file)
+    preflight = OrderPreflight(config, None, MarketCache(config, directory=directory, max_age=float("inf")))
+    preflight.build_templates("ETH")
+    # Warm as after a refresh, so the orders are sized from the cached start token price
+    preflight.gas_limits = {}
+    preflight.refreshed_at = float("inf")
+    preflight.oracle_prices[_USDC] = {"maxPriceFull": "1000000000000000000000000", "minPriceFull": "1000000000000000000000000"}  # $1 at 6 decimals
+
+    def run():
+        with mock.patch.object(acid_bot, "order_preflight", preflight):
+            for i in range(ORDER_BUILDS):
+                acid_bot.build_order(5, i % 2 == 0, 200.0 + i, 0.003, i % 4 < 2, "ETH")
+    return run
+
+
+class FixtureTransport:
+    """
+    Records or replays the JSON-RPC and HTTP traffic of the GMX SDK.
+
+    Inside `active()`, web3's `HTTPProvider.make_request` and
+    `requests.Session.request` are patched. When recording, every request
+    goes out and its response is kept; when replaying, every request is
+    answered from the kept responses and one that was not recorded raises
+    KeyError. Requests are matched on method and parameters or URL.
+
+    Parameters
+    ----------
+    rpc : dict, optional
+        Recorded JSON-RPC responses by request key.
+    http : dict, optional
+        Recorded HTTP responses by request key.
+    record : bool
+        Send requests and record the responses instead of replaying.
+    rpc_url : str, optional
+        RPC endpoint, left out of the HTTP recording.
+    """
+
+    def __init__(self, rpc=None, http=None, record=False, rpc_url=None):
+        self.rpc = {} if rpc is None else rpc
+        self.http = {} if http is None else http
+        self.record = record
+        self.rpc_url = rpc_url
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def rpc_key(method, params):
+        return f"{method} {json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)}"
+
+    @staticmethod
+    def http_key(method, url, params=None):
+        import requests
+
+        return f"{method.upper()} {requests.Request(method, url, params=params).prepare().url}"
+
+    @contextlib.contextmanager
+    def active(self):
+        import requests
+        from web3 import HTTPProvider
+
+        send_rpc = HTTPProvider.make_request
+        send_http = requests.Session.request
+        transport = self
+
+        def make_request(provider, method, params):
+            key = transport.rpc_key(method, params)
+            if transport.record:
+                response = send_rpc(provider, method, params)
+                with transport._lock:
+                    transport.rpc[key] = {name: response[name] for name in ("result", "error") if name in response}
+                return response
+            return {"jsonrpc": "2.0", "id": 0, **transport.rpc[key]}
+
+        def request(session, method, url, params=None, **kwargs):
+            if transport.record:
+                response = send_http(session, method, url, params=params, **kwargs)
+                if url != transport.rpc_url:
+                    with transport._lock:
+                        transport.http[transport.http_key(method, url, params)] = {
+                            "status": response.status_code,
+                            "body": response.text,
+                        }
+                return response
+            recorded = transport.http[transport.http_key(method, url, params)]
+            response = requests.Response()
+            response.status_code = recorded["status"]
+            response._content = recorded["body"].encode()
+            response.encoding = "utf-8"
+            response.url = url
+            return response
+
+        with mock.patch.object(HTTPProvider, "make_request", make_request), \
+                mock.patch.object(requests.Session, "request", request):
+            yield self
+
+
+def _case_gmx_snapshot(bars, fixture_path=DEFAULT_GMX_FIXTURE):
+    if not os.path.exists(fixture_path):
+        return None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import get_gmx_stats
+    except ImportError:
+        return None
+
+    with open(fixture_path, "r") as file:
+        fixture = json.load(file)
+
+    # The SDK getters run unchanged; only their RPC and HTTP responses come from the fixture
+    transport = FixtureTransport(fixture["rpc"], fixture["http"])
+    config = SimpleNamespace(chain=fixture["chain"], rpc=fixture["rpc_url"])
+    stats = tuple(fixture["stats"])
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), transport.active():
+            snapshot = get_gmx_stats.GetGMXv2Stats(config, False, False).get_snapshot(stats)
+        if snapshot.errors:
+            raise RuntimeError(
+                f"Replaying {fixture_path} failed for {', '.join(snapshot.errors)}: {snapshot.errors}; "
+                "re-record it with --record-gmx-fixture"
+            )
+        return snapshot
+    return run
+
+
+def record_gmx_fixture(path=DEFAULT_GMX_FIXTURE, chain="arbitrum", stats=FIXTURE_STATS):
+    """
+    Record the RPC and HTTP responses of one live GetGMXv2Stats snapshot as the gmx_snapshot fixture.
+    """
+    from get_gmx_stats import ConfigManager, GetGMXv2Stats
+
+    config = ConfigManager(chain=chain)
+    config.set_config()
+    transport = FixtureTransport(record=True, rpc_url=config.rpc)
+    with transport.active():
+        snapshot = GetGMXv2Stats(config, to_json=False, to_csv=False).get_snapshot(stats)
+    if snapshot.errors:
+        raise RuntimeError(f"Recording the GMX fixture failed: {snapshot.errors}")
+    fixture = {
+        "chain": chain,
+        "rpc_url": config.rpc,
+        "block_number": snapshot.block_number,
+        "stats": list(stats),
+        "rpc": transport.rpc,
+        "http": transport.http,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(fixture, file, indent=1, sort_keys=True)
+    print(f"Recorded {len(transport.rpc)} RPC and {len(transport.http)} HTTP responses at block {snapshot.block_number} to {path}")
+
+
+# Case name -> setup(bars) returning the timed callable, or None when the case cannot run here
+CASES = {
+    "generate_signals": _case_generate_signals,
+    "apply_strategy": _case_apply_strategy,
+    "backtest": _case_backtest,
+    "risk_scalar": _case_risk_scalar,
+    "risk_batch": _case_risk_batch,
+    "order_parameters": _case_order_parameters,
+    "build_order": _case_build_order,
+    "gmx_snapshot": _case_gmx_snapshot,
+}
+
+# Cases whose work does not depend on the bar count; they run once at the smallest size
+FIXED_SIZE_CASES = ("order_parameters", "build_order", "gmx_snapshot")
+
+
+def _best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_suite(sizes, cases=tuple(CASES), repeat=3, gmx_fixture=DEFAULT_GMX_FIXTURE):
+    """
+    Time every case at every size.
+
+    Returns
+    -------
+    dict
+        "<case>@<bars>" -> best time in seconds. Cases that cannot run here are left out.
+    """
+    results = {}
+    for name in cases:
+        for bars in (sizes[:1] if name in FIXED_SIZE_CASES else sizes):
+            setup = CASES[name]
+            func = setup(bars, gmx_fixture) if name == "gmx_snapshot" else setup(bars)
+            key = f"{name}@{bars}"
+            if func is None:
+                print(f"{key:<28}{'skipped':>12}")
+                continue
+            results[key] = _best_time(func, repeat)
+            print(f"{key:<28}{results[key] * 1000:>12.3f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Cases slower than their baseline time by more than `threshold` (0.25 for 25%).
+
+    Returns
+    -------
+    list of tuple
+        (case, baseline seconds, current seconds) per regression.
+    """
+    regressions = []
+    for key, seconds in results.items():
+        reference = baseline.get(key)
+        if reference is not None and seconds > reference * (1 + threshold):
+            regressions.append((key, reference, seconds))
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, "r") as file:
+        return json.load(file)["results"]
+
+
+def save_baseline(path, results, repeat):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    baseline = {
+        "created_at": time.time(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "results": results,
+    }
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the signal, backtest, risk and order-building hot paths - ACID."
+    )
+    parser.add_argument("--sizes", help="Comma-separated bar counts, up to 10000000.", default="1000,100000,1000000")
+    parser.add_argument("--cases", help=f"Comma-separated cases (default: all of {', '.join(CASES)}).", default=None)
+    parser.add_argument("--repeat", help="Runs per case; the best time is kept.", type=int, default=3)
+    parser.add_argument("--baseline", help="Baseline JSON file.", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", help="Write the results as the new baseline.", action="store_true")
+    parser.add_argument("--threshold", help="Allowed slowdown against the baseline, e.g. 0.25 for 25%%.", type=float, default=0.25)
+    parser.add_argument("--gmx-fixture", help="Recorded GetGMXv2Stats RPC and HTTP responses replayed by gmx_snapshot.", default=DEFAULT_GMX_FIXTURE)
+    parser.add_argument("--record-gmx-fixture", help="Record the GMX fixture from the live chain and exit.", action="store_true")
+    args = parser.parse_args()
+
+    if args.record_gmx_fixture:
+        record_gmx_fixture(args.gmx_fixture)
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    cases = tuple(CASES) if args.cases is None else tuple(args.cases.split(","))
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(unknown)}")
+
+    results = run_suite(sizes, cases, args.repeat, args.gmx_fixture)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, args.repeat)
+        print(f"Saved baseline with {len(results)} cases to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return 0
+
+    regressions = compare(results, load_baseline(args.baseline), args.threshold)
+    for key, reference, seconds in regressions:
+        print(f"[REGRESSION] {key}: {reference * 1000:.3f} ms -> {seconds * 1000:.3f} ms ({seconds / reference - 1:+.0%})")
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}.")
+        return 1
+    print(f"All cases within {args.threshold:.0%} of the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Column files making up one series, in the order they are written on append.
+# The timestamp column is written last, so a row only counts once it is complete.
+COLUMNS = ("open", "high", "low", "close", "volume", "timestamp")
+DTYPES = {
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,
+    "timestamp": np.int64,  # Nanoseconds since epoch, UTC
+}
+
+
+class CandleStore:
+    """
+    Append-only on-disk OHLCV store with a columnar, memory-mapped layout.
+
+    Each (symbol, interval) pair lives in its own directory with one raw
+    binary file per column. Reads return NumPy memmap slices, so pulling
+    the latest window never parses or copies the history.
+
+    Parameters
+    ----------
+    root : str
+        Directory holding the series, e.g. "data/candles".
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._maps = {}
+
+    def _series_dir(self, symbol, interval):
+        return os.path.join(self.root, f"{symbol}_{interval}")
+
+    def _column_path(self, symbol, interval, column):
+        return os.path.join(self._series_dir(symbol, interval), f"{column}.bin")
+
+    def _column_rows(self, symbol, interval, column):
+        path = self._column_path(symbol, interval, column)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // np.dtype(DTYPES[column]).itemsize
+
+    def count(self, symbol, interval):
+        """
+        Number of complete rows stored for a series.
+        """
+        return min(self._column_rows(symbol, interval, column) for column in COLUMNS)
+
+    def _repair(self, symbol, interval):
+        # Drop any half-written tail left behind by an interrupted append
+        rows = self.count(symbol, interval)
+        for column in COLUMNS:
+            path = self._column_path(symbol, interval, column)
+            if os.path.exists(path) and self._column_rows(symbol, interval, column) != rows:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * np.dtype(DTYPES[column]).itemsize)
+        return rows
+
+    def _columns(self, symbol, interval):
+        key = (symbol, interval)
+        if key not in self._maps:
+            rows = self.count(symbol, interval)
+            maps = {}
+            for column in COLUMNS:
+                if rows == 0:
+                    maps[column] = np.empty(0, dtype=DTYPES[column])
+                else:
+                    maps[column] = np.memmap(
+                        self._column_path(symbol, interval, column),
+                        dtype=DTYPES[column],
+                        mode="r",
+                        shape=(rows,),
+                    )
+            self._maps[key] = maps
+        return self._maps[key]
+
+    def last_timestamp(self, symbol, interval):
+        """
+        Timestamp of the newest stored bar.
+
+        Returns
+        -------
+        pandas.Timestamp or None
+            UTC timestamp of the last row, or None if the series is empty.
+        """
+        timestamps = self._columns(symbol, interval)["timestamp"]
+        if len(timestamps) == 0:
+            return None
+        return pd.Timestamp(int(timestamps[-1]), tz="UTC")
+
+    def append(self, symbol, interval, data):
+        """
+        Append new bars to a series.
+
+        Bars older than the last stored one are ignored. A bar with the same
+        timestamp as the last stored one overwrites it in place, so the
+        still-forming candle gets revised on the next fetch.
+
+        Parameters
+        ----------
+        symbol : str
+            Ticker, e.g. "ETH-USD".
+        interval : str
+            Bar interval, e.g. "15m".
+        data : pandas.DataFrame
+            Bars with 'Timestamp', 'Open', 'High', 'Low', 'Close' and 'Volume' columns.
+
+        Returns
+        -------
+        int
+            Number of rows written, including a revised last row.
+        """
+        os.makedirs(self._series_dir(symbol, interval), exist_ok=True)
+        rows = self._repair(symbol, interval)
+        self._maps.pop((symbol, interval), None)
+
+        timestamps = pd.to_datetime(data["Timestamp"], utc=True)
+        values = {
+            "timestamp": timestamps.to_numpy(dtype="datetime64[ns]").astype(np.int64),
+            "open": data["Open"].to_numpy(dtype=np.float64),
+            "high": data["High"].to_numpy(dtype=np.float64),
+            "low": data["Low"].to_numpy(dtype=np.float64),
+            "close": data["Close"].to_numpy(dtype=np.float64),
+            "volume": data["Volume"].to_numpy(dtype=np.float64),
+        }
+
+        start = 0
+        if rows > 0:
+            last = np.fromfile(
+                self._column_path(symbol, interval, "timestamp"),
+                dtype=np.int64,
+                count=1,
+                offset=(rows - 1) * 8,
+            )[0]
+            start = int(np.searchsorted(values["timestamp"], last, side="left"))
+
+        append_from = start
+        if rows > 0 and start < len(values["timestamp"]) and values["timestamp"][start] == last:
+            # Revise the last stored bar in place
+            for column in COLUMNS:
+                itemsize = np.dtype(DTYPES[column]).itemsize
+                with open(self._column_path(symbol, interval, column), "r+b") as f:
+                    f.seek((rows - 1) * itemsize)
+                    f.write(values[column][start:start + 1].astype(DTYPES[column]).tobytes())
+            append_from = start + 1
+
+        for column in COLUMNS:
+            with open(self._column_path(symbol, interval, column), "ab") as f:
+                f.write(values[column][append_from:].astype(DTYPES[column]).tobytes())
+
+        return len(values["timestamp"]) - start
+
+    def window(self, symbol, interval, length):
+        """
+        Zero-copy view of the latest bars.
+
+        Parameters
+        ----------
+        symbol : str
+            Ticker, e.g. "ETH-USD".
+        interval : str
+            Bar interval, e.g. "15m".
+        length : int
+            Maximum number of bars to return.
+
+        Returns
+        -------
+        dict
+            Column name to read-only array view over the last `length` rows.
+        """
+        columns = self._columns(symbol, interval)
+        return {column: values[-length:] for column, values in columns.items()}
+
+    def iter_chunks(self, symbol, interval, chunk_size=1_000_000):
+        """
+        Read a whole series as consecutive DataFrames of at most `chunk_size` bars.
+
+        Chunks are read with plain file reads rather than through the memory
+        map, so pages of earlier chunks do not stay resident and histories
+        larger than RAM can be processed front to back.
+
+        Yields
+        ------
+        pandas.DataFrame
+            'Open', 'High', 'Low', 'Close' and 'Volume' columns on a UTC 'Timestamp' index.
+        """
+        rows = self.count(symbol, interval)
+        for start in range(0, rows, chunk_size):
+            count = min(chunk_size, rows - start)
+            values = {
+                column: np.fromfile(
+                    self._column_path(symbol, interval, column),
+                    dtype=DTYPES[column],
+                    count=count,
+                    offset=start * np.dtype(DTYPES[column]).itemsize,
+                )
+                for column in COLUMNS
+            }
+            yield pd.DataFrame({
+                "Open": values["open"],
+                "High": values["high"],
+                "Low": values["low"],
+                "Close": values["close"],
+                "Volume": values["volume"],
+            }, index=pd.DatetimeIndex(pd.to_datetime(values["timestamp"], utc=True), name="Timestamp"))
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# Stats store columns the holding costs are built from, percent of the notional per period
+COST_COLUMNS = ("borrow_apr_long", "borrow_apr_short", "funding_apr_long", "funding_apr_short")
+
+
+def _nanoseconds(times):
+    # UTC nanoseconds of timestamps, naive times are UTC
+    times = pd.DatetimeIndex(times)
+    if times.tz is None:
+        times = times.tz_localize("UTC")
+    return times.tz_convert("UTC").as_unit("ns").asi8
+
+
+class CostTable:
+    """
+    Time-indexed holding cost rates of one GMX market, per position side.
+
+    Rates are step functions: each recorded rate holds until the next
+    record, the first one also before it and the last one after it. At
+    construction they are integrated into the cost accrued per unit of
+    notional since the first record, so the holding cost of any trade is
+    the difference of two lookups, however many bars it was held for.
+
+    Parameters
+    ----------
+    timestamps : array-like
+        Record times, sorted; naive times are UTC.
+    long_rate, short_rate : numpy.ndarray
+        Cost paid by a long / short position in percent of its notional
+        per `period`. Negative when the side is paid, e.g. by funding.
+    period : str
+        Period the rates are quoted for, e.g. "1h".
+    """
+
+    def __init__(self, timestamps, long_rate, short_rate, period="1h"):
+        self.timestamps = _nanoseconds(timestamps)
+        if len(self.timestamps) == 0:
+            raise ValueError("A cost table needs at least one record")
+        if np.any(np.diff(self.timestamps) < 0):
+            raise ValueError("Cost table timestamps must be sorted")
+        per_nanosecond = 1 / (100 * pd.Timedelta(period).value)
+        self.rates = {
+            "long": np.asarray(long_rate, dtype=np.float64) * per_nanosecond,
+            "short": np.asarray(short_rate, dtype=np.float64) * per_nanosecond,
+        }
+        elapsed = np.diff(self.timestamps).astype(np.float64)
+        self._accrued = {
+            side: np.concatenate(([0.0], np.cumsum(rate[:-1] * elapsed)))
+            for side, rate in self.rates.items()
+        }
+
+    @classmethod
+    def from_store(cls, store, market, start=None, end=None):
+        """
+        Build the table of `market` from a `StatsStore` history.
+
+        The cost of a side is its borrow rate minus the funding it
+        receives, with the rates as recorded from `GetBorrowAPR` and
+        `GetFundingFee` (percent per hour, funding positive when the side
+        is paid). Gaps in a column are filled from the nearest record and
+        missing columns count as zero.
+
+        Parameters
+        ----------
+        store : StatsStore
+            Recorded GMX stats history.
+        market : str
+            Market symbol, e.g. "ETH".
+        start, end : optional
+            Time range to read, default everything stored.
+        """
+        rows = store.read(start, end, markets=[market], columns=list(COST_COLUMNS))
+        if rows.empty:
+            raise ValueError(f"No recorded stats for {market}")
+        rates = rows[list(COST_COLUMNS)].ffill().bfill().fillna(0.0)
+        return cls(
+            rows.index,
+            rates["borrow_apr_long"] - rates["funding_apr_long"],
+            rates["borrow_apr_short"] - rates["funding_apr_short"],
+            period="1h",
+        )
+
+    def accrued(self, timestamps):
+        """
+        Cost accrued per unit of notional since the first record.
+
+        Parameters
+        ----------
+        timestamps : array-like
+            Times to look up, e.g. the bar index of a backtest.
+
+        Returns
+        -------
+        dict
+            'long' and 'short' -> float array aligned with `timestamps`.
+            The difference between a trade's exit and entry values is its
+            holding cost as a fraction of its notional.
+        """
+        times = _nanoseconds(timestamps)
+        row = np.maximum(np.searchsorted(self.timestamps, times, side="right") - 1, 0)
+        since = (times - self.timestamps[row]).astype(np.float64)
+        return {side: self._accrued[side][row] + self.rates[side][row] * since for side in self.rates}
@@ -1,3 +1,7 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
 from utils import _set_paths
 
 print("Setting paths...")
@@ -15,16 +19,60 @@ from gmx_python_sdk.scripts.v2.get.get_oracle_prices import OraclePrices
 from gmx_python_sdk.scripts.v2.get.get_pool_tvl import GetPoolTVL
 from gmx_python_sdk.scripts.v2.get.get_glv_stats import GlvStats
 
-from gmx_python_sdk.scripts.v2.gmx_utils import ConfigManager
+from gmx_python_sdk.scripts.v2.gmx_utils import ConfigManager, create_connection
+
+# Stats collected by GetGMXv2Stats.get_snapshot, each fetched by the getter "get_<name>"
+SNAPSHOT_STATS = (
+    "available_markets",
+    "available_liquidity",
+    "borrow_apr",
+    "claimable_fees",
+    "contract_tvl",
+    "funding_apr",
+    "gm_price",
+    "open_interest",
+    "oracle_prices",
+    "pool_tvl",
+    "glv_stats",
+)
+
+
+@dataclass
+class GMXStatsSnapshot:
+    """
+    Result of one GetGMXv2Stats.get_snapshot call.
+
+    Stats that failed or were not requested are None; `errors` holds the
+    exception for each failed stat and `timings` the seconds each getter took.
+    `block_number` is the block the snapshot started at; the stats were
+    read at that block or later ones.
+    """
+
+    block_number: int = None
+    available_markets: dict = None
+    available_liquidity: dict = None
+    borrow_apr: dict = None
+    claimable_fees: dict = None
+    contract_tvl: dict = None
+    funding_apr: dict = None
+    gm_price: dict = None
+    open_interest: dict = None
+    oracle_prices: dict = None
+    pool_tvl: dict = None
+    glv_stats: dict = None
+    timings: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+    elapsed: float = 0.0
 
 
 class GetGMXv2Stats:
 
-    def __init__(self, config, to_json, to_csv):
+    def __init__(self, config, to_json, to_csv, store=None):
         print("Initializing GetGMXv2Stats...")
         self.config = config
         self.to_json = to_json
         self.to_csv = to_csv
+        self.store = store  # Optional StatsStore every snapshot is appended to
         print(f"Initialized GetGMXv2Stats with to_json={self.to_json} and to_csv={self.to_csv}")
 
     def get_available_liquidity(self):
@@ -93,6 +141,68 @@ class GetGMXv2Stats:
         print("Fetched GLV stats.")
         return result
 
+    def _timed(self, name):
+        getter = getattr(self, f"get_{name}")
+        start = time.perf_counter()
+        try:
+            return getter(), None, time.perf_counter() - start
+        except Exception as e:
+            return None, e, time.perf_counter() - start
+
+    def get_snapshot(self, stats=SNAPSHOT_STATS, max_workers=None):
+        """
+        Fetch several stats concurrently on a thread pool.
+
+        The values are not from a single block. The SDK getters read the
+        latest chain state and take no block argument, so each getter,
+        and each call inside it, can see a later block than the others.
+        `block_number` is the block when the snapshot started, a lower
+        bound for every value in it. When the instance has a `store`, the
+        snapshot is also appended to it.
+
+        Parameters
+        ----------
+        stats : tuple of str
+            Stats to fetch, see SNAPSHOT_STATS.
+        max_workers : int, optional
+            Maximum number of getters running at once. Defaults to one
+            thread per stat, since each getter mostly waits on the network.
+
+        Returns
+        -------
+        GMXStatsSnapshot
+            Fetched stats with per-getter timings and errors.
+        """
+        started_at = time.time()
+        max_workers = max_workers or len(stats)
+        print(f"Fetching snapshot of {len(stats)} stats with {max_workers} workers...")
+        start = time.perf_counter()
+        snapshot = GMXStatsSnapshot()
+        try:
+            snapshot.block_number = create_connection(self.config).eth.block_number
+        except Exception as e:
+            snapshot.errors["block_number"] = e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = dict(zip(stats, executor.map(self._timed, stats)))
+
+        for name, (result, error, elapsed) in results.items():
+            setattr(snapshot, name, result)
+            snapshot.timings[name] = elapsed
+            if error is not None:
+                print(f"[ERROR] Fetching {name} failed: {error}")
+                snapshot.errors[name] = error
+
+        snapshot.elapsed = time.perf_counter() - start
+        print(f"Fetched snapshot at block {snapshot.block_number} in {snapshot.elapsed:.2f}s.")
+
+        if self.store is not None:
+            try:
+                self.store.record(snapshot, started_at)
+            except OSError as e:
+                print(f"[ERROR] Recording snapshot failed: {e}")
+        return snapshot
+
 
 if __name__ == "__main__":
 
@@ -112,48 +222,12 @@ if __name__ == "__main__":
     )
     print("GetGMXv2Stats instance created.")
 
-    print("Fetching markets...")
-    markets = stats_object.get_available_markets()
-    print("Markets fetched:", markets)
-
-    print("Fetching available liquidity...")
-    liquidity = stats_object.get_available_liquidity()
-    print("Available liquidity:", liquidity)
-
-    print("Fetching borrow APR...")
-    borrow_apr = stats_object.get_borrow_apr()
-    print("Borrow APR:", borrow_apr)
-
-    print("Fetching claimable fees...")
-    claimable_fees = stats_object.get_claimable_fees()
-    print("Claimable fees:", claimable_fees)
-
-    print("Fetching contract TVL...")
-    contract_tvl = stats_object.get_contract_tvl()
-    print("Contract TVL:", contract_tvl)
-
-    print("Fetching funding APR...")
-    funding_apr = stats_object.get_funding_apr()
-    print("Funding APR:", funding_apr)
-
-    print("Fetching GM prices...")
-    gm_prices = stats_object.get_gm_price()
-    print("GM prices:", gm_prices)
-
-    print("Fetching open interest...")
-    open_interest = stats_object.get_open_interest()
-    print("Open interest:", open_interest)
-
-    print("Fetching oracle prices...")
-    oracle_prices = stats_object.get_oracle_prices()
-    print("Oracle prices:", oracle_prices)
-
-    print("Fetching pool TVL...")
-    pool_tvl = stats_object.get_pool_tvl()
-    print("Pool TVL:", pool_tvl)
+    print("Fetching stats snapshot...")
+    snapshot = stats_object.get_snapshot()
 
-    print("Fetching GLV stats...")
-    glv_price = stats_object.get_glv_stats()
-    print("GLV stats:", glv_price)
+    for name in SNAPSHOT_STATS:
+        print(f"{name} ({snapshot.timings[name]:.2f}s):", getattr(snapshot, name))
+    for name, error in snapshot.errors.items():
+        print(f"Failed to fetch {name}: {error}")
 
     print("Execution completed.")
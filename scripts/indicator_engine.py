@@ -0,0 +1,266 @@
+import numpy as np
+import pandas as pd
+
+from rules import compile_rules
+
+
+class RingBuffer:
+    """
+    Fixed-size float ring buffer backed by a preallocated NumPy array.
+
+    Pushing a value overwrites the oldest slot once the buffer is full and
+    returns the evicted value, so rolling sums can be kept up to date in O(1).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.values = np.zeros(self.capacity, dtype=np.float64)
+        self.head = 0  # Slot the next push will write to
+        self.count = 0
+
+    def push(self, value):
+        evicted = self.values[self.head] if self.count == self.capacity else np.nan
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        return evicted
+
+    def full(self):
+        return self.count == self.capacity
+
+    def state(self):
+        return self.head, self.count, self.values[self.head]
+
+    def restore(self, state):
+        head, count, value = state
+        self.head = head
+        self.count = count
+        self.values[head] = value
+
+
+class RollingWindow:
+    """
+    Rolling mean and population standard deviation over a RingBuffer.
+
+    Sums are refreshed from the buffer every time it wraps, which bounds the
+    floating point drift of the running sums at amortised O(1) cost.
+    """
+
+    def __init__(self, length):
+        self.length = int(length)
+        self.buffer = RingBuffer(self.length)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value):
+        evicted = self.buffer.push(value)
+        if np.isnan(evicted):
+            self.total += value
+            self.total_sq += value * value
+        else:
+            self.total += value - evicted
+            self.total_sq += value * value - evicted * evicted
+        if self.buffer.head == 0:
+            self.total = float(self.buffer.values.sum())
+            self.total_sq = float(np.dot(self.buffer.values, self.buffer.values))
+
+    def mean(self):
+        if not self.buffer.full():
+            return np.nan
+        return self.total / self.length
+
+    def stddev(self):
+        if not self.buffer.full():
+            return np.nan
+        mean = self.total / self.length
+        variance = self.total_sq / self.length - mean * mean
+        return np.sqrt(variance) if variance > 0 else 0.0
+
+    def state(self):
+        return self.buffer.state(), self.total, self.total_sq
+
+    def restore(self, state):
+        buffer_state, self.total, self.total_sq = state
+        self.buffer.restore(buffer_state)
+
+
+class WilderRSI:
+    """
+    Relative Strength Index with Wilder smoothing, seeded like TA-Lib's RSI
+    (simple average of the first `length` changes, NaN before that).
+    """
+
+    def __init__(self, length):
+        self.length = int(length)
+        self.prev_close = np.nan
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.changes = 0
+
+    def push(self, close):
+        if not np.isnan(self.prev_close):
+            change = close - self.prev_close
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            self.changes += 1
+            if self.changes <= self.length:
+                self.avg_gain += gain / self.length
+                self.avg_loss += loss / self.length
+            else:
+                self.avg_gain = (self.avg_gain * (self.length - 1) + gain) / self.length
+                self.avg_loss = (self.avg_loss * (self.length - 1) + loss) / self.length
+        self.prev_close = close
+
+    def value(self):
+        if self.changes < self.length:
+            return np.nan
+        total = self.avg_gain + self.avg_loss
+        if total == 0:
+            return 0.0
+        return 100.0 * self.avg_gain / total
+
+    def state(self):
+        return self.prev_close, self.avg_gain, self.avg_loss, self.changes
+
+    def restore(self, state):
+        self.prev_close, self.avg_gain, self.avg_loss, self.changes = state
+
+
+class IndicatorEngine:
+    """
+    Stateful indicator engine for the live bot.
+
+    Keeps Bollinger Band mean/stddev, Wilder RSI and the volume moving average
+    up to date with O(1) work per bar on preallocated buffers, instead of
+    recomputing every indicator over the whole DataFrame on each iteration.
+    Signals come from the strategy's rules, compiled once here.
+
+    Parameters
+    ----------
+    strategy : dict
+        Strategy configuration dictionary containing parameters for Bollinger Bands, RSI, and Volume.
+    """
+
+    def __init__(self, strategy):
+        self.bb_length = strategy["bollinger_bands"]["length"]
+        self.bb_multiplier = strategy["bollinger_bands"]["multiplier"]
+        self.rules = compile_rules(strategy)
+
+        self.bb = RollingWindow(self.bb_length)
+        self.rsi = WilderRSI(strategy["rsi"]["length"])
+        self.volume_ma = RollingWindow(strategy["volume"]["moving_avg_length"])
+
+        self.last_timestamp = None
+        self.last_close = np.nan
+        self.last_volume = np.nan
+        self._previous = None  # Indicator values of the bar before the last, for crossing rules
+        self._undo = None
+
+    def _state(self):
+        return (
+            self.bb.state(),
+            self.rsi.state(),
+            self.volume_ma.state(),
+            self.last_timestamp,
+            self.last_close,
+            self.last_volume,
+            self._previous,
+        )
+
+    def _restore(self, state):
+        bb_state, rsi_state, volume_state, self.last_timestamp, self.last_close, self.last_volume, self._previous = state
+        self.bb.restore(bb_state)
+        self.rsi.restore(rsi_state)
+        self.volume_ma.restore(volume_state)
+
+    def update(self, timestamp, close, volume):
+        """
+        Feed one bar into the engine.
+
+        A bar with the same timestamp as the previous one replaces it, which
+        is how the still-forming candle returned by yfinance gets revised.
+
+        Parameters
+        ----------
+        timestamp : datetime-like
+            Bar open time.
+        close : float
+            Bar close price.
+        volume : float
+            Bar volume.
+        """
+        if self._undo is not None and timestamp == self.last_timestamp:
+            self._restore(self._undo)
+        self._undo = self._state()
+        if self.rules.uses_previous and self.last_timestamp is not None:
+            self._previous = self._values()
+
+        close = float(close)
+        volume = float(volume)
+        self.bb.push(close)
+        self.rsi.push(close)
+        self.volume_ma.push(volume)
+        self.last_timestamp = timestamp
+        self.last_close = close
+        self.last_volume = volume
+
+    def update_from_frame(self, data):
+        """
+        Feed every bar of `data` that is not older than the last bar seen.
+
+        Parameters
+        ----------
+        data : pandas.DataFrame
+            Historical data containing 'Timestamp', 'Close' and 'Volume' columns.
+
+        Returns
+        -------
+        pandas.Series
+            The latest signal, see `latest_signal`.
+        """
+        timestamps = data["Timestamp"]
+        start = 0
+        if self.last_timestamp is not None:
+            start = int(timestamps.searchsorted(self.last_timestamp, side="left"))
+        closes = data["Close"].to_numpy(dtype=np.float64)
+        volumes = data["Volume"].to_numpy(dtype=np.float64)
+        for i in range(start, len(timestamps)):
+            self.update(timestamps.iloc[i], closes[i], volumes[i])
+        return self.latest_signal()
+
+    def _values(self):
+        # Indicator values of the last bar, named as in the rules
+        bb_ma = self.bb.mean()
+        bb_std = self.bb.stddev()
+        return {
+            "Close": self.last_close,
+            "Volume": self.last_volume,
+            "Volume_MA": self.volume_ma.mean(),
+            "BB_MA": bb_ma,
+            "BB_Upper": bb_ma + self.bb_multiplier * bb_std,
+            "BB_Lower": bb_ma - self.bb_multiplier * bb_std,
+            "RSI": self.rsi.value(),
+        }
+
+    def latest_signal(self):
+        """
+        Build the latest signal row in the same shape `generate_signals` returns.
+
+        Returns
+        -------
+        pandas.Series
+            The latest bar with indicator values, signal flags and 'Position'.
+        """
+        values = self._values()
+        # NaN comparisons are False, matching the array rules during warm-up
+        long_signal, short_signal, position = self.rules.latest(values, self._previous)
+
+        return pd.Series({
+            "Timestamp": self.last_timestamp,
+            **values,
+            "High_Volume": bool(values["Volume"] > values["Volume_MA"]),
+            "Long_Signal": long_signal,
+            "Short_Signal": short_signal,
+            "Position": position,
+        })
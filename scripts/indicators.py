@@ -0,0 +1,37 @@
+import os
+
+# Backend used when get_ta is called without one: "talib", "numpy" or "auto"
+TA_BACKEND_ENV = "ACID_TA_BACKEND"
+
+
+def get_ta(backend=None):
+    """
+    Return the indicator module to use, `talib` or its NumPy stand-in `ta_numpy`.
+
+    Parameters
+    ----------
+    backend : str, optional
+        "talib", "numpy" or "auto". Defaults to the ACID_TA_BACKEND
+        environment variable, then "auto", which prefers TA-Lib when it is
+        installed and falls back to NumPy otherwise.
+
+    Returns
+    -------
+    module
+        A module exposing SMA, STDDEV, BBANDS and RSI with TA-Lib signatures.
+    """
+    backend = backend or os.environ.get(TA_BACKEND_ENV, "auto")
+    if backend == "numpy":
+        import ta_numpy
+        return ta_numpy
+    if backend == "talib":
+        import talib
+        return talib
+    if backend == "auto":
+        try:
+            import talib
+            return talib
+        except ImportError:
+            import ta_numpy
+            return ta_numpy
+    raise ValueError(f"Unknown indicator backend: {backend}")
@@ -0,0 +1,108 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Level used when setup_logging is called without one, e.g. "DEBUG" or "WARNING"
+LOG_LEVEL_ENV = "ACID_LOG_LEVEL"
+
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message and any `fields`.
+
+    Pass structured data as `log.info("Order sent", extra={"fields": {...}})`.
+    Records are formatted later on the writer thread, so pass copies of
+    anything the caller keeps mutating.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # The stock handler formats in the calling thread; the listener thread does it here
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level=None, path=None):
+    """
+    Send the bot's log records through a queue to a background writer thread.
+
+    Callers only enqueue the record; message formatting and JSON
+    serialization happen on the writer thread. Records below the level are
+    dropped before any formatting, so guarded debug calls cost close to nothing.
+    Arguments and `fields` are formatted later on the writer thread, so pass
+    copies of anything that is mutated after the call.
+
+    Parameters
+    ----------
+    level : str or int, optional
+        Minimum level. Defaults to the ACID_LOG_LEVEL environment variable, then INFO.
+    path : str, optional
+        Also append JSON lines to this file.
+
+    Returns
+    -------
+    logging.Logger
+        The "acid" parent logger.
+    """
+    global _listener
+    level = level or os.environ.get(LOG_LEVEL_ENV, "INFO")
+    root = logging.getLogger("acid")
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.propagate = False
+    if _listener is not None:
+        return root
+
+    formatter = JSONFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if path is not None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handlers.append(logging.FileHandler(path))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    root.addHandler(_DeferredQueueHandler(records))
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return root
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the writer thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name):
+    """
+    Logger for one module under the "acid" parent, e.g. get_logger("acid_bot").
+    """
+    return logging.getLogger(f"acid.{name}")
+
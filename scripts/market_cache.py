@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+import time
+
+
+class MarketCache:
+    """
+    Persistent cache of GMX market and token metadata for one chain.
+
+    Market listings rarely change, so they are loaded from disk when fresh
+    enough and only re-scanned on explicit invalidation, when the file is
+    older than `max_age`, or by the optional background refresh.
+
+    Parameters
+    ----------
+    config : ConfigManager
+        The GMX configuration object.
+    directory : str
+        Directory the "<chain>.json" cache file is kept in.
+    max_age : float
+        Seconds before a cached listing is considered stale.
+    """
+
+    def __init__(self, config, directory=os.path.join("data", "metadata"), max_age=24 * 60 * 60):
+        self.config = config
+        self.path = os.path.join(directory, f"{config.chain}.json")
+        self.max_age = max_age
+        self._data = None
+        self._lock = threading.Lock()
+        self._stop_refresh = threading.Event()
+        self._refresh_thread = None
+
+    def _fetch(self):
+        from gmx_python_sdk.scripts.v2.get.get_markets import Markets
+        from gmx_python_sdk.scripts.v2.gmx_utils import get_tokens_address_dict
+
+        print(f"[DEBUG] Refreshing market metadata for {self.config.chain}...")
+        return {
+            "updated_at": time.time(),
+            "markets": Markets(self.config).get_available_markets(),
+            "tokens": get_tokens_address_dict(self.config.chain),
+        }
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Unreadable market cache {self.path}: {e}")
+            return None
+
+    def _save(self, data):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(temp_path, self.path)
+
+    def refresh(self):
+        """
+        Re-scan markets and tokens and persist them.
+        """
+        data = self._fetch()
+        with self._lock:
+            self._data = data
+            self._save(data)
+        return data
+
+    def invalidate(self):
+        """
+        Drop the cached metadata in memory and on disk; the next read re-scans.
+        """
+        with self._lock:
+            self._data = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _get(self):
+        with self._lock:
+            if self._data is None:
+                self._data = self._load()
+            data = self._data
+        if data is None or time.time() - data["updated_at"] > self.max_age:
+            data = self.refresh()
+        return data
+
+    def get_markets(self):
+        """
+        Markets keyed by GMX market address, as returned by `Markets.get_available_markets()`.
+        """
+        return self._get()["markets"]
+
+    def get_tokens(self):
+        """
+        Tokens keyed by address, as returned by `get_tokens_address_dict()`.
+        """
+        return self._get()["tokens"]
+
+    def find_market(self, market_symbol):
+        """
+        First market whose symbol matches `market_symbol`, or None.
+        """
+        return next(
+            (details for details in self.get_markets().values() if details.get("market_symbol") == market_symbol),
+            None,
+        )
+
+    def token_address(self, symbol):
+        """
+        Address of the token with `symbol`.
+        """
+        for address, details in self.get_tokens().items():
+            if details.get("symbol") == symbol:
+                return details.get("address", address)
+        raise KeyError(f"Unknown token symbol: {symbol}")
+
+    def token_details(self, address):
+        """
+        Token entry for `address`, including its 'symbol' and 'decimals'.
+        """
+        tokens = self.get_tokens()
+        if address in tokens:
+            return tokens[address]
+        for key, details in tokens.items():
+            if key.lower() == address.lower():
+                return details
+        raise KeyError(f"Unknown token address: {address}")
+
+    def index_token(self, market_symbol):
+        """
+        (address, decimals) of a market's index token, as used by `get_oracle_prices`.
+        """
+        market = self.find_market(market_symbol)
+        if market is None:
+            raise KeyError(f"Unknown market: {market_symbol}")
+        address = market["index_token_address"]
+        return address, self.token_details(address)["decimals"]
+
+    def trading_markets(self, symbols=None):
+        """
+        Perpetual markets keyed by symbol, one per index token, skipping swap-only pools.
+
+        Parameters
+        ----------
+        symbols : list of str, optional
+            Only keep these symbols. Keeps every market if None.
+
+        Returns
+        -------
+        dict
+            Market symbol -> market details, first listed market per symbol.
+        """
+        markets = {}
+        for details in self.get_markets().values():
+            symbol = details.get("market_symbol", "")
+            if symbol.startswith("SWAP") or int(details["index_token_address"], 16) == 0:
+                continue
+            if symbols is not None and symbol not in symbols:
+                continue
+            markets.setdefault(symbol, details)
+        return markets
+
+    def default_collateral(self, index_token_symbol):
+        """
+        Collateral symbol for a market: the index token if the pool holds it, else the pool's long token.
+        """
+        market = self.find_market(index_token_symbol)
+        if market is None:
+            raise KeyError(f"Unknown market: {index_token_symbol}")
+        pool = (market["long_token_address"], market["short_token_address"])
+        try:
+            if self.token_address(index_token_symbol) in pool:
+                return index_token_symbol
+        except KeyError:
+            pass
+        return self.token_details(market["long_token_address"])["symbol"]
+
+    def resolve_order_addresses(self, index_token_symbol, collateral_token_symbol, start_token_symbol):
+        """
+        Addresses `OrderArgumentParser` would otherwise resolve with on-chain scans.
+
+        Returns
+        -------
+        dict
+            'index_token_address', 'market_key', 'collateral_address',
+            'start_token_address' and, when a direct route exists, 'swap_path'.
+        """
+        index_token_address = self.token_address(index_token_symbol)
+        collateral_address = self.token_address(collateral_token_symbol)
+        start_token_address = self.token_address(start_token_symbol)
+        markets = self.get_markets()
+
+        market_key = next(
+            (
+                key for key, details in markets.items()
+                if details["index_token_address"] == index_token_address
+                and collateral_address in (details["long_token_address"], details["short_token_address"])
+            ),
+            None,
+        )
+        if market_key is None:
+            raise KeyError(f"No market for index token {index_token_symbol} with collateral {collateral_token_symbol}")
+
+        addresses = {
+            "index_token_address": index_token_address,
+            "market_key": market_key,
+            "collateral_address": collateral_address,
+            "start_token_address": start_token_address,
+        }
+        if start_token_address == collateral_address:
+            addresses["swap_path"] = []
+        else:
+            # Swap through a pool holding both tokens; otherwise leave routing to the SDK
+            pool = {start_token_address, collateral_address}
+            swap_market = next(
+                (
+                    key for key, details in markets.items()
+                    if {details["long_token_address"], details["short_token_address"]} == pool
+                ),
+                None,
+            )
+            if swap_market is not None:
+                addresses["swap_path"] = [swap_market]
+        return addresses
+
+    def start_background_refresh(self, interval=60 * 60):
+        """
+        Refresh the metadata every `interval` seconds on a daemon thread.
+        """
+        if self._refresh_thread is not None:
+            return
+
+        def refresh_loop():
+            while not self._stop_refresh.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"[ERROR] Background market refresh failed: {e}")
+
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(target=refresh_loop, name="market-cache-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        """
+        Stop the background refresh thread.
+        """
+        self._stop_refresh.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
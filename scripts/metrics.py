@@ -0,0 +1,197 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from sub-millisecond compute to slow RPC calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram: counts per upper bound, plus sum and count.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        (upper bound, cumulative count) pairs ending with +Inf.
+        """
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the `q` quantile, None without observations.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class Metrics:
+    """
+    In-process registry of counters and latency histograms.
+
+    Stages are timed with `timer`, which records the duration into the
+    `<prefix>_stage_duration_seconds` histogram and counts calls and errors.
+    `export` writes everything in the Prometheus text format (for a
+    textfile collector) and appends a JSON line snapshot.
+
+    Parameters
+    ----------
+    prefix : str
+        Prefix of every metric name.
+    buckets : tuple of float
+        Histogram upper bounds in seconds.
+    """
+
+    def __init__(self, prefix="acid", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def _key(self, name, labels):
+        return f"{self.prefix}_{name}", tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, help=None, **labels):
+        """
+        Add `value` to a counter.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            if help is not None:
+                self.help[key[0]] = help
+
+    def observe(self, name, value, help=None, **labels):
+        """
+        Record `value` in a histogram.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+            if help is not None:
+                self.help[key[0]] = help
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Time a block as `stage`, counting calls and errors.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc("stage_errors_total", stage=stage, help="Stage calls that raised.")
+            raise
+        finally:
+            self.observe(
+                "stage_duration_seconds",
+                time.perf_counter() - started,
+                stage=stage,
+                help="Wall time per trading loop stage.",
+            )
+            self.inc("stage_total", stage=stage, help="Stage calls.")
+
+    def to_prometheus(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for kind, series in (("counter", self.counters), ("histogram", self.histograms)):
+                names = sorted({name for name, _ in series})
+                for name in names:
+                    if name in self.help:
+                        lines.append(f"# HELP {name} {self.help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (series_name, labels), value in sorted(series.items()):
+                        if series_name != name:
+                            continue
+                        if kind == "counter":
+                            lines.append(f"{name}{_format_labels(labels)} {value}")
+                            continue
+                        for bound, total in value.cumulative():
+                            bucket_labels = labels + (("le", _format_bound(bound)),)
+                            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {total}")
+                        lines.append(f"{name}_sum{_format_labels(labels)} {value.sum}")
+                        lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        JSON-serializable view: counters, and count/sum/mean/p50/p95 per histogram.
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "mean": histogram.sum / histogram.count if histogram.count else None,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                }
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ]
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+    def export(self, directory):
+        """
+        Write `<prefix>.prom` and append a snapshot line to `<prefix>.jsonl` in `directory`.
+        """
+        os.makedirs(directory, exist_ok=True)
+        prom_path = os.path.join(directory, f"{self.prefix}.prom")
+        temp_path = prom_path + ".tmp"
+        with open(temp_path, "w") as file:
+            file.write(self.to_prometheus())
+        os.replace(temp_path, prom_path)  # Collectors never see a half-written file
+
+        with open(os.path.join(directory, f"{self.prefix}.jsonl"), "a") as file:
+            file.write(json.dumps(self.snapshot()) + "\n")
+
+
+# Registry shared by the bot's modules
+metrics = Metrics()
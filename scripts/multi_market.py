@@ -0,0 +1,294 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from logger import get_logger
+from price_service import get_oracle_prices
+from rules import compile_rules
+
+log = get_logger("multi_market")
+
+
+def _lookback(strategy):
+    # Bars the last-bar indicators need; longer lookbacks than the window have no value
+    return max(
+        strategy["bollinger_bands"]["length"],
+        strategy["volume"]["moving_avg_length"],
+        strategy["rsi"]["length"] + 1,
+    )
+
+
+def _window(values, length):
+    # Last `length` bars per row, all NaN if the window is shorter
+    if length > values.shape[1]:
+        return np.full((values.shape[0], length), np.nan)
+    return values[:, -length:]
+
+
+def _wilder_rsi_last(close, timeperiod):
+    # Wilder RSI of the last bar per row, seeded on the first `timeperiod` changes like TA-Lib
+    if timeperiod >= close.shape[1]:
+        return np.full(close.shape[0], np.nan)
+    change = np.diff(close, axis=1)
+    gain = np.where(change > 0, change, 0.0)
+    loss = np.where(change < 0, -change, 0.0)
+
+    # Closed form of y[i] = y[i-1] * (n-1)/n + x[i]/n applied after the seed
+    decay = (timeperiod - 1) / timeperiod
+    steps = change.shape[1] - timeperiod
+    weights = decay ** np.arange(steps - 1, -1, -1) / timeperiod
+    avg_gain = gain[:, :timeperiod].mean(axis=1) * decay ** steps + gain[:, timeperiod:] @ weights
+    avg_loss = loss[:, :timeperiod].mean(axis=1) * decay ** steps + loss[:, timeperiod:] @ weights
+
+    total = avg_gain + avg_loss
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total != 0, 100.0 * avg_gain / total, 0.0)
+
+
+def _last_bar_indicators(close, volume, strategy):
+    # Indicator values of the last bar per row, named as in the rules
+    bb_length = strategy["bollinger_bands"]["length"]
+    bb_multiplier = strategy["bollinger_bands"]["multiplier"]
+
+    # Only the last bar is needed, so the moving windows reduce to a slice each
+    bb_window = _window(close, bb_length)
+    bb_ma = bb_window.mean(axis=1)
+    bb_std = bb_window.std(axis=1)
+    return {
+        "Close": close[:, -1],
+        "Volume": volume[:, -1],
+        "Volume_MA": _window(volume, strategy["volume"]["moving_avg_length"]).mean(axis=1),
+        "BB_MA": bb_ma,
+        "BB_Upper": bb_ma + bb_multiplier * bb_std,
+        "BB_Lower": bb_ma - bb_multiplier * bb_std,
+        "RSI": _wilder_rsi_last(close, strategy["rsi"]["length"]),
+    }
+
+
+def generate_signals_batch(close, volume, strategy, symbols=None, rules=None):
+    """
+    Latest `generate_signals` row for many markets in one vectorized pass.
+
+    Parameters
+    ----------
+    close : numpy.ndarray
+        Close prices, one row per market, oldest bar first.
+    volume : numpy.ndarray
+        Volumes, same shape as `close`.
+    strategy : dict
+        Strategy configuration, see `generate_signals`.
+    symbols : list of str, optional
+        Market symbols used as the index of the result.
+    rules : CompiledRules, optional
+        Long and short rules compiled from `strategy`; compiled here if None.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per market with the same indicator and signal columns as
+        the row returned by `generate_signals`.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    rules = rules or compile_rules(strategy)
+
+    values = _last_bar_indicators(close, volume, strategy)
+    previous = None
+    if rules.uses_previous:
+        previous = _last_bar_indicators(close[:, :-1], volume[:, :-1], strategy)
+    # One bar per market along the time axis the rules evaluate over
+    long_signal, short_signal, position = rules.signals({name: column[:, None] for name, column in values.items()}, previous)
+
+    return pd.DataFrame({
+        **values,
+        "High_Volume": values["Volume"] > values["Volume_MA"],
+        "Long_Signal": long_signal[:, 0],
+        "Short_Signal": short_signal[:, 0],
+        "Position": position[:, 0],
+    }, index=symbols)
+
+
+class MultiMarketRunner:
+    """
+    Runs the strategy on many GMX markets from one process.
+
+    Every iteration syncs all candle windows concurrently, reads all prices
+    with one oracle request, evaluates the signals of every market in one
+    batched pass and hands the markets that need an order to a thread pool.
+
+    Parameters
+    ----------
+    strategy : dict
+        Strategy configuration.
+    market_cache : MarketCache
+        Source of the market list and token metadata.
+    candle_store : CandleStore
+        Local OHLCV store, one series per market.
+    fetch_candles : callable
+        `fetch_candles(ticker, interval, start)` returning new bars.
+    manage_position : callable
+        `manage_position(state, signal, wallet_balance_usd, price, index_token_symbol=...)`.
+    symbols : list of str, optional
+        Markets to trade. Trades every perpetual market if None.
+    interval : str
+        Bar interval.
+    window : int
+        Number of bars the signals are computed over. Must cover the
+        longest indicator lookback of `strategy`.
+    max_workers : int
+        Threads used for candle downloads and order submission.
+    chain : str
+        Chain for oracle prices.
+    """
+
+    def __init__(self, strategy, market_cache, candle_store, fetch_candles, manage_position, symbols=None,
+                 interval="15m", window=200, max_workers=8, chain="arbitrum"):
+        self.strategy = strategy
+        self.market_cache = market_cache
+        self.candle_store = candle_store
+        self.fetch_candles = fetch_candles
+        self.manage_position = manage_position
+        self.interval = interval
+        self.chain = chain
+        self.rules = compile_rules(strategy)
+        # Rules on the previous bar evaluate the indicators one bar earlier as well
+        lookback = _lookback(strategy) + int(self.rules.uses_previous)
+        if window < lookback:
+            raise ValueError(f"window of {window} bars is shorter than the strategy lookback of {lookback} bars")
+        self.window = window
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="market")
+
+        self.markets = market_cache.trading_markets(symbols)
+        self.tokens = {symbol: market_cache.index_token(symbol) for symbol in self.markets}
+        self.states = {
+            symbol: {"current_position": 0, "current_position_value": 0, "entry_price": 0}
+            for symbol in self.markets
+        }
+        log.info("Multi-market runner started", extra={"fields": {"markets": list(self.markets)}})
+
+    @staticmethod
+    def ticker(symbol):
+        """
+        Yahoo Finance ticker for a market symbol.
+        """
+        return f"{symbol}-USD"
+
+    def _sync(self, symbol):
+        ticker = self.ticker(symbol)
+        try:
+            # Refetch from the last stored bar so the still-forming candle gets revised
+            last_timestamp = self.candle_store.last_timestamp(ticker, self.interval)
+            new_candles = self.fetch_candles(ticker, self.interval, start=last_timestamp)
+            self.candle_store.append(ticker, self.interval, new_candles)
+        except Exception as e:
+            log.error("Candle sync for %s failed: %s", symbol, e)
+
+    def sync_candles(self):
+        """
+        Download new bars for every market concurrently.
+        """
+        list(self.executor.map(self._sync, self.markets))
+
+    def windows(self):
+        """
+        Stack the latest candle window of every market.
+
+        Returns
+        -------
+        tuple
+            Symbols with a full window, and their close and volume arrays
+            shaped (markets, window).
+        """
+        symbols, closes, volumes = [], [], []
+        for symbol in self.markets:
+            columns = self.candle_store.window(self.ticker(symbol), self.interval, self.window)
+            if len(columns["close"]) < self.window:
+                log.debug("%s has %d of %d bars, skipping", symbol, len(columns["close"]), self.window)
+                continue
+            symbols.append(symbol)
+            closes.append(columns["close"])
+            volumes.append(columns["volume"])
+        if not symbols:
+            return symbols, np.empty((0, self.window)), np.empty((0, self.window))
+        return symbols, np.stack(closes), np.stack(volumes)
+
+    def signals(self):
+        """
+        Latest signal row of every market with a full candle window.
+        """
+        symbols, close, volume = self.windows()
+        return generate_signals_batch(close, volume, self.strategy, symbols, self.rules)
+
+    def prices(self):
+        """
+        USD prices of every market's index token from one oracle request.
+        """
+        return get_oracle_prices(self.tokens, self.chain)
+
+    def _manage(self, symbol, signal, wallet_balance_usd, price):
+        try:
+            return self.manage_position(
+                self.states[symbol], signal, wallet_balance_usd, price, index_token_symbol=symbol
+            )
+        except Exception as e:
+            log.error("Managing %s failed: %s", symbol, e)
+            return None
+
+    def trade(self, signals, wallet_balance_usd):
+        """
+        Apply the signals and risk management to every market concurrently.
+
+        Parameters
+        ----------
+        signals : pandas.DataFrame
+            Signal table from `signals`.
+        wallet_balance_usd : float
+            Wallet balance, split evenly between the markets that open a
+            position in this iteration so they can't overcommit it.
+
+        Returns
+        -------
+        dict
+            Risk events by symbol, see `manage_position`.
+        """
+        prices = self.prices()
+
+        # Only markets with a signal or an open position can produce an order
+        active = [
+            symbol for symbol in signals.index
+            if symbol in prices and (signals.at[symbol, "Position"] != 0 or self.states[symbol]["current_position"] != 0)
+        ]
+        # Positions are only opened from flat, and every opening market sizes off its share of the balance
+        opening = [
+            symbol for symbol in active
+            if signals.at[symbol, "Position"] != 0 and self.states[symbol]["current_position"] == 0
+        ]
+        balance_share = wallet_balance_usd
+        if opening and wallet_balance_usd is not None:
+            balance_share = wallet_balance_usd / len(opening)
+        futures = {
+            symbol: self.executor.submit(self._manage, symbol, signals.loc[symbol], balance_share, prices[symbol])
+            for symbol in active
+        }
+        risk_events = {symbol: future.result() for symbol, future in futures.items()}
+        return {symbol: event for symbol, event in risk_events.items() if event is not None}
+
+    def step(self, wallet_balance_usd):
+        """
+        Run one iteration across all markets: sync candles, compute signals, trade.
+
+        Returns
+        -------
+        tuple
+            The signal table and the risk events by symbol.
+        """
+        self.sync_candles()
+        signals = self.signals()
+        return signals, self.trade(signals, wallet_balance_usd)
+
+    def close(self):
+        """
+        Shut down the worker threads.
+        """
+        self.executor.shutdown(wait=True)
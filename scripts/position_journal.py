@@ -0,0 +1,293 @@
+import json
+import os
+import threading
+import time
+
+from logger import get_logger
+
+log = get_logger("position_journal")
+
+POSITION_FIELDS = ("current_position", "current_position_value", "entry_price")
+
+
+def flat_state():
+    """
+    Position state of a market without an open position.
+    """
+    return {"current_position": 0, "current_position_value": 0, "entry_price": 0}
+
+
+class PositionJournal:
+    """
+    Append-only, fsync-batched journal of position transitions and orders.
+
+    Every record is one JSON line. Writers block until their record is on
+    disk, but a background thread syncs in batches, so concurrent writers
+    (market workers, risk monitor closes) share one fsync. On `open` the
+    journal is replayed into the latest state per market, a torn last line
+    from a crash is dropped, and the file is compacted to those states.
+
+    Parameters
+    ----------
+    path : str
+        Journal file, e.g. "data/journal/positions.jsonl".
+    batch_window : float
+        Seconds the syncing thread waits for more records before an fsync.
+    """
+
+    def __init__(self, path, batch_window=0.002):
+        self.path = path
+        self.batch_window = batch_window
+        self.states = {}  # Market symbol -> latest position state
+        self.pending_orders = {}  # Market symbol -> last order without a later position record
+
+        self._file = None
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._dirty = threading.Event()
+        self._closing = False
+        self._written = 0  # Sequence number of the last record written
+        self._durable = 0  # Sequence number of the last record known to be on disk
+        self._sync_error = None
+        self._thread = None
+
+    def _apply(self, record):
+        market = record["market"]
+        if record["type"] == "position":
+            self.states[market] = {field: record[field] for field in POSITION_FIELDS}
+            self.pending_orders.pop(market, None)
+        elif record["type"] == "order":
+            self.pending_orders[market] = record
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        lines = data.split(b"\n")
+        torn = lines.pop()  # Empty unless a crash cut the last line short
+        for number, line in enumerate(lines, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                log.error("Skipping unreadable journal line %d", number)
+                continue
+            self._apply(record)
+            self._written = max(self._written, record.get("seq", 0))
+
+        if torn:
+            log.warning("Dropping torn journal tail", extra={"fields": {"path": self.path, "bytes": len(torn)}})
+
+    def _compact(self):
+        # Rewrite the journal as one record per market, atomically
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            for market, state in self.states.items():
+                f.write(json.dumps(dict(state, type="position", market=market, reason="compacted", seq=self._written, time=time.time())) + "\n")
+            for record in self.pending_orders.values():
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def open(self):
+        """
+        Replay and compact the journal, then start accepting records.
+
+        Returns
+        -------
+        dict
+            Market symbol -> position state ('current_position',
+            'current_position_value', 'entry_price') as last recorded.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._replay()
+        self._compact()
+        self._durable = self._written
+        self._file = open(self.path, "a")
+        self._closing = False
+        self._thread = threading.Thread(target=self._sync_loop, name="position-journal", daemon=True)
+        self._thread.start()
+        return {market: dict(state) for market, state in self.states.items()}
+
+    def _sync_loop(self):
+        while True:
+            self._dirty.wait()
+            time.sleep(self.batch_window)  # Let concurrent writers join this batch
+            with self._lock:
+                self._dirty.clear()
+                target = self._written
+                try:
+                    self._file.flush()
+                except OSError as e:
+                    self._sync_error = e
+            try:
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                self._sync_error = e
+            with self._lock:
+                self._durable = target
+                self._synced.notify_all()
+                if self._closing and self._durable == self._written:
+                    return
+
+    def _append(self, record):
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("Position journal is not open")
+            self._written += 1
+            seq = self._written
+            self._file.write(json.dumps(dict(record, seq=seq, time=time.time())) + "\n")
+            self._apply(record)
+            self._dirty.set()
+            while self._durable < seq:
+                self._synced.wait()
+            if self._sync_error is not None:
+                error, self._sync_error = self._sync_error, None
+                raise error
+        return seq
+
+    def record_position(self, market, state, reason):
+        """
+        Durably record the position state of `market` after a transition.
+
+        Parameters
+        ----------
+        market : str
+            Market symbol, e.g. "ETH".
+        state : dict
+            Position state after the transition.
+        reason : str
+            What caused the transition, e.g. "open_long" or "stop_loss".
+        """
+        self._append({
+            "type": "position",
+            "market": market,
+            "reason": reason,
+            "current_position": int(state["current_position"]),
+            "current_position_value": float(state["current_position_value"]),
+            "entry_price": float(state["entry_price"]),
+        })
+
+    def record_order(self, market, action, is_long, size_delta_usd, price):
+        """
+        Durably record an order before it is submitted.
+
+        An order without a later position record for its market was in
+        flight when the bot stopped; see `pending_orders`.
+
+        Parameters
+        ----------
+        market : str
+            Market symbol, e.g. "ETH".
+        action : str
+            "open" or "close".
+        is_long : bool
+            Side of the position.
+        size_delta_usd : float
+            Order size in USD.
+        price : float
+            Price the order was sized at.
+        """
+        self._append({
+            "type": "order",
+            "market": market,
+            "action": action,
+            "is_long": bool(is_long),
+            "size_delta_usd": float(size_delta_usd),
+            "price": float(price),
+        })
+
+    def close(self):
+        """
+        Wait for pending records and close the file.
+        """
+        if self._thread is None:
+            return
+        with self._lock:
+            self._closing = True
+            self._dirty.set()
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+        self._file = None
+
+
+def read_onchain_positions(config, address, leverage=5):
+    """
+    Open GMX positions of `address`, from one SDK read covering every market.
+
+    Parameters
+    ----------
+    config : ConfigManager
+        The GMX configuration object.
+    address : str
+        Wallet address.
+    leverage : float
+        Leverage the bot orders with. The bot tracks positions by their
+        size before leverage, so the on-chain notional is divided by it.
+
+    Returns
+    -------
+    dict
+        Market symbol -> position state as used by the bot. When a market
+        has both a long and a short, the larger one is returned.
+    """
+    from gmx_python_sdk.scripts.v2.get.get_open_positions import GetOpenPositions
+
+    positions = {}
+    for key, position in GetOpenPositions(config=config, address=address).get_data().items():
+        symbol = key.rsplit("_", 1)[0]  # Keys are "<market symbol>_long" / "<market symbol>_short"
+        state = {
+            "current_position": 1 if position["is_long"] else -1,
+            "current_position_value": float(position["position_size"]) / leverage,
+            "entry_price": float(position["entry_price"]),
+        }
+        if symbol in positions:
+            log.warning("Both a long and a short are open, tracking the larger one", extra={"fields": {"market": symbol}})
+            if positions[symbol]["current_position_value"] >= state["current_position_value"]:
+                continue
+        positions[symbol] = state
+    return positions
+
+
+def reconcile(states, onchain):
+    """
+    Correct journaled position states that disagree with the chain.
+
+    The chain wins on direction: a position the journal has open but the
+    chain does not was closed outside the bot (liquidation, or a close that
+    executed before the crash was recorded) and becomes flat; a position
+    only the chain has, or with the opposite direction, is adopted with the
+    chain's size and entry price. Matching directions keep the journal's
+    values, which the take-profit and stop-loss levels are based on.
+
+    Parameters
+    ----------
+    states : dict
+        Market symbol -> position state. Updated in place.
+    onchain : dict
+        Market symbol -> position state, see `read_onchain_positions`.
+
+    Returns
+    -------
+    dict
+        Market symbol -> reason, for every state that was changed.
+    """
+    corrections = {}
+    for symbol, state in states.items():
+        chain_state = onchain.get(symbol)
+        if chain_state is None:
+            if state["current_position"] != 0:
+                state.update(flat_state())
+                corrections[symbol] = "closed_onchain"
+        elif chain_state["current_position"] != state["current_position"]:
+            state.update(chain_state)
+            corrections[symbol] = "adopted_onchain"
+    return corrections
@@ -0,0 +1,484 @@
+import json
+import os
+import threading
+import time
+
+from logger import get_logger
+from metrics import metrics
+
+log = get_logger("preflight")
+
+# ERC20 ABI shipped with the repo, used for allowance reads
+TOKEN_ABI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils", "token_approval.json")
+
+# Order side -> key of the matching gas limit in the GMX datastore limits
+ORDER_GAS_LIMIT_KEYS = {
+    True: "increase_order",
+    False: "decrease_order",
+}
+
+# Datastore values the execution fee is computed from, besides the order gas limit
+FEE_GAS_LIMIT_KEYS = ("estimated_fee_base_gas_limit", "estimated_fee_multiplier_factor")
+
+# GMX order vault the SDK sends the execution fee and collateral to
+ORDER_VAULT_ADDRESS = "0x31eF83a530Fde1B38EE9A18093A333D8Bbbc40D5"
+
+# Collateral the SDK sends as native ETH with the execution fee instead of via sendTokens
+NATIVE_COLLATERAL_ADDRESS = "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1"
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Headroom over the node's gas estimate for the order transaction
+GAS_ESTIMATE_BUFFER = 1.2
+
+# Checks OrderArgumentParser applies to every order the bot builds
+MAX_LEVERAGE = 100
+MIN_COLLATERAL_USD = 2
+
+
+class OrderPreflight:
+    """
+    Keeps the slow per-order lookups warm so submission is sign-and-send.
+
+    Gas limits, execution fee factors, gas price, base fee and the oracle
+    prices of the templates' tokens are refreshed ahead of expiry on a
+    timer or per block by a background thread, token allowances are cached
+    per (token, spender), and order parameter templates for long/short
+    increase/decrease orders are built once per market. `order_transaction`
+    encodes the exchange router multicall from these warm values, so the
+    order path does not construct SDK orders, which re-read gas limits,
+    markets and oracle prices for every order.
+
+    Parameters
+    ----------
+    config : ConfigManager
+        The GMX configuration object.
+    w3 : Web3
+        Connection used for gas price, block number and allowance reads.
+    market_cache : MarketCache
+        Source of the pre-resolved order addresses.
+    refresh_interval : float
+        Seconds after which gas estimates and prices are considered stale.
+        The background thread refreshes them after half of it.
+    execution_buffer : float
+        Multiplier over the minimum execution fee, as the SDK orders' `execution_buffer`.
+    oracle : object, optional
+        Stand-in for `OraclePrices`, see `price_service.get_oracle_prices`.
+    """
+
+    def __init__(self, config, w3, market_cache, refresh_interval=15, execution_buffer=1.5, oracle=None):
+        self.config = config
+        self.w3 = w3
+        self.market_cache = market_cache
+        self.refresh_interval = refresh_interval
+        self.execution_buffer = execution_buffer
+        self.oracle = oracle
+
+        self.gas_limits = None
+        self.order_gas_limits = {}  # Datastore key -> called value, for the order and fee limits
+        self.oracle_prices = {}  # Token address -> oracle entry with 'maxPriceFull' / 'minPriceFull'
+        self.gas_price = None
+        self.max_fee_per_gas = None
+        self.block_number = None
+        self.refreshed_at = 0.0
+        self.allowances = {}
+        self.templates = {}
+
+        self._lock = threading.Lock()
+        self._stop_refresh = threading.Event()
+        self._refresh_thread = None
+        self._token_abi = None
+        self._exchange_router = None
+        self._parser = None
+        self._parser_built_at = 0.0
+        self._parser_lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Re-read gas limits, gas price, base fee and the oracle prices of the templates' tokens.
+        """
+        from gmx_python_sdk.scripts.v2.gas_utils import get_gas_limits
+        from gmx_python_sdk.scripts.v2.gmx_utils import get_datastore_contract
+
+        gas_limits = get_gas_limits(get_datastore_contract(self.config))
+        gas_price = self.w3.eth.gas_price
+        block = self.w3.eth.get_block("latest")
+        keys = (*ORDER_GAS_LIMIT_KEYS.values(), *FEE_GAS_LIMIT_KEYS)
+        order_gas_limits = {key: gas_limits[key].call() for key in keys}
+        tokens = set()
+        for template in list(self.templates.values()):
+            tokens.update((template["start_token_address"], template["index_token_address"]))
+        prices = self._fetch_oracle_prices(tokens)
+        with self._lock:
+            self.gas_limits = gas_limits
+            self.gas_price = gas_price
+            # Same fee cap the SDK orders set from the latest block
+            self.max_fee_per_gas = int(block["baseFeePerGas"] * 1.35)
+            self.block_number = block["number"]
+            self.order_gas_limits = order_gas_limits
+            self.oracle_prices.update(prices)
+            self.refreshed_at = time.monotonic()
+        log.debug("Preflight refreshed", extra={"fields": {"gas_price": gas_price, "block_number": block["number"], "tokens": len(prices)}})
+
+    def _fetch_oracle_prices(self, addresses):
+        # One oracle request for every token the orders need, keyed by address
+        if not addresses:
+            return {}
+        oracle = self.oracle
+        if oracle is None:
+            from gmx_python_sdk.scripts.v2.get.get_oracle_prices import OraclePrices
+
+            oracle = OraclePrices(self.config.chain)
+        prices = oracle.get_recent_prices()
+        return {address: prices[address] for address in addresses if address in prices}
+
+    def _ensure_fresh(self):
+        # The background thread refreshes ahead of expiry, so the order path serves
+        # the warm values; it only refreshes itself on a cold cache or without the thread
+        if self.gas_limits is None:
+            self.refresh()
+        elif self._refresh_thread is None and time.monotonic() - self.refreshed_at > self.refresh_interval:
+            self.refresh()
+
+    def execution_fee(self, is_increase):
+        """
+        Execution fee in wei for an increase or decrease order, with `execution_buffer` applied.
+
+        Same formula as the SDK's `get_execution_fee` on the warm datastore
+        values and gas price.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            limits = self.order_gas_limits
+            gas_price = self.gas_price
+        base_gas_limit, multiplier_factor = (limits[key] for key in FEE_GAS_LIMIT_KEYS)
+        adjusted_gas_limit = base_gas_limit + limits[ORDER_GAS_LIMIT_KEYS[is_increase]] * multiplier_factor / 10 ** 30
+        return int(int(adjusted_gas_limit * gas_price) * self.execution_buffer)
+
+    def allowance(self, token_address, spender, refresh=False):
+        """
+        Cached ERC20 allowance of the bot wallet for `spender`.
+        """
+        key = (token_address, spender)
+        if refresh or key not in self.allowances:
+            if self._token_abi is None:
+                with open(TOKEN_ABI_PATH, "r") as file:
+                    self._token_abi = json.load(file)
+            token = self.w3.eth.contract(address=token_address, abi=self._token_abi)
+            self.allowances[key] = token.functions.allowance(self.config.user_wallet_address, spender).call()
+        return self.allowances[key]
+
+    def ensure_approval(self, token_address, amount):
+        """
+        Run the SDK approval check only when the cached allowance does not cover `amount`.
+        """
+        from gmx_python_sdk.scripts.v2.approve_token_for_spend import check_if_approved
+        from gmx_python_sdk.scripts.v2.gmx_utils import contract_map
+
+        spender = contract_map[self.config.chain]["syntheticsrouter"]["contract_address"]
+        if self.allowance(token_address, spender) >= amount:
+            return
+        log.info("Cached allowance too low, checking token approval")
+        self._ensure_fresh()
+        check_if_approved(self.config, spender, token_address, amount, self.max_fee_per_gas, approve=True)
+        self.allowance(token_address, spender, refresh=True)
+
+    def build_templates(self, index_token_symbol="ETH", collateral_token_symbol=None, start_token_symbol="USDC"):
+        """
+        Prebuild order parameters for long/short increase/decrease orders on one market.
+
+        The collateral defaults to `MarketCache.default_collateral` for the market.
+        """
+        if collateral_token_symbol is None:
+            collateral_token_symbol = self.market_cache.default_collateral(index_token_symbol)
+        addresses = self.market_cache.resolve_order_addresses(
+            index_token_symbol,
+            collateral_token_symbol,
+            start_token_symbol,
+        )
+        for is_long in (True, False):
+            for is_increase in (True, False):
+                self.templates[(index_token_symbol, is_long, is_increase)] = {
+                    "chain": self.config.chain,
+                    "index_token_symbol": index_token_symbol,
+                    "collateral_token_symbol": collateral_token_symbol,
+                    "start_token_symbol": start_token_symbol,
+                    "is_long": is_long,
+                    **addresses,
+                }
+        return self.templates
+
+    def order_parameters(self, is_long, is_increase, size_delta_usd, leverage, slippage_percent, index_token_symbol="ETH"):
+        """
+        Copy of the matching template with the order size filled in.
+        """
+        key = (index_token_symbol, is_long, is_increase)
+        if key not in self.templates:
+            self.build_templates(index_token_symbol)
+        parameters = dict(self.templates[key])
+        parameters["size_delta_usd"] = size_delta_usd
+        parameters["leverage"] = leverage
+        parameters["slippage_percent"] = slippage_percent
+        return parameters
+
+    def oracle_price(self, address):
+        """
+        Cached oracle entry of a token, with 'maxPriceFull' and 'minPriceFull', None if the oracle has none.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            entry = self.oracle_prices.get(address)
+        if entry is None:
+            # A token no template used at the last refresh
+            prices = self._fetch_oracle_prices({address})
+            with self._lock:
+                self.oracle_prices.update(prices)
+            entry = prices.get(address)
+        return entry
+
+    def start_token_price(self, address):
+        """
+        Cached USD oracle price of an order's start token, None if the oracle has none.
+        """
+        entry = self.oracle_price(address)
+        if entry is None:
+            return None
+        decimals = self.market_cache.token_details(address)["decimals"]
+        mid = (int(entry["maxPriceFull"]) + int(entry["minPriceFull"])) / 2
+        return mid / 10 ** (30 - decimals)
+
+    def order_arguments(self, parameters):
+        """
+        `OrderArgumentParser.process_parameters_dictionary` for an `order_parameters` result.
+
+        The parser resolves markets, token decimals and the start token
+        price with chain and oracle reads on every order. Here they come
+        from the template, the market cache and the warm start token
+        prices, with the same size conversions and checks.
+
+        Parameters
+        ----------
+        parameters : dict
+            Result of `order_parameters`.
+
+        Returns
+        -------
+        dict or None
+            The parsed order parameters, or None if the template has no
+            cached swap path or there is no start token price, and
+            `parse_order_arguments` has to handle the order.
+        """
+        if "swap_path" not in parameters:
+            return None
+        start_token_address = parameters["start_token_address"]
+        price = self.start_token_price(start_token_address)
+        if price is None:
+            return None
+        collateral_usd = parameters["size_delta_usd"] / parameters["leverage"]
+        if parameters["leverage"] > MAX_LEVERAGE:
+            raise ValueError(f'Leverage requested "x{parameters["leverage"]:.2f}" can not exceed x{MAX_LEVERAGE}!')
+        if collateral_usd < MIN_COLLATERAL_USD:
+            raise ValueError(f"Position size must be backed by >${MIN_COLLATERAL_USD} of collateral!")
+
+        decimals = self.market_cache.token_details(start_token_address)["decimals"]
+        collateral_tokens = collateral_usd / price
+        order_parameters = dict(parameters)
+        order_parameters["size_delta"] = int(parameters["size_delta_usd"] * 10 ** 30)
+        order_parameters["initial_collateral_delta"] = int(collateral_tokens * 10 ** decimals)
+        return order_parameters
+
+    def parse_order_arguments(self, parameters):
+        """
+        `OrderArgumentParser.process_parameters_dictionary` for orders `order_arguments` cannot size from the cache.
+
+        The parser scans every GMX market when it is constructed, so one is
+        kept and rebuilt only after the market cache's `max_age`, instead of
+        scanning again for every order. It parses as an increase order for
+        both sides, so a swap path is always resolved, and keeps per-call
+        state, so concurrent orders take turns.
+        """
+        with self._parser_lock:
+            if self._parser is None or time.monotonic() - self._parser_built_at > self.market_cache.max_age:
+                from gmx_python_sdk.scripts.v2.order.order_argument_parser import OrderArgumentParser
+
+                log.info("Building SDK order argument parser")
+                self._parser = OrderArgumentParser(self.config, is_increase=True)
+                self._parser_built_at = time.monotonic()
+            return self._parser.process_parameters_dictionary(parameters)
+
+    def exchange_router(self):
+        """
+        Exchange router contract on this preflight's connection, built once.
+        """
+        if self._exchange_router is None:
+            from gmx_python_sdk.scripts.v2.gmx_utils import get_contract_object
+
+            self._exchange_router = get_contract_object(self.w3, "exchangerouter", self.config.chain)
+        return self._exchange_router
+
+    def order_transaction(self, order_parameters, is_increase):
+        """
+        Unsigned exchange router transaction for an `order_arguments` result.
+
+        Encodes the same `multicall` the SDK's `Order.order_builder` sends:
+        `sendWnt` with the execution fee (plus the collateral for native
+        collateral), `sendTokens` for other collateral on increase orders,
+        and `createOrder` for a market increase or decrease. Gas limits,
+        gas price, base fee and the index token price come from the warm
+        cache, and the transaction's gas is the node's estimate of the
+        encoded call instead of twice the keeper's order gas limit.
+
+        The SDK's extra reader call that compares the execution price with
+        the acceptable price is not made; GMX cancels an order whose
+        execution price falls outside its acceptable price.
+
+        Parameters
+        ----------
+        order_parameters : dict
+            Result of `order_arguments` or `OrderArgumentParser`.
+        is_increase : bool
+            True to open or increase a position, False to decrease or close it.
+
+        Returns
+        -------
+        dict
+            Transaction with 'to', 'data', 'value', gas and fee fields, without a nonce.
+        """
+        from hexbytes import HexBytes
+        from web3 import Web3
+        from gmx_python_sdk.scripts.v2.gmx_utils import decrease_position_swap_type, order_type
+
+        index_token_address = order_parameters["index_token_address"]
+        collateral_address = Web3.to_checksum_address(order_parameters["start_token_address"])
+        collateral_amount = order_parameters["initial_collateral_delta"]
+        is_long = order_parameters["is_long"]
+        slippage_percent = order_parameters["slippage_percent"]
+
+        entry = self.oracle_price(index_token_address)
+        if entry is None:
+            raise ValueError(f"No oracle price for index token {index_token_address}.")
+        price = (float(entry["maxPriceFull"]) + float(entry["minPriceFull"])) / 2
+        # Worst price accepted: above the price when buying, below it when selling
+        if is_long == is_increase:
+            acceptable_price = int(price + price * slippage_percent)
+        else:
+            acceptable_price = int(price - price * slippage_percent)
+
+        execution_fee = self.execution_fee(is_increase)
+        wallet_address = Web3.to_checksum_address(self.config.user_wallet_address)
+        arguments = (
+            (
+                wallet_address,
+                wallet_address,  # Cancellation receiver
+                ZERO_ADDRESS,  # Callback contract
+                ZERO_ADDRESS,  # UI fee receiver
+                Web3.to_checksum_address(order_parameters["market_key"]),
+                collateral_address,
+                order_parameters["swap_path"],
+            ),
+            (
+                order_parameters["size_delta"],
+                collateral_amount,
+                int(price) if is_increase else 0,  # Trigger price, the mark price on opens as in the SDK
+                acceptable_price,
+                execution_fee,
+                0,  # Callback gas limit
+                0,  # Min output amount
+                0,  # Valid from time
+            ),
+            order_type["market_increase" if is_increase else "market_decrease"],
+            decrease_position_swap_type["no_swap"],
+            is_long,
+            True,  # Unwrap native token
+            False,  # Auto cancel
+            HexBytes("0x" + "00" * 32),  # Referral code
+        )
+
+        router = self.exchange_router()
+        value = execution_fee
+        if collateral_address != NATIVE_COLLATERAL_ADDRESS and is_increase:
+            multicall_args = [
+                _encode(router, "sendWnt", (ORDER_VAULT_ADDRESS, value)),
+                _encode(router, "sendTokens", (collateral_address, ORDER_VAULT_ADDRESS, collateral_amount)),
+                _encode(router, "createOrder", [arguments]),
+            ]
+        else:
+            if is_increase:
+                value = collateral_amount + execution_fee
+            multicall_args = [
+                _encode(router, "sendWnt", (ORDER_VAULT_ADDRESS, value)),
+                _encode(router, "createOrder", [arguments]),
+            ]
+
+        with self._lock:
+            max_fee_per_gas = self.max_fee_per_gas
+        transaction = {
+            "from": wallet_address,
+            "to": router.address,
+            "data": _encode(router, "multicall", [[HexBytes(call) for call in multicall_args]]),
+            "value": value,
+            "chainId": self.config.chain_id,
+            "maxFeePerGas": max_fee_per_gas,
+            "maxPriorityFeePerGas": 0,
+        }
+        # Also fails here, before anything is sent, if the order would revert
+        transaction["gas"] = int(self.w3.eth.estimate_gas(transaction) * GAS_ESTIMATE_BUFFER)
+        log.debug("Order transaction", extra={"fields": {"market": order_parameters["market_key"], "is_long": is_long, "is_increase": is_increase, "acceptable_price": acceptable_price, "execution_fee": execution_fee, "value": value, "gas": transaction["gas"]}})
+        return transaction
+
+    def record_latency(self, label, signal_time):
+        """
+        Report the time from signal to broadcast for one order.
+        """
+        if signal_time is None:
+            return None
+        latency = time.perf_counter() - signal_time
+        metrics.observe("signal_to_broadcast_seconds", latency, help="Time from signal to order broadcast.")
+        log.info("Signal-to-broadcast latency", extra={"fields": {"order": label, "latency_ms": round(latency * 1000, 1)}})
+        return latency
+
+    def start_background_refresh(self, per_block=False, poll_interval=1.0):
+        """
+        Keep gas estimates warm on a daemon thread.
+
+        Refreshes once half of `refresh_interval` has passed, so values are
+        renewed before they expire, or on every new block seen when polling
+        every `poll_interval` seconds if `per_block` is set.
+        """
+        if self._refresh_thread is not None:
+            return
+
+        def refresh_loop():
+            wait = poll_interval if per_block else self.refresh_interval / 2
+            while not self._stop_refresh.wait(wait):
+                try:
+                    stale = time.monotonic() - self.refreshed_at >= self.refresh_interval / 2
+                    if per_block:
+                        block_number = self.w3.eth.block_number
+                        stale = stale or block_number != self.block_number
+                        self.block_number = block_number
+                    if stale:
+                        self.refresh()
+                except Exception as e:
+                    log.error("Preflight refresh failed: %s", e)
+
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(target=refresh_loop, name="order-preflight-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        """
+        Stop the background refresh thread.
+        """
+        self._stop_refresh.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+
+def _encode(contract, function_name, args):
+    # Calldata for one contract call; encodeABI before web3 7, encode_abi since
+    try:
+        return contract.encodeABI(fn_name=function_name, args=args)
+    except AttributeError:
+        return contract.encode_abi(abi_element_identifier=function_name, args=args)
@@ -0,0 +1,248 @@
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from logger import get_logger
+
+log = get_logger("price_service")
+
+
+class PriceSource:
+    """
+    Base class for a USD price source used by PriceService.
+    """
+
+    name = "base"
+
+    def get_price(self, symbol):
+        """
+        Return the USD price of `symbol`, or raise on failure.
+        """
+        raise NotImplementedError
+
+
+class CoinGeckoSource(PriceSource):
+    """
+    CoinGecko simple price endpoint over a shared keep-alive session.
+
+    A 429 response puts the source on cooldown for the Retry-After period,
+    so the service fails over instead of stalling on the rate limit.
+    """
+
+    name = "coingecko"
+    url = "https://api.coingecko.com/api/v3/simple/price"
+    ids = {"ETH": "ethereum", "BTC": "bitcoin", "ARB": "arbitrum"}
+
+    def __init__(self, session, timeout=10):
+        self.session = session
+        self.timeout = timeout
+        self.cooldown_until = 0.0
+
+    def get_price(self, symbol):
+        if time.monotonic() < self.cooldown_until:
+            raise RuntimeError("rate limited, cooling down")
+        coin_id = self.ids[symbol]
+        response = self.session.get(
+            self.url,
+            params={"ids": coin_id, "vs_currencies": "usd"},
+            timeout=self.timeout,
+        )
+        if response.status_code == 429:
+            retry_after = float(response.headers.get("Retry-After", 60))
+            self.cooldown_until = time.monotonic() + retry_after
+        response.raise_for_status()  # Check for HTTP errors
+        return float(response.json()[coin_id]["usd"])
+
+
+class GMXOracleSource(PriceSource):
+    """
+    GMX oracle keeper prices, as returned by `OraclePrices.get_recent_prices()`.
+
+    Oracle prices are scaled by 10 ** (30 - token decimals); the mid of the
+    min and max price is returned.
+    """
+
+    name = "gmx_oracle"
+    # Arbitrum token addresses and decimals
+    tokens = {
+        "ETH": ("0x82aF49447D8a07e3bd95BD0d56f35241523fBab1", 18),
+        "BTC": ("0x2f2a2543B76A4166549F7aaB2e75Bef0aefC5B0f", 8),
+        "ARB": ("0x912CE59144191C1204E64559FE8253a0e49E6548", 18),
+    }
+
+    def __init__(self, chain="arbitrum"):
+        self.chain = chain
+
+    def get_price(self, symbol):
+        return get_oracle_prices({symbol: self.tokens[symbol]}, self.chain)[symbol]
+
+
+class FileSource(PriceSource):
+    """
+    Prices read from a local JSON file such as {"ETH": 3000.0}, for tests and replays.
+    """
+
+    name = "file"
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_price(self, symbol):
+        with open(self.path, "r") as file:
+            return float(json.load(file)[symbol])
+
+
+class PriceService:
+    """
+    Cached USD prices with ordered failover across sources.
+
+    Every caller within the TTL gets the same price, so the balance
+    conversion and the trading decision in one iteration agree. Fetches
+    are serialized per symbol only: a slow source delays callers waiting
+    for the same symbol, never those reading other cached prices.
+
+    Parameters
+    ----------
+    sources : list of PriceSource
+        Sources tried in order until one returns a price.
+    ttl : float
+        Seconds a fetched price stays valid.
+    """
+
+    def __init__(self, sources, ttl=30):
+        self.sources = sources
+        self.ttl = ttl
+        self._cache = {}  # symbol -> (price, source name, fetched at)
+        self._lock = threading.Lock()  # Guards _cache and _fetch_locks, never held across a fetch
+        self._fetch_locks = {}  # symbol -> lock held while that symbol is fetched
+
+    def get_price(self, symbol="ETH"):
+        """
+        Return the cached USD price of `symbol`, fetching it if the cache expired.
+
+        Returns
+        -------
+        float or None
+            The price, or None if every source failed.
+        """
+        price = self._cached(symbol)
+        if price is not None:
+            return price
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(symbol, threading.Lock())
+        with fetch_lock:
+            # Another caller may have fetched it while this one waited
+            price = self._cached(symbol)
+            if price is not None:
+                return price
+
+            for source in self.sources:
+                try:
+                    price = source.get_price(symbol)
+                except Exception as err:
+                    log.error("%s price for %s failed: %s", source.name, symbol, err)
+                    continue
+                log.debug("%s price from %s: %s", symbol, source.name, price)
+                with self._lock:
+                    self._cache[symbol] = (price, source.name, time.monotonic())
+                return price
+        return None
+
+    def _cached(self, symbol):
+        # Price of `symbol` if it is still within the TTL, else None
+        with self._lock:
+            cached = self._cache.get(symbol)
+        if cached is not None and time.monotonic() - cached[2] < self.ttl:
+            return cached[0]
+        return None
+
+    def invalidate(self, symbol=None):
+        """
+        Drop the cached price of `symbol`, or all cached prices.
+        """
+        with self._lock:
+            if symbol is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(symbol, None)
+
+
+def get_oracle_prices(tokens, chain="arbitrum", oracle=None):
+    """
+    USD mid prices of many tokens from one GMX oracle request.
+
+    Parameters
+    ----------
+    tokens : dict
+        Symbol -> (token address, token decimals).
+    chain : str
+        Chain to read oracle prices for.
+    oracle : object, optional
+        Anything with a `get_recent_prices()` method shaped like the SDK's,
+        e.g. a local stand-in. Defaults to `OraclePrices(chain)`.
+
+    Returns
+    -------
+    dict
+        Symbol -> USD price, for every token the oracle has a price for.
+    """
+    if oracle is None:
+        from gmx_python_sdk.scripts.v2.get.get_oracle_prices import OraclePrices
+
+        oracle = OraclePrices(chain)
+    prices = oracle.get_recent_prices()
+    result = {}
+    for symbol, (address, decimals) in tokens.items():
+        entry = prices.get(address)
+        if entry is None:
+            continue
+        mid = (int(entry["maxPriceFull"]) + int(entry["minPriceFull"])) / 2
+        result[symbol] = mid / 10 ** (30 - decimals)
+    return result
+
+
+def create_session(pool_size=10):
+    """
+    requests.Session with a keep-alive connection pool for the price APIs.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def build_price_service(settings=None, chain="arbitrum"):
+    """
+    Build a PriceService from the optional `price_feed` section of strategy.yaml.
+
+    Parameters
+    ----------
+    settings : dict, optional
+        'ttl_seconds' and an ordered 'sources' list of "coingecko", "gmx_oracle"
+        or "file:<path>". Defaults to CoinGecko with GMX oracle failover.
+    chain : str
+        Chain for the GMX oracle source.
+
+    Returns
+    -------
+    PriceService
+        The configured service.
+    """
+    settings = settings or {}
+    session = create_session()
+    sources = []
+    for name in settings.get("sources", ["coingecko", "gmx_oracle"]):
+        if name == "coingecko":
+            sources.append(CoinGeckoSource(session))
+        elif name == "gmx_oracle":
+            sources.append(GMXOracleSource(chain))
+        elif name.startswith("file:"):
+            sources.append(FileSource(name[len("file:"):]))
+        else:
+            raise ValueError(f"Unknown price source: {name}")
+    return PriceService(sources, ttl=settings.get("ttl_seconds", 30))
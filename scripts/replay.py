@@ -0,0 +1,422 @@
+import argparse
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import run_backtest, summarize
+from logger import get_logger
+from rules import compile_rules
+
+log = get_logger("replay")
+
+
+class ReplayFinished(Exception):
+    """
+    Raised by `VirtualClock.sleep` once the clock passes the end of the recording.
+    """
+
+
+def _utc(value):
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp.tz_convert("UTC")
+
+
+def _interval_delta(interval):
+    # yfinance style intervals ("15m", "1h", "1d") as a Timedelta
+    if interval.endswith("m"):
+        interval = interval[:-1] + "min"
+    return pd.Timedelta(interval)
+
+
+class VirtualClock:
+    """
+    Simulated wall clock; `sleep` advances it instantly.
+
+    With `events`, a sleep that would wake up before the next event keeps
+    sleeping in whole steps until it reaches it. An iteration that sees the
+    same candles, price and position as the one before it does nothing, so
+    those wake-ups are skipped instead of run.
+
+    Parameters
+    ----------
+    start : datetime-like
+        Initial time, UTC.
+    end : datetime-like, optional
+        `sleep` raises ReplayFinished once the clock moves past this time.
+    events : numpy.ndarray, optional
+        Sorted nanosecond timestamps at which the bot's inputs change.
+    """
+
+    def __init__(self, start, end=None, events=None):
+        self.now = _utc(start)
+        self.end = None if end is None else _utc(end)
+        self.events = events
+        self.sleeps = 0
+        self.skipped = 0
+
+    def time(self):
+        return self.now.timestamp()
+
+    def sleep(self, seconds):
+        step = pd.Timedelta(seconds=seconds).value
+        steps = 1
+        if self.events is not None:
+            index = int(np.searchsorted(self.events, self.now.value, side="right"))
+            if index < len(self.events):
+                steps = max(1, -(-(int(self.events[index]) - self.now.value) // step))
+        self.now += pd.Timedelta(steps * step, unit="ns")
+        self.sleeps += 1
+        self.skipped += steps - 1
+        if self.end is not None and self.now > self.end:
+            raise ReplayFinished()
+
+
+class ReplayFeed:
+    """
+    Recorded candles and prices served as of the virtual clock.
+
+    Stands in for `acid_bot.fetch_candles` and the price service. Only bars
+    that had closed by the clock's current time are returned, so the bot
+    never sees a candle before it exists.
+
+    Parameters
+    ----------
+    candles : pandas.DataFrame
+        Bars with 'Timestamp', 'Open', 'High', 'Low', 'Close' and 'Volume' columns, oldest first.
+    clock : VirtualClock
+        Clock the feed reads the current time from.
+    interval : str
+        Bar interval of `candles`, e.g. "15m".
+    prices : pandas.DataFrame, optional
+        Recorded 'Timestamp' and 'Price' columns. Without it the price is the
+        close of the last closed bar.
+    """
+
+    def __init__(self, candles, clock, interval="15m", prices=None):
+        self.candles = candles.reset_index(drop=True)
+        self.clock = clock
+        self.interval = interval
+        timestamps = pd.to_datetime(self.candles["Timestamp"], utc=True)
+        self._bar_open = timestamps.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        self._bar_close = self._bar_open + _interval_delta(interval).value
+        self._closes = self.candles["Close"].to_numpy(dtype=np.float64)
+        self._price_times = None
+        if prices is not None:
+            self._price_times = pd.to_datetime(prices["Timestamp"], utc=True).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+            self._prices = prices["Price"].to_numpy(dtype=np.float64)
+
+    def event_times(self):
+        """
+        Sorted times at which a bar closes or a recorded price changes.
+        """
+        if self._price_times is None:
+            return self._bar_close
+        return np.union1d(self._bar_close, self._price_times)
+
+    def _closed_bars(self):
+        # Number of bars whose close time is not after the clock
+        return int(np.searchsorted(self._bar_close, self.clock.now.value, side="right"))
+
+    def fetch_candles(self, symbol, interval, start=None):
+        """
+        Same result as `acid_bot.fetch_candles`, from the recording.
+        """
+        end = self._closed_bars()
+        if start is None:
+            first = int(np.searchsorted(self._bar_open, (self.clock.now - pd.Timedelta(days=30)).value, side="left"))
+        else:
+            first = int(np.searchsorted(self._bar_open, _utc(start).value, side="left"))
+        return self.candles.iloc[first:end]
+
+    def get_price(self, symbol="ETH"):
+        """
+        Price as of the clock, or None before the first recorded price.
+        """
+        if self._price_times is not None:
+            index = int(np.searchsorted(self._price_times, self.clock.now.value, side="right")) - 1
+            return float(self._prices[index]) if index >= 0 else None
+        closed = self._closed_bars()
+        return float(self._closes[closed - 1]) if closed > 0 else None
+
+
+class SimulatedExchange:
+    """
+    Fills the bot's orders locally in place of GMX.
+
+    Positions are filled at the price the bot passes in, moved against the
+    trader by `slippage_percent`, and pay `fee_percent` of the notional on
+    open and on close. Sizes follow the bot: `size_delta_usd` is collateral,
+    and the notional is that times the leverage. A close order closes the
+    market's whole position, as `manage_position` assumes.
+
+    Parameters
+    ----------
+    clock : VirtualClock
+        Clock used to time-stamp fills.
+    initial_balance : float
+        Starting wallet balance in USD.
+    fee_percent : float
+        Position fee in percent of the notional, charged on open and close.
+    slippage_percent : float
+        Adverse price move applied to every fill, in percent.
+    """
+
+    def __init__(self, clock, initial_balance=10000, fee_percent=0.0, slippage_percent=0.0):
+        self.clock = clock
+        self.initial_balance = initial_balance
+        self.balance = initial_balance
+        self.fee_percent = fee_percent
+        self.slippage_percent = slippage_percent
+        self.positions = {}  # Market symbol -> open position
+        self.trades = []
+
+    def _fill_price(self, price, buy):
+        return price * (1 + self.slippage_percent / 100) if buy else price * (1 - self.slippage_percent / 100)
+
+    def open_position(self, is_long, eth_price, leverage, size_delta_usd, percentage, index_token_symbol="ETH"):
+        if size_delta_usd is None or index_token_symbol in self.positions:
+            log.error("Simulated open of %s ignored", index_token_symbol)
+            return
+        notional = size_delta_usd * leverage
+        self.balance -= notional * self.fee_percent / 100
+        self.positions[index_token_symbol] = {
+            "entry_time": self.clock.now,
+            "direction": 1 if is_long else -1,
+            "entry_price": self._fill_price(eth_price, buy=is_long),
+            "notional": notional,
+        }
+
+    def close_position(self, is_long, eth_price, leverage, size_delta_usd, percentage, index_token_symbol="ETH"):
+        position = self.positions.pop(index_token_symbol, None)
+        if position is None:
+            log.error("Simulated close of %s without an open position", index_token_symbol)
+            return
+        exit_price = self._fill_price(eth_price, buy=not is_long)
+        trade_return = position["direction"] * (exit_price - position["entry_price"]) / position["entry_price"]
+        profit = position["notional"] * trade_return
+        self.balance += profit - position["notional"] * self.fee_percent / 100
+        self.trades.append({
+            "Entry_Time": position["entry_time"],
+            "Exit_Time": self.clock.now,
+            "Direction": position["direction"],
+            "Entry_Price": position["entry_price"],
+            "Exit_Price": exit_price,
+            "Position_Size": position["notional"],
+            "Profit": profit,
+            "Balance": self.balance,
+        })
+
+    def get_wallet_balance(self, eth_price_usd=None):
+        """
+        (ETH, USD) wallet balance, as `acid_bot.get_wallet_balance` returns it.
+        """
+        if not eth_price_usd:
+            return None
+        return self.balance / eth_price_usd, self.balance
+
+    def trade_frame(self):
+        return pd.DataFrame(self.trades, columns=[
+            "Entry_Time", "Exit_Time", "Direction", "Entry_Price", "Exit_Price", "Position_Size", "Profit", "Balance",
+        ])
+
+    def summary(self):
+        """
+        Metrics in the same shape `run_backtest` reports.
+        """
+        trades = self.trade_frame()
+        open_position = next(iter(self.positions.values()), None)
+        return summarize({
+            "balance": trades["Balance"].to_numpy(dtype=np.float64),
+            "profit": trades["Profit"].to_numpy(dtype=np.float64),
+            "open_position": 0 if open_position is None else open_position["direction"],
+        }, self.initial_balance)
+
+
+@contextmanager
+def _patched(module, **values):
+    saved = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+def run_replay(strategy, candles, prices=None, interval="15m", warmup_bars=200, end=None,
+               initial_balance=10000, fee_percent=0.0, slippage_percent=0.0, fast_forward=True, output_dir=None):
+    """
+    Run `acid_bot.run_trading_bot` over recorded data on a virtual clock.
+
+    The bot's own loop, indicator engine, candle store and position
+    management run unchanged; only candle downloads, prices, the wallet
+    balance, order execution and the 5-minute sleep are replaced.
+
+    Parameters
+    ----------
+    strategy : dict
+        Strategy configuration, as loaded from strategy.yaml.
+    candles : pandas.DataFrame
+        Recorded bars, see `ReplayFeed`.
+    prices : pandas.DataFrame, optional
+        Recorded prices, see `ReplayFeed`.
+    interval : str
+        Bar interval of `candles`.
+    warmup_bars : int
+        Bars that have closed before the first iteration.
+    end : datetime-like, optional
+        Stop at this time. Defaults to the close of the last bar.
+    initial_balance : float
+        Starting wallet balance in USD.
+    fee_percent : float
+        Simulated position fee, see `SimulatedExchange`.
+    slippage_percent : float
+        Simulated slippage, see `SimulatedExchange`.
+    fast_forward : bool
+        Skip iterations whose inputs did not change, see `VirtualClock`.
+    output_dir : str, optional
+        Directory for the replay's candle store and metrics. A temporary one if None.
+
+    Returns
+    -------
+    trades : pandas.DataFrame
+        One row per closed trade.
+    metrics : dict
+        Summary metrics as in `run_backtest`, plus iteration count and speed.
+    """
+    import acid_bot
+
+    bar = _interval_delta(interval)
+    timestamps = pd.to_datetime(candles["Timestamp"], utc=True)
+    start = timestamps.iloc[min(warmup_bars, len(timestamps)) - 1] + bar
+    clock = VirtualClock(start, timestamps.iloc[-1] + bar if end is None else end)
+    feed = ReplayFeed(candles, clock, interval, prices)
+    if fast_forward:
+        clock.events = feed.event_times()
+    exchange = SimulatedExchange(clock, initial_balance, fee_percent, slippage_percent)
+
+    output_dir = output_dir or tempfile.mkdtemp(prefix="acid-replay-")
+    # The risk monitor ticks on real time, so the replay checks risk at iteration prices only
+    risk_management = {key: value for key, value in strategy["risk_management"].items() if key != "monitor_interval_seconds"}
+    replay_strategy = dict(strategy, risk_management=risk_management)
+
+    started = time.perf_counter()
+    with _patched(
+        acid_bot,
+        strategy=replay_strategy,
+        price_service=feed,
+        fetch_candles=feed.fetch_candles,
+        get_wallet_balance=exchange.get_wallet_balance,
+        open_position=exchange.open_position,
+        close_position=exchange.close_position,
+        sleep=clock.sleep,
+        candle_store_dir=os.path.join(output_dir, "candles"),
+        metrics_dir=None,  # Exported once at the end instead of every iteration
+        journal_path=None,  # Replays start flat and never touch the live position journal
+    ):
+        try:
+            acid_bot.run_trading_bot()
+        except ReplayFinished:
+            pass
+    wall_seconds = time.perf_counter() - started
+    acid_bot.metrics.export(os.path.join(output_dir, "metrics"))
+
+    metrics = exchange.summary()
+    metrics["iterations"] = clock.sleeps
+    metrics["skipped_iterations"] = clock.skipped
+    metrics["virtual_days"] = (clock.now - start).total_seconds() / 86400
+    metrics["wall_seconds"] = wall_seconds
+    metrics["speedup"] = (clock.now - start).total_seconds() / wall_seconds if wall_seconds else None
+    return exchange.trade_frame(), metrics
+
+
+def backtest_reference(strategy, candles, warmup_bars=200, initial_balance=10000):
+    """
+    Backtest of the same strategy on the same bars, for comparison with a replay.
+
+    Signals come from `generate_signals` and trade at the close of the
+    signal bar, as the live loop does.
+    """
+    import acid_bot
+
+    data = candles.reset_index(drop=True).copy()
+    acid_bot.generate_signals(data, strategy, compile_rules(strategy))
+    data = data.iloc[warmup_bars - 1:].set_index("Timestamp")
+    risk = strategy["risk_management"]
+    return run_backtest(
+        data,
+        leverage=strategy["trade_settings"].get("leverage", 5),
+        trade_size_percentage=strategy["trade_settings"]["open_position_percentage"],
+        initial_balance=initial_balance,
+        take_profit_percent=risk["take_profit_percent"],
+        stop_loss_percent=risk["stop_loss_percent"],
+    )
+
+
+def load_candles(path, symbol="ETH-USD", interval="15m"):
+    """
+    Recorded candles from a CSV file or a `CandleStore` directory.
+    """
+    if os.path.isdir(path):
+        from candle_store import CandleStore
+
+        store = CandleStore(path)
+        columns = store.window(symbol, interval, store.count(symbol, interval))
+        return pd.DataFrame({
+            "Timestamp": pd.to_datetime(np.asarray(columns["timestamp"]), utc=True),
+            "Open": np.asarray(columns["open"]),
+            "High": np.asarray(columns["high"]),
+            "Low": np.asarray(columns["low"]),
+            "Close": np.asarray(columns["close"]),
+            "Volume": np.asarray(columns["volume"]),
+        })
+    candles = pd.read_csv(path)
+    candles["Timestamp"] = pd.to_datetime(candles["Timestamp"], utc=True)
+    return candles
+
+
+def main():
+    from utils import load_yaml
+
+    parser = argparse.ArgumentParser(
+        description="Replay recorded candles through the live trading loop offline - ACID."
+    )
+    parser.add_argument("--strategy", help="Path to the strategy YAML file.", default=os.path.join("utils", "strategy.yaml"))
+    parser.add_argument("--candles", help="CSV with Timestamp/Open/High/Low/Close/Volume, or a candle store directory.", default=os.path.join("data", "candles"))
+    parser.add_argument("--symbol", help="Series in a candle store directory.", default="ETH-USD")
+    parser.add_argument("--interval", help="Bar interval of the candles.", default="15m")
+    parser.add_argument("--prices", help="Optional CSV with Timestamp/Price recorded from the live price feed.", default=None)
+    parser.add_argument("--balance", help="Starting balance in USD.", type=float, default=10000)
+    parser.add_argument("--fee", help="Position fee in percent of the notional.", type=float, default=0.0)
+    parser.add_argument("--slippage", help="Slippage per fill in percent.", type=float, default=0.0)
+    parser.add_argument("--compare-backtest", help="Also backtest the same bars and print both results.", action="store_true")
+    args = parser.parse_args()
+
+    strategy = load_yaml(args.strategy)
+    strategy = strategy.get("strategy", strategy)  # Accept the file with or without its top-level key
+    candles = load_candles(args.candles, args.symbol, args.interval)
+    prices = None
+    if args.prices is not None:
+        prices = pd.read_csv(args.prices)
+
+    trades, metrics = run_replay(
+        strategy, candles, prices, args.interval,
+        initial_balance=args.balance, fee_percent=args.fee, slippage_percent=args.slippage,
+    )
+    print(f"Replayed {metrics['virtual_days']:.1f} days ({metrics['iterations']} iterations) in {metrics['wall_seconds']:.1f}s, "
+          f"{metrics['speedup']:.0f}x real time.")
+    print(f"Replay:   {metrics['trades']} trades, final balance {metrics['final_balance']:.2f}, "
+          f"profit {metrics['profit_percent']:.2f}%, max drawdown {metrics['max_drawdown_percent']:.2f}%")
+    if args.compare_backtest:
+        _, reference = backtest_reference(strategy, candles, initial_balance=args.balance)
+        print(f"Backtest: {reference['trades']} trades, final balance {reference['final_balance']:.2f}, "
+              f"profit {reference['profit_percent']:.2f}%, max drawdown {reference['max_drawdown_percent']:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
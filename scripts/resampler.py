@@ -0,0 +1,286 @@
+import numpy as np
+import pandas as pd
+
+FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+def interval_nanoseconds(interval):
+    """
+    Length of a yfinance style interval ("1m", "15m", "1h", "4h", "1d") in nanoseconds.
+    """
+    if interval.endswith("m"):
+        interval = interval[:-1] + "min"
+    return pd.Timedelta(interval).value
+
+
+class TimeframeBars:
+    """
+    OHLCV bars of one timeframe in preallocated column arrays.
+
+    The last row is the bar currently being built. Rows are appended in
+    place; when the arrays are full, the newest `window` rows are moved to
+    the front, so the latest bars are always one contiguous slice and reads
+    are views rather than copies.
+
+    Parameters
+    ----------
+    interval : str
+        Bar interval, e.g. "1h".
+    window : int
+        Number of bars that must stay readable.
+    """
+
+    def __init__(self, interval, window):
+        self.interval = interval
+        self.nanoseconds = interval_nanoseconds(interval)
+        self.window = int(window)
+        self.count = 0
+        self.columns = {
+            field: np.zeros(2 * self.window, dtype=np.int64 if field == "timestamp" else np.float64)
+            for field in FIELDS
+        }
+
+    def ensure_room(self, rows):
+        # Make room for `rows` more rows, moving the newest `window` rows to the front if needed
+        capacity = len(self.columns["timestamp"])
+        if self.count + rows <= capacity:
+            return
+        keep = min(self.count, self.window)
+        capacity = max(capacity, keep + rows)
+        for field, values in self.columns.items():
+            moved = np.zeros(capacity, dtype=values.dtype)
+            moved[:keep] = values[self.count - keep:self.count]
+            self.columns[field] = moved
+        self.count = keep
+
+    def apply(self, timestamp, open_, high, low, close, volume):
+        """
+        Aggregate base bars, oldest first, into this timeframe.
+
+        The first base bar may fall into the bucket of the last row, which
+        is then extended instead of starting a new bar.
+        """
+        bucket = timestamp - timestamp % self.nanoseconds
+        starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+        ends = np.append(starts[1:], len(bucket)) - 1
+        groups = {
+            "timestamp": bucket[starts],
+            "open": open_[starts],
+            "high": np.maximum.reduceat(high, starts),
+            "low": np.minimum.reduceat(low, starts),
+            "close": close[ends],
+            "volume": np.add.reduceat(volume, starts),
+        }
+
+        columns = self.columns
+        first = 0
+        if self.count > 0 and groups["timestamp"][0] == columns["timestamp"][self.count - 1]:
+            last = self.count - 1
+            columns["high"][last] = max(columns["high"][last], groups["high"][0])
+            columns["low"][last] = min(columns["low"][last], groups["low"][0])
+            columns["close"][last] = groups["close"][0]
+            columns["volume"][last] += groups["volume"][0]
+            first = 1
+
+        rows = len(starts) - first
+        self.ensure_room(rows)
+        for field in FIELDS:
+            self.columns[field][self.count:self.count + rows] = groups[field][first:]
+        self.count += rows
+
+    def snapshot(self):
+        # Row count and last row, enough to undo applying one more base bar
+        if self.count == 0:
+            return 0, None
+        return self.count, {field: values[self.count - 1] for field, values in self.columns.items()}
+
+    def restore(self, snapshot):
+        self.count, row = snapshot
+        if row is not None:
+            for field, value in row.items():
+                self.columns[field][self.count - 1] = value
+
+    def window_view(self, length=None, closed_only=False):
+        end = self.count - 1 if closed_only else self.count
+        start = max(0, end - (self.window if length is None else length))
+        return {field: values[start:end] for field, values in self.columns.items()}
+
+
+class Resampler:
+    """
+    Builds several higher-timeframe OHLCV series from one base stream.
+
+    Base bars (e.g. 1-minute candles) or raw price ticks are aggregated
+    into every timeframe as they arrive, with vectorized work per update,
+    so one feed drives 5m, 15m, 1h and 4h views without downloading each
+    interval. Buckets are aligned to the Unix epoch, like exchange candles.
+
+    The last bar of each timeframe is partial until a base bar that
+    reaches its end has been applied. A base bar with the same timestamp
+    as the previous one replaces it, so the still-forming candle of the
+    base feed is revised instead of being counted twice.
+
+    Parameters
+    ----------
+    intervals : list of str
+        Timeframes to maintain, e.g. ["5m", "15m", "1h", "4h"].
+    base_interval : str, optional
+        Interval of the base bars, e.g. "1m". None for price ticks, which
+        are never revised and whose bars are partial until a later tick.
+    window : int
+        Bars per timeframe that stay readable.
+    """
+
+    def __init__(self, intervals, base_interval=None, window=200):
+        self.base_interval = base_interval
+        self.base_nanoseconds = None if base_interval is None else interval_nanoseconds(base_interval)
+        self.window = int(window)
+        self.timeframes = {interval: TimeframeBars(interval, window) for interval in intervals}
+        self.last_timestamp = None  # Base bar or tick time, nanoseconds
+        self._undo = None
+
+    def history_bars(self):
+        """
+        Base bars needed to fill `window` bars of the longest timeframe.
+        """
+        if self.base_nanoseconds is None:
+            raise ValueError("Price ticks have no fixed bar count")
+        longest = max(bars.nanoseconds for bars in self.timeframes.values())
+        return self.window * longest // self.base_nanoseconds
+
+    def update(self, timestamp, open_, high, low, close, volume):
+        """
+        Apply base bars, oldest first.
+
+        Parameters
+        ----------
+        timestamp : numpy.ndarray
+            Bar open times as int64 nanoseconds since epoch, UTC.
+        open_, high, low, close, volume : numpy.ndarray
+            Bar values.
+
+        Returns
+        -------
+        int
+            Number of base bars applied, including a revised last bar.
+        """
+        timestamp = np.asarray(timestamp, dtype=np.int64)
+        values = [np.asarray(column, dtype=np.float64) for column in (open_, high, low, close, volume)]
+
+        start = 0
+        if self.last_timestamp is not None:
+            # Older bars were already applied; a bar at the last time revises it
+            revise = self.base_nanoseconds is not None
+            start = int(np.searchsorted(timestamp, self.last_timestamp, side="left" if revise else "right"))
+            if revise and start < len(timestamp) and timestamp[start] == self.last_timestamp and self._undo is not None:
+                for interval, snapshot in self._undo.items():
+                    self.timeframes[interval].restore(snapshot)
+        if start >= len(timestamp):
+            return 0
+
+        timestamp = timestamp[start:]
+        values = [column[start:] for column in values]
+        for bars in self.timeframes.values():
+            bars.ensure_room(len(timestamp))  # No rows move while the undo snapshot is held
+        # Everything but the last bar, then a snapshot to undo it if it gets revised
+        if len(timestamp) > 1:
+            for bars in self.timeframes.values():
+                bars.apply(timestamp[:-1], *(column[:-1] for column in values))
+        self._undo = {interval: bars.snapshot() for interval, bars in self.timeframes.items()}
+        for bars in self.timeframes.values():
+            bars.apply(timestamp[-1:], *(column[-1:] for column in values))
+        self.last_timestamp = int(timestamp[-1])
+        return len(timestamp)
+
+    def update_frame(self, data):
+        """
+        Apply base bars from a DataFrame, as returned by `acid_bot.fetch_candles`.
+
+        Parameters
+        ----------
+        data : pandas.DataFrame
+            Bars with 'Timestamp', 'Open', 'High', 'Low', 'Close' and 'Volume' columns.
+        """
+        timestamps = pd.to_datetime(data["Timestamp"], utc=True)
+        return self.update(
+            timestamps.to_numpy(dtype="datetime64[ns]").astype(np.int64),
+            data["Open"].to_numpy(dtype=np.float64),
+            data["High"].to_numpy(dtype=np.float64),
+            data["Low"].to_numpy(dtype=np.float64),
+            data["Close"].to_numpy(dtype=np.float64),
+            data["Volume"].to_numpy(dtype=np.float64),
+        )
+
+    def update_ticks(self, timestamp, price, volume=None):
+        """
+        Apply price ticks, e.g. GMX oracle prices, oldest first.
+
+        Parameters
+        ----------
+        timestamp : numpy.ndarray
+            Tick times as int64 nanoseconds since epoch, UTC.
+        price : numpy.ndarray
+            Tick prices.
+        volume : numpy.ndarray, optional
+            Traded volume per tick, zero if None.
+        """
+        price = np.asarray(price, dtype=np.float64)
+        volume = np.zeros(len(price)) if volume is None else volume
+        return self.update(timestamp, price, price, price, price, volume)
+
+    def partial(self, interval):
+        """
+        Whether the last bar of `interval` is still being built.
+        """
+        bars = self.timeframes[interval]
+        if bars.count == 0:
+            return False
+        if self.base_nanoseconds is None:
+            return True
+        bar_end = bars.columns["timestamp"][bars.count - 1] + bars.nanoseconds
+        return self.last_timestamp + self.base_nanoseconds < bar_end
+
+    def window_arrays(self, interval, length=None, closed_only=False):
+        """
+        Views of the latest bars of a timeframe.
+
+        Parameters
+        ----------
+        interval : str
+            Timeframe, e.g. "1h".
+        length : int, optional
+            Maximum number of bars, default `window`.
+        closed_only : bool
+            Leave out the last bar while it is partial.
+
+        Returns
+        -------
+        dict
+            Column name ('timestamp', 'open', ...) to a view of the latest
+            rows, oldest first. Views change as updates arrive; copy them to
+            keep a fixed state.
+        """
+        closed_only = closed_only and self.partial(interval)
+        return self.timeframes[interval].window_view(length, closed_only)
+
+    def frame(self, interval, length=None, closed_only=False):
+        """
+        Latest bars of a timeframe as a DataFrame for `generate_signals`.
+
+        The price columns share memory with the resampler instead of being
+        copied. See `window_arrays` for the parameters.
+
+        Returns
+        -------
+        pandas.DataFrame
+            'Timestamp', 'Open', 'High', 'Low', 'Close' and 'Volume' columns.
+        """
+        columns = self.window_arrays(interval, length, closed_only)
+        return pd.DataFrame({
+            "Timestamp": pd.to_datetime(columns["timestamp"], utc=True),
+            "Open": columns["open"],
+            "High": columns["high"],
+            "Low": columns["low"],
+            "Close": columns["close"],
+            "Volume": columns["volume"],
+        }, copy=False)
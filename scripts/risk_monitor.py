@@ -0,0 +1,171 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from logger import get_logger
+from price_service import get_oracle_prices
+
+log = get_logger("risk_monitor")
+
+
+def check_risk_management_batch(direction, entry_price, current_price, take_profit_percent, stop_loss_percent):
+    """
+    Vectorized `check_risk_management` for many positions at once.
+
+    Parameters
+    ----------
+    direction : numpy.ndarray
+        1 for long positions, -1 for short positions.
+    entry_price : numpy.ndarray
+        Entry price of each position.
+    current_price : numpy.ndarray
+        Current price of each position's market.
+    take_profit_percent : float
+        Favourable move in percent that takes profit.
+    stop_loss_percent : float
+        Adverse move in percent that stops the loss.
+
+    Returns
+    -------
+    numpy.ndarray
+        "take_profit", "stop_loss" or None per position.
+    """
+    direction = np.asarray(direction, dtype=np.float64)
+    entry_price = np.asarray(entry_price, dtype=np.float64)
+    current_price = np.asarray(current_price, dtype=np.float64)
+
+    # Same price levels as check_risk_management, mirrored for shorts by the direction sign
+    take_profit_price = entry_price * (1 + direction * take_profit_percent / 100)
+    stop_loss_price = entry_price * (1 - direction * stop_loss_percent / 100)
+    take_profit = direction * (current_price - take_profit_price) >= 0
+    stop_loss = direction * (current_price - stop_loss_price) <= 0
+
+    events = np.full(len(direction), None, dtype=object)
+    events[stop_loss] = "stop_loss"
+    events[take_profit] = "take_profit"  # Take profit wins when both hit, as in check_risk_management
+    return events
+
+
+class RiskMonitor:
+    """
+    Checks take-profit and stop-loss on oracle prices every few seconds.
+
+    Runs on its own thread next to the slower candle and signal loop. Each
+    tick reads the prices of every market with an open position from one
+    oracle request, evaluates all positions in one array operation and
+    hands triggered ones to `on_trigger` without waiting for the main loop.
+
+    Parameters
+    ----------
+    states : dict
+        Market symbol -> position state dict ('current_position',
+        'entry_price', ...), shared with the trading loop.
+    tokens : dict
+        Market symbol -> (index token address, decimals).
+    on_trigger : callable
+        `on_trigger(symbol, risk_event, price)`, run on a worker thread.
+    take_profit_percent : float
+        Take profit level in percent.
+    stop_loss_percent : float
+        Stop loss level in percent.
+    interval : float
+        Seconds between ticks.
+    chain : str
+        Chain for oracle prices.
+    oracle : object, optional
+        Stand-in for `OraclePrices`, see `get_oracle_prices`.
+    """
+
+    def __init__(self, states, tokens, on_trigger, take_profit_percent, stop_loss_percent,
+                 interval=1.0, chain="arbitrum", oracle=None):
+        self.states = states
+        self.tokens = tokens
+        self.on_trigger = on_trigger
+        self.take_profit_percent = take_profit_percent
+        self.stop_loss_percent = stop_loss_percent
+        self.interval = interval
+        self.chain = chain
+        self.oracle = oracle
+        self.last_tick_seconds = None
+
+        self._closing = set()  # Symbols with a close in progress, not re-triggered
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="risk-close")
+        self._stop_monitor = threading.Event()
+        self._thread = None
+
+    def _trigger(self, symbol, risk_event, price):
+        try:
+            self.on_trigger(symbol, risk_event, price)
+        except Exception as e:
+            log.error("Closing %s after %s failed: %s", symbol, risk_event, e)
+        finally:
+            self._closing.discard(symbol)
+
+    def tick(self):
+        """
+        Check every open position once and trigger the ones that hit a level.
+
+        Returns
+        -------
+        dict
+            Market symbol -> risk event for the positions triggered this tick.
+        """
+        started = time.perf_counter()
+        symbols = [
+            symbol for symbol, state in self.states.items()
+            if state["current_position"] != 0 and state["entry_price"] > 0 and symbol not in self._closing
+        ]
+        if not symbols:
+            return {}
+
+        prices = get_oracle_prices({symbol: self.tokens[symbol] for symbol in symbols}, self.chain, self.oracle)
+        symbols = [symbol for symbol in symbols if symbol in prices]
+        states = [self.states[symbol] for symbol in symbols]
+        current_price = np.array([prices[symbol] for symbol in symbols])
+        events = check_risk_management_batch(
+            [state["current_position"] for state in states],
+            [state["entry_price"] for state in states],
+            current_price,
+            self.take_profit_percent,
+            self.stop_loss_percent,
+        )
+
+        triggered = {}
+        for index in np.flatnonzero(events != None):  # noqa: E711 - elementwise on an object array
+            symbol = symbols[index]
+            triggered[symbol] = events[index]
+            self._closing.add(symbol)
+            log.info("Risk level hit", extra={"fields": {"market": symbol, "risk_event": events[index], "price": float(current_price[index])}})
+            self._executor.submit(self._trigger, symbol, events[index], current_price[index])
+        self.last_tick_seconds = time.perf_counter() - started
+        return triggered
+
+    def start(self):
+        """
+        Start ticking on a daemon thread.
+        """
+        if self._thread is not None:
+            return
+
+        def monitor_loop():
+            while not self._stop_monitor.wait(self.interval):
+                try:
+                    self.tick()
+                except Exception as e:
+                    log.error("Risk monitor tick failed: %s", e)
+
+        self._stop_monitor.clear()
+        self._thread = threading.Thread(target=monitor_loop, name="risk-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop ticking and wait for closes in progress.
+        """
+        self._stop_monitor.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=True)
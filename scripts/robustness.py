@@ -0,0 +1,489 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import BACKTEST_STRATEGY, simulate_trades, summarize
+from indicators import get_ta
+from rules import compile_rules
+
+# Simulations per task and per 2D block; a block holds SIMULATION_BLOCK x path length floats
+SIMULATION_BLOCK = 1000
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+METRICS = ("final_balance", "profit_percent", "max_drawdown_percent", "win_rate", "trades")
+
+# Per-process state, set up by _attach_history in every worker
+_history = None
+_ta = None
+
+
+def trade_returns(trades):
+    """
+    Unlevered return of every closed trade of a `run_backtest` result.
+
+    Parameters
+    ----------
+    trades : pandas.DataFrame
+        Trades with 'Direction', 'Entry_Price' and 'Exit_Price' columns.
+
+    Returns
+    -------
+    numpy.ndarray
+        Price move in the direction of each trade, as a fraction of its entry price.
+    """
+    direction = trades["Direction"].to_numpy(dtype=np.float64)
+    entry_price = trades["Entry_Price"].to_numpy(dtype=np.float64)
+    return direction * (trades["Exit_Price"].to_numpy(dtype=np.float64) - entry_price) / entry_price
+
+
+def equity_metrics(growth, initial_balance=10000):
+    """
+    Final balance and max drawdown of many compounded trade sequences at once.
+
+    Uses the same definitions as `backtest_engine.summarize`, one row per
+    simulation.
+
+    Parameters
+    ----------
+    growth : numpy.ndarray
+        Balance growth factor per trade, shape (simulations, trades).
+        Overwritten with the equity curves.
+    initial_balance : float
+        Starting balance in USD.
+
+    Returns
+    -------
+    dict
+        'final_balance', 'profit_percent' and 'max_drawdown_percent' arrays.
+    """
+    simulations, trades = growth.shape
+    if trades == 0:
+        final = np.ones(simulations)
+        drawdown = np.zeros(simulations)
+    else:
+        equity = np.cumprod(growth, axis=1, out=growth)
+        peak = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peak, 1.0, out=peak)  # The initial balance is the first peak
+        drawdown = 1 - (equity / peak).min(axis=1)
+        final = equity[:, -1]
+    return {
+        "final_balance": initial_balance * final,
+        "profit_percent": (final - 1) * 100,
+        "max_drawdown_percent": drawdown * 100,
+    }
+
+
+def _bootstrap_trade_block(task):
+    returns, simulations, length, exposure, initial_balance, seed = task
+    rng = np.random.default_rng(seed)
+    sampled = returns[rng.integers(0, len(returns), (simulations, length))]
+    win_rate = (sampled > 0).mean(axis=1) if length else np.zeros(simulations)
+
+    # Growth per trade as in _trade_results, built in place
+    sampled *= exposure
+    sampled += 1
+    metrics = equity_metrics(sampled, initial_balance)
+    metrics.update(win_rate=win_rate, trades=np.full(simulations, length))
+    return metrics
+
+
+def _attach_history(close, volume, backend):
+    global _history, _ta
+    _history = (close, volume)
+    _ta = get_ta(backend)
+
+
+def block_bootstrap(close, volume, simulations, length, block_size, rng):
+    """
+    Synthetic price and volume paths stitched from blocks of the history.
+
+    Log returns are resampled in contiguous blocks, which keeps the
+    volatility clustering and short-term autocorrelation the strategy
+    trades on. Every bar's volume moves with its return.
+
+    Parameters
+    ----------
+    close, volume : numpy.ndarray
+        Historical closes and volumes.
+    simulations : int
+        Number of paths.
+    length : int
+        Bars per path, including the first bar at the historical start price.
+    block_size : int
+        Bars per resampled block.
+    rng : numpy.random.Generator
+        Random source.
+
+    Returns
+    -------
+    close, volume : numpy.ndarray
+        Paths of shape (simulations, length).
+    """
+    log_returns = np.diff(np.log(close))
+    if block_size > len(log_returns):
+        raise ValueError(f"Block size {block_size} is longer than the {len(log_returns)} bar history")
+    blocks = -(-(length - 1) // block_size)
+    starts = rng.integers(0, len(log_returns) - block_size + 1, (simulations, blocks))
+    index = (starts[:, :, None] + np.arange(block_size)).reshape(simulations, -1)[:, :length - 1]
+
+    paths = np.empty((simulations, length))
+    paths[:, 0] = 0.0
+    np.cumsum(log_returns[index], axis=1, out=paths[:, 1:])
+    np.exp(paths, out=paths)
+    paths *= close[0]
+
+    volumes = np.empty((simulations, length))
+    volumes[:, 0] = volume[0]
+    volumes[:, 1:] = volume[1:][index]
+    return paths, volumes
+
+
+def strategy_signal(ta, close, volume, strategy, rules):
+    """
+    Position signal per bar for `simulate_trades`, as `apply_strategy` builds it.
+
+    Parameters
+    ----------
+    ta : module
+        Indicator backend, see `indicators.get_ta`.
+    close, volume : numpy.ndarray
+        Prices and volumes of one path.
+    strategy : dict
+        Indicator settings shaped like strategy.yaml.
+    rules : CompiledRules
+        Long and short rules.
+
+    Returns
+    -------
+    numpy.ndarray
+        Signal traded on the bar after it appears, NaN on the first bar.
+    """
+    bb_length = strategy["bollinger_bands"]["length"]
+    bb_multiplier = strategy["bollinger_bands"]["multiplier"]
+    upper, middle, lower = ta.BBANDS(close, timeperiod=bb_length, nbdevup=bb_multiplier, nbdevdn=bb_multiplier, matype=0)
+    columns = {
+        "Close": close,
+        "Volume": volume,
+        "Volume_MA": ta.SMA(volume, timeperiod=strategy["volume"]["moving_avg_length"]),
+        "BB_MA": middle,
+        "BB_Upper": upper,
+        "BB_Lower": lower,
+        "RSI": ta.RSI(close, timeperiod=strategy["rsi"]["length"]),
+    }
+    position = rules.signals(columns)[2]
+
+    signal = np.empty(len(close))
+    signal[0] = np.nan
+    signal[1:] = position[:-1]
+    return signal
+
+
+def _price_path_block(task):
+    simulations, length, block_size, strategy, settings, seed = task
+    close, volume = _history
+    paths, volumes = block_bootstrap(close, volume, simulations, length, block_size, np.random.default_rng(seed))
+    rules = compile_rules(strategy)
+
+    metrics = {name: np.empty(simulations) for name in METRICS}
+    for row in range(simulations):
+        signal = strategy_signal(_ta, paths[row], volumes[row], strategy, rules)
+        result = simulate_trades(paths[row], signal, **settings)
+        for name, value in summarize(result, settings["initial_balance"]).items():
+            if name in metrics:
+                metrics[name][row] = value
+    return metrics
+
+
+def _run_blocks(function, tasks, workers, initializer=None, initargs=()):
+    # Every block has its own seed, so results do not depend on the worker count
+    if workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        blocks = [function(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+            blocks = list(executor.map(function, tasks))
+    return pd.DataFrame({name: np.concatenate([block[name] for block in blocks]) for name in METRICS})
+
+
+def _block_sizes(simulations, seed):
+    sizes = [min(SIMULATION_BLOCK, simulations - start) for start in range(0, simulations, SIMULATION_BLOCK)]
+    return zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes)))
+
+
+def bootstrap_trades(returns, simulations=10000, trades_per_path=None, leverage=5, trade_size_percentage=0.1,
+                     initial_balance=10000, workers=None, seed=None):
+    """
+    Resample the order of historical trades, with replacement, into many equity paths.
+
+    Each simulation draws `trades_per_path` trades from `returns` and
+    compounds them like `run_backtest`. Simulations are evaluated as 2D
+    arrays in blocks of `SIMULATION_BLOCK` spread over a process pool.
+
+    Parameters
+    ----------
+    returns : numpy.ndarray
+        Unlevered trade returns, see `trade_returns`.
+    simulations : int
+        Number of equity paths.
+    trades_per_path : int, optional
+        Trades per path, default the number of historical trades.
+    leverage : float
+        Leverage applied to each trade.
+    trade_size_percentage : float
+        Fraction of the balance used for each trade.
+    initial_balance : float
+        Starting balance in USD.
+    workers : int, optional
+        Number of worker processes. Defaults to the CPU count.
+    seed : int, optional
+        Seed for reproducible results.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per simulation with 'final_balance', 'profit_percent',
+        'max_drawdown_percent', 'win_rate' and 'trades'.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) == 0:
+        raise ValueError("Cannot bootstrap a backtest without closed trades")
+    length = len(returns) if trades_per_path is None else int(trades_per_path)
+    exposure = trade_size_percentage * leverage
+    tasks = [(returns, size, length, exposure, initial_balance, seed) for size, seed in _block_sizes(simulations, seed)]
+    return _run_blocks(_bootstrap_trade_block, tasks, workers or os.cpu_count())
+
+
+def bootstrap_prices(close, volume, strategy=None, simulations=1000, length=None, block_size=96, leverage=5,
+                     trade_size_percentage=0.1, initial_balance=10000, take_profit_percent=None,
+                     stop_loss_percent=None, workers=None, seed=None, backend=None):
+    """
+    Run the strategy on block-bootstrapped price paths.
+
+    Unlike `bootstrap_trades`, the trades themselves change: indicators,
+    signals, take-profit and stop-loss exits are recomputed on every path,
+    so this also shows how the strategy copes with markets it was not
+    tuned on. Paths are generated as 2D arrays per block of simulations.
+
+    Parameters
+    ----------
+    close, volume : numpy.ndarray
+        Historical closes and volumes.
+    strategy : dict, optional
+        Indicator settings and optional rules shaped like strategy.yaml,
+        default `BACKTEST_STRATEGY`.
+    simulations : int
+        Number of price paths.
+    length : int, optional
+        Bars per path, default the length of the history.
+    block_size : int
+        Bars per resampled block, e.g. 96 for one day of 15m bars.
+    backend : str, optional
+        Indicator backend for the workers, see `indicators.get_ta`.
+
+    See `bootstrap_trades` and `run_backtest` for the remaining parameters.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per simulation, see `bootstrap_trades`.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    strategy = strategy or BACKTEST_STRATEGY
+    settings = {
+        "leverage": leverage,
+        "trade_size_percentage": trade_size_percentage,
+        "initial_balance": initial_balance,
+        "take_profit_percent": take_profit_percent,
+        "stop_loss_percent": stop_loss_percent,
+    }
+    length = len(close) if length is None else int(length)
+    tasks = [(size, length, block_size, strategy, settings, seed) for size, seed in _block_sizes(simulations, seed)]
+    return _run_blocks(
+        _price_path_block, tasks, workers or os.cpu_count(),
+        initializer=_attach_history, initargs=(close, volume, backend),
+    )
+
+
+def distribution(results, percentiles=PERCENTILES):
+    """
+    Percentiles of every simulated metric.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per percentile ("p5", "p50", ...) and one column per metric.
+    """
+    table = results.quantile([p / 100 for p in percentiles])
+    table.index = [f"p{p}" for p in percentiles]
+    return table
+
+
+def size_for_drawdown(returns, max_drawdown_percent, confidence=0.95, simulations=10000, trades_per_path=None,
+                      leverage=5, seed=None):
+    """
+    Largest trade size whose bootstrapped max drawdown stays within a limit.
+
+    Every candidate size is evaluated on the same resampled trade
+    sequences, so the drawdown percentile only changes with the size and
+    a bisection finds the limit.
+
+    Parameters
+    ----------
+    returns : numpy.ndarray
+        Unlevered trade returns, see `trade_returns`.
+    max_drawdown_percent : float
+        Drawdown limit in percent, e.g. 20.
+    confidence : float
+        Share of simulations that must stay within the limit, e.g. 0.95.
+
+    See `bootstrap_trades` for the remaining parameters.
+
+    Returns
+    -------
+    float
+        Fraction of the balance per trade, as `open_position_percentage`.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    length = len(returns) if trades_per_path is None else int(trades_per_path)
+    blocks = list(_block_sizes(simulations, seed))
+
+    def drawdown_at(size):
+        drawdowns = [
+            _bootstrap_trade_block((returns, block, length, size * leverage, 1.0, block_seed))["max_drawdown_percent"]
+            for block, block_seed in blocks
+        ]
+        return np.quantile(np.concatenate(drawdowns), confidence)
+
+    low, high = 0.0, 1.0
+    if drawdown_at(high) <= max_drawdown_percent:
+        return high
+    for _ in range(20):
+        middle = (low + high) / 2
+        if drawdown_at(middle) <= max_drawdown_percent:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def main():
+    from replay import load_candles
+    from utils import load_yaml
+
+    parser = argparse.ArgumentParser(
+        description="Monte Carlo robustness of the backtest: trade and price-path bootstraps - ACID."
+    )
+    parser.add_argument("--candles", help="CSV with Timestamp/Open/High/Low/Close/Volume, or a candle store directory. Downloads from Yahoo Finance if omitted.", default=None)
+    parser.add_argument("--symbol", help="Ticker or candle store series.", default="ETH-USD")
+    parser.add_argument("--start", help="Start date (YYYY-MM-DD) of the download.", default="2024-09-01")
+    parser.add_argument("--end", help="End date (YYYY-MM-DD) of the download.", default="2024-10-12")
+    parser.add_argument("--interval", help="Bar interval.", default="15m")
+    parser.add_argument("--strategy", help="Strategy YAML file; default the built-in backtest settings.", default=None)
+    parser.add_argument("--simulations", help="Trade bootstrap simulations.", type=int, default=10000)
+    parser.add_argument("--price-simulations", help="Price path simulations, 0 to skip.", type=int, default=1000)
+    parser.add_argument("--horizon-days", help="Days of trading per simulated path.", type=float, default=365)
+    parser.add_argument("--block-size", help="Bars per block of the price bootstrap.", type=int, default=96)
+    parser.add_argument("--leverage", type=float, default=5)
+    parser.add_argument("--trade-size", help="Fraction of the balance per trade.", type=float, default=0.1)
+    parser.add_argument("--balance", help="Starting balance in USD.", type=float, default=10000)
+    parser.add_argument("--take-profit", help="Take-profit level in percent.", type=float, default=None)
+    parser.add_argument("--stop-loss", help="Stop-loss level in percent.", type=float, default=None)
+    parser.add_argument("--max-drawdown", help="Also print the largest trade size within this drawdown, in percent.", type=float, default=None)
+    parser.add_argument("--confidence", help="Confidence for --max-drawdown.", type=float, default=0.95)
+    parser.add_argument("--workers", help="Number of worker processes.", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--ta-backend", help="Indicator backend: talib, numpy or auto.", default=None)
+    parser.add_argument("--output", help="Write the simulations to <output>_trades.csv and <output>_prices.csv.", default=None)
+    args = parser.parse_args()
+
+    strategy = BACKTEST_STRATEGY
+    if args.strategy is not None:
+        strategy = load_yaml(args.strategy)
+        strategy = strategy.get("strategy", strategy)  # Accept the file with or without its top-level key
+
+    if args.candles is not None:
+        data = load_candles(args.candles, args.symbol, args.interval).set_index("Timestamp")
+    else:
+        import yfinance as yf
+
+        print(f"[DEBUG] Fetching {args.symbol} {args.interval} data from {args.start} to {args.end}...")
+        data = yf.download(args.symbol, start=args.start, end=args.end, interval=args.interval)
+        if isinstance(data.columns, pd.MultiIndex):
+            data.columns = data.columns.get_level_values(0)
+        data.dropna(inplace=True)
+    # The history is scaled to the horizon by its length in days, so it has to span some time
+    history_days = (data.index[-1] - data.index[0]) / pd.Timedelta(days=1) if len(data) else 0.0
+    if history_days <= 0:
+        print(f"[ERROR] Need at least two bars at different times to scale the history to a horizon, got {len(data)} bar(s).")
+        return 1
+    close = data["Close"].to_numpy(dtype=np.float64)
+    volume = data["Volume"].to_numpy(dtype=np.float64)
+
+    settings = {
+        "leverage": args.leverage,
+        "trade_size_percentage": args.trade_size,
+        "initial_balance": args.balance,
+        "take_profit_percent": args.take_profit,
+        "stop_loss_percent": args.stop_loss,
+    }
+    signal = strategy_signal(get_ta(args.ta_backend), close, volume, strategy, compile_rules(strategy))
+    history = simulate_trades(close, signal, **settings)
+    metrics = summarize(history, args.balance)
+    print(f"Historical: {metrics['trades']} trades, final balance {metrics['final_balance']:.2f}, "
+          f"profit {metrics['profit_percent']:.2f}%, max drawdown {metrics['max_drawdown_percent']:.2f}%")
+
+    # Scale the history to the horizon: trades per path at the historical rate, bars per path by the interval
+    returns = history["direction"] * (history["exit_price"] - history["entry_price"]) / history["entry_price"]
+    trades_per_path = max(1, round(len(returns) * args.horizon_days / history_days))
+    bars_per_path = max(2, round((len(close) - 1) * args.horizon_days / history_days) + 1)
+    outputs = {}
+
+    if len(returns) == 0:
+        print("\nTrade bootstrap skipped: the backtest closed no trades to resample.")
+    else:
+        started = time.perf_counter()
+        outputs["trades"] = bootstrap_trades(
+            returns, args.simulations, trades_per_path, args.leverage, args.trade_size, args.balance,
+            workers=args.workers, seed=args.seed,
+        )
+        print(f"\nTrade bootstrap: {args.simulations} paths of {trades_per_path} trades in {time.perf_counter() - started:.1f}s")
+        print(distribution(outputs["trades"]).to_string(float_format="%.2f"))
+        print(f"Probability of a loss: {(outputs['trades']['profit_percent'] < 0).mean() * 100:.1f}%")
+
+    if args.price_simulations > 0 and args.block_size >= len(close):
+        print(f"\nPrice bootstrap skipped: blocks of {args.block_size} bars need a longer history than {len(close)} bars, "
+              "lower --block-size.")
+    elif args.price_simulations > 0:
+        started = time.perf_counter()
+        outputs["prices"] = bootstrap_prices(
+            close, volume, strategy, args.price_simulations, bars_per_path, args.block_size,
+            workers=args.workers, seed=args.seed, backend=args.ta_backend, **settings,
+        )
+        print(f"\nPrice bootstrap: {args.price_simulations} paths of {bars_per_path} bars in {time.perf_counter() - started:.1f}s")
+        print(distribution(outputs["prices"]).to_string(float_format="%.2f"))
+        print(f"Probability of a loss: {(outputs['prices']['profit_percent'] < 0).mean() * 100:.1f}%")
+
+    if args.max_drawdown is not None and len(returns) == 0:
+        print("\nTrade size for the drawdown skipped: no closed trades.")
+    elif args.max_drawdown is not None:
+        size = size_for_drawdown(returns, args.max_drawdown, args.confidence, args.simulations, trades_per_path,
+                                 args.leverage, seed=args.seed)
+        print(f"\nLargest trade size with a {args.confidence * 100:.0f}% max drawdown within {args.max_drawdown:.1f}%: "
+              f"{size * 100:.2f}% of the balance at {args.leverage:g}x")
+
+    if args.output is not None:
+        for name, results in outputs.items():
+            results.to_csv(f"{args.output}_{name}.csv", index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,406 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+
+# Indicator values a rule can refer to, as named in the live signal rows
+INDICATORS = ("Close", "Volume", "Volume_MA", "BB_MA", "BB_Upper", "BB_Lower", "RSI")
+
+# Rules used when strategy.yaml has no `rules` section; dotted names are strategy parameters
+DEFAULT_RULES = {
+    "long": "Close <= BB_Lower and RSI < rsi.oversold and Volume > Volume_MA",
+    "short": "Close >= BB_Upper and RSI > rsi.overbought and Volume > Volume_MA",
+}
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+)|([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)|(<=|>=|==|!=|[<>()+\-*/]))")
+_COMPARISONS = {
+    "<": (np.less, lambda a, b: a < b),
+    "<=": (np.less_equal, lambda a, b: a <= b),
+    ">": (np.greater, lambda a, b: a > b),
+    ">=": (np.greater_equal, lambda a, b: a >= b),
+    "==": (np.equal, lambda a, b: a == b),
+    "!=": (np.not_equal, lambda a, b: a != b),
+}
+_ARITHMETIC = {
+    "+": (np.add, lambda a, b: a + b),
+    "-": (np.subtract, lambda a, b: a - b),
+    "*": (np.multiply, lambda a, b: a * b),
+    "/": (np.divide, lambda a, b: a / b),
+}
+_CROSSINGS = ("crosses_above", "crosses_below")
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f"Unexpected character at {position} in rule: {text!r}")
+        number, name, symbol = match.groups()
+        if number is not None:
+            tokens.append(("number", float(number)))
+        elif name is not None:
+            tokens.append(("word", name))
+        else:
+            tokens.append(("symbol", symbol))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser from rule text to a tuple tree.
+
+    Grammar, loosest binding first:
+
+        rule       := and_rule ("or" and_rule)*
+        and_rule   := not_rule ("and" not_rule)*
+        not_rule   := "not" not_rule | "(" rule ")" | comparison
+        comparison := value (< | <= | > | >= | == | != | crosses_above | crosses_below) value
+        value      := term (("+" | "-") term)*
+        term       := factor (("*" | "/") factor)*
+        factor     := number | indicator | section.parameter | "-" factor | "(" value ")"
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.index = 0
+
+    def _peek(self):
+        return self.tokens[self.index] if self.index < len(self.tokens) else (None, "end of rule")
+
+    def _next(self):
+        token = self._peek()
+        self.index += 1
+        return token
+
+    def _expect(self, value):
+        kind, token = self._next()
+        if token != value:
+            raise ValueError(f"Expected {value!r} but found {token!r} in rule: {self.text!r}")
+
+    def parse(self):
+        tree = self._rule()
+        if self.index != len(self.tokens):
+            raise ValueError(f"Unexpected {self._peek()[1]!r} in rule: {self.text!r}")
+        return tree
+
+    def _rule(self):
+        tree = self._and_rule()
+        while self._peek() == ("word", "or"):
+            self._next()
+            tree = ("or", tree, self._and_rule())
+        return tree
+
+    def _and_rule(self):
+        tree = self._not_rule()
+        while self._peek() == ("word", "and"):
+            self._next()
+            tree = ("and", tree, self._not_rule())
+        return tree
+
+    def _not_rule(self):
+        if self._peek() == ("word", "not"):
+            self._next()
+            return ("not", self._not_rule())
+        if self._peek() == ("symbol", "("):
+            # A parenthesis opens either a grouped rule or an arithmetic value
+            start = self.index
+            self._next()
+            try:
+                tree = self._rule()
+                self._expect(")")
+                return tree
+            except ValueError:
+                self.index = start
+        return self._comparison()
+
+    def _comparison(self):
+        left = self._value()
+        kind, operator = self._next()
+        if operator not in _COMPARISONS and operator not in _CROSSINGS:
+            raise ValueError(f"Expected a comparison but found {operator!r} in rule: {self.text!r}")
+        return (operator, left, self._value())
+
+    def _value(self):
+        tree = self._term()
+        while self._peek() in (("symbol", "+"), ("symbol", "-")):
+            tree = (self._next()[1], tree, self._term())
+        return tree
+
+    def _term(self):
+        tree = self._factor()
+        while self._peek() in (("symbol", "*"), ("symbol", "/")):
+            tree = (self._next()[1], tree, self._factor())
+        return tree
+
+    def _factor(self):
+        kind, token = self._next()
+        if kind == "number":
+            return ("number", token)
+        if token == "-":
+            return ("-", ("number", 0.0), self._factor())
+        if token == "(":
+            tree = self._value()
+            self._expect(")")
+            return tree
+        if kind == "word" and token not in ("and", "or", "not") + _CROSSINGS:
+            return ("parameter", token) if "." in token else ("indicator", token)
+        raise ValueError(f"Expected a value but found {token!r} in rule: {self.text!r}")
+
+
+@lru_cache(maxsize=None)
+def parse_rule(text):
+    """
+    Parse rule text into a tuple tree, cached per text.
+    """
+    return _Parser(text).parse()
+
+
+def _indicator_names(tree):
+    if tree[0] == "indicator":
+        return {tree[1]}
+    return set().union(*(_indicator_names(child) for child in tree[1:] if isinstance(child, tuple)))
+
+
+def _shifted(values, previous):
+    # Values one bar earlier along the last axis; `previous` is the bar before the first
+    shifted = np.empty(np.shape(values), dtype=np.float64)
+    shifted[..., 1:] = values[..., :-1]
+    shifted[..., 0] = np.nan if previous is None else previous
+    return shifted
+
+
+class CompiledRule:
+    """
+    One rule compiled into NumPy and scalar evaluators.
+
+    The array evaluator writes every comparison into reusable boolean
+    buffers and combines them in place, so a rule of any length needs only
+    as many temporary arrays as it is deep. The scalar evaluator is plain
+    Python for the live loop, which checks one bar at a time.
+
+    Parameters
+    ----------
+    text : str
+        Rule text, see `_Parser` for the grammar.
+    strategy : dict
+        Strategy configuration; dotted names like "rsi.oversold" are read
+        from it once, here.
+    """
+
+    def __init__(self, text, strategy):
+        self.text = text
+        self.indicators = set()
+        self.uses_previous = False
+        tree = parse_rule(text)
+        self._array = self._compile_array(tree, strategy)
+        self._scalar = self._compile_scalar(tree, strategy)
+
+    def _constant(self, name, strategy):
+        value = strategy
+        for key in name.split("."):
+            if not isinstance(value, dict) or key not in value:
+                raise ValueError(f"Unknown strategy parameter {name!r} in rule: {self.text!r}")
+            value = value[key]
+        return float(value)
+
+    def _operand(self, tree, strategy):
+        kind = tree[0]
+        if kind == "number":
+            return ("constant", tree[1])
+        if kind == "parameter":
+            return ("constant", self._constant(tree[1], strategy))
+        if kind == "indicator":
+            if tree[1] not in INDICATORS:
+                raise ValueError(f"Unknown indicator {tree[1]!r} in rule: {self.text!r}, expected one of {INDICATORS}")
+            self.indicators.add(tree[1])
+        return ("tree", tree)
+
+    def _compile_value(self, tree, strategy):
+        # Value nodes become functions (columns, previous) -> array or float
+        kind, constant = self._operand(tree, strategy)
+        if kind == "constant":
+            return lambda columns, previous: constant
+        if tree[0] == "indicator":
+            name = tree[1]
+            return lambda columns, previous: columns[name]
+        ufunc = _ARITHMETIC[tree[0]][0]
+        left = self._compile_value(tree[1], strategy)
+        right = self._compile_value(tree[2], strategy)
+        return lambda columns, previous: ufunc(left(columns, previous), right(columns, previous))
+
+    def _compile_array(self, tree, strategy):
+        # Boolean nodes become functions (columns, previous, out, spare) writing into `out`
+        kind = tree[0]
+        if kind in ("and", "or"):
+            combine = np.logical_and if kind == "and" else np.logical_or
+            left = self._compile_array(tree[1], strategy)
+            right = self._compile_array(tree[2], strategy)
+
+            def evaluate(columns, previous, out, spare):
+                left(columns, previous, out, spare)
+                scratch = spare.pop() if spare else np.empty_like(out)
+                right(columns, previous, scratch, spare)
+                combine(out, scratch, out=out)
+                spare.append(scratch)
+            return evaluate
+        if kind == "not":
+            inner = self._compile_array(tree[1], strategy)
+
+            def evaluate(columns, previous, out, spare):
+                inner(columns, previous, out, spare)
+                np.logical_not(out, out=out)
+            return evaluate
+
+        left = self._compile_value(tree[1], strategy)
+        right = self._compile_value(tree[2], strategy)
+        if kind in _COMPARISONS:
+            compare = _COMPARISONS[kind][0]
+            return lambda columns, previous, out, spare: compare(left(columns, previous), right(columns, previous), out=out)
+
+        # Crossing: on the wrong side (or level) one bar earlier, on the other side now
+        self.uses_previous = True
+        now, before = (np.greater, np.less_equal) if kind == "crosses_above" else (np.less, np.greater_equal)
+        names = _indicator_names(tree)
+
+        def evaluate(columns, previous, out, spare):
+            a = np.broadcast_to(left(columns, previous), out.shape)
+            b = np.broadcast_to(right(columns, previous), out.shape)
+            shifted = {name: _shifted(columns[name], None if previous is None else previous[name]) for name in names}
+            before_a = np.broadcast_to(left(shifted, None), out.shape)
+            before_b = np.broadcast_to(right(shifted, None), out.shape)
+            now(a, b, out=out)
+            scratch = spare.pop() if spare else np.empty_like(out)
+            before(before_a, before_b, out=scratch)
+            np.logical_and(out, scratch, out=out)
+            spare.append(scratch)
+        return evaluate
+
+    def _compile_scalar(self, tree, strategy):
+        # Nodes become functions (values, previous) -> float or bool
+        kind = tree[0]
+        if kind == "number" or kind == "parameter":
+            constant = self._operand(tree, strategy)[1]
+            return lambda values, previous: constant
+        if kind == "indicator":
+            name = tree[1]
+            return lambda values, previous: values[name]
+        if kind == "and":
+            left, right = self._compile_scalar(tree[1], strategy), self._compile_scalar(tree[2], strategy)
+            return lambda values, previous: left(values, previous) and right(values, previous)
+        if kind == "or":
+            left, right = self._compile_scalar(tree[1], strategy), self._compile_scalar(tree[2], strategy)
+            return lambda values, previous: left(values, previous) or right(values, previous)
+        if kind == "not":
+            inner = self._compile_scalar(tree[1], strategy)
+            return lambda values, previous: not inner(values, previous)
+
+        left, right = self._compile_scalar(tree[1], strategy), self._compile_scalar(tree[2], strategy)
+        if kind in _ARITHMETIC:
+            operate = _ARITHMETIC[kind][1]
+            return lambda values, previous: operate(left(values, previous), right(values, previous))
+        if kind in _COMPARISONS:
+            compare = _COMPARISONS[kind][1]
+            return lambda values, previous: compare(left(values, previous), right(values, previous))
+
+        now, before = (_COMPARISONS[">"][1], _COMPARISONS["<="][1]) if kind == "crosses_above" else (_COMPARISONS["<"][1], _COMPARISONS[">="][1])
+
+        def evaluate(values, previous):
+            if previous is None:
+                return False
+            return now(left(values, None), right(values, None)) and before(left(previous, None), right(previous, None))
+        return evaluate
+
+    def evaluate(self, columns, previous=None):
+        """
+        Evaluate the rule on arrays of indicator values.
+
+        Parameters
+        ----------
+        columns : dict
+            Indicator name -> float array, bars along the last axis.
+        previous : dict, optional
+            Indicator values of the bar before the first one, used by
+            crossings. Crossings on the first bar are False without it.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean array shaped like the columns.
+        """
+        columns = {name: np.asarray(columns[name], dtype=np.float64) for name in self.indicators}
+        out = np.empty(np.broadcast_shapes(*(values.shape for values in columns.values())), dtype=bool)
+        self._array(columns, previous, out, [])
+        return out
+
+    def evaluate_scalar(self, values, previous=None):
+        """
+        Evaluate the rule on the indicator values of one bar.
+
+        NaN compares as False, like the array evaluator.
+        """
+        return bool(self._scalar(values, previous))
+
+
+class CompiledRules:
+    """
+    The long and short rules of a strategy, compiled once.
+
+    Parameters
+    ----------
+    strategy : dict
+        Strategy configuration. Its optional `rules` section holds 'long'
+        and 'short' rule text; missing ones fall back to `DEFAULT_RULES`.
+    """
+
+    def __init__(self, strategy):
+        texts = dict(DEFAULT_RULES, **(strategy.get("rules") or {}))
+        self.long = CompiledRule(texts["long"], strategy)
+        self.short = CompiledRule(texts["short"], strategy)
+        self.indicators = self.long.indicators | self.short.indicators
+        self.uses_previous = self.long.uses_previous or self.short.uses_previous
+
+    def signals(self, columns, previous=None):
+        """
+        Long flags, short flags and positions over arrays of indicator values.
+
+        A bar matching both rules is short, as in the live bot.
+
+        Parameters
+        ----------
+        columns : dict
+            Indicator name -> float array, see `CompiledRule.evaluate`.
+        previous : dict, optional
+            Indicator values of the bar before the first one.
+
+        Returns
+        -------
+        long_signal, short_signal : numpy.ndarray
+            Boolean arrays.
+        position : numpy.ndarray
+            1 long, -1 short, 0 neither, as int64.
+        """
+        long_signal = self.long.evaluate(columns, previous)
+        short_signal = self.short.evaluate(columns, previous)
+        position = long_signal.astype(np.int64)
+        position[short_signal] = -1
+        return long_signal, short_signal, position
+
+    def latest(self, values, previous=None):
+        """
+        Long flag, short flag and position for one bar, see `signals`.
+        """
+        long_signal = self.long.evaluate_scalar(values, previous)
+        short_signal = self.short.evaluate_scalar(values, previous)
+        return long_signal, short_signal, -1 if short_signal else (1 if long_signal else 0)
+
+
+def compile_rules(strategy):
+    """
+    Compile the long and short rules of a strategy, see `CompiledRules`.
+    """
+    return CompiledRules(strategy)
@@ -0,0 +1,348 @@
+import argparse
+import os
+import time
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+# Snapshot stats kept in the store and how their getter result is keyed:
+# "nested" for {field: {market: value}}, stored as columns "<stat>_<field>",
+# "flat" for {market: value}, stored as the column "<stat>".
+RECORDED_STATS = {
+    "open_interest": "nested",
+    "funding_apr": "nested",
+    "borrow_apr": "nested",
+    "available_liquidity": "nested",
+    "pool_tvl": "nested",
+    "gm_price": "flat",
+}
+
+TIMESTAMP = "timestamp"  # Nanoseconds since epoch, UTC; the only int64 column
+
+
+def _number(value):
+    # SDK results mix numbers with addresses and labels; only numbers are stored
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def snapshot_rows(snapshot):
+    """
+    Flatten the recorded stats of a snapshot into one row per market.
+
+    Parameters
+    ----------
+    snapshot : GMXStatsSnapshot
+        Result of `GetGMXv2Stats.get_snapshot`. Stats that are None are skipped.
+
+    Returns
+    -------
+    dict
+        Market symbol -> {column: float}.
+    """
+    rows = {}
+    for stat, layout in RECORDED_STATS.items():
+        result = getattr(snapshot, stat, None)
+        if not isinstance(result, dict):
+            continue
+        if layout == "flat":
+            groups = {stat: result}
+        else:
+            groups = {f"{stat}_{field}": values for field, values in result.items() if isinstance(values, dict)}
+        for column, values in groups.items():
+            for market, value in values.items():
+                value = _number(value)
+                if value is not None:
+                    rows.setdefault(market, {})[column] = value
+
+    block_number = getattr(snapshot, "block_number", None)
+    if block_number is not None:
+        for row in rows.values():
+            row["block_number"] = float(block_number)
+    return rows
+
+
+class StatsStore:
+    """
+    Append-only columnar store of GMX stats snapshots, partitioned by day and market.
+
+    Every (UTC day, market) partition is a directory with one raw binary
+    file per column, like `CandleStore`: int64 nanosecond timestamps plus
+    float64 stat values. Columns that first appear partway through a day
+    are back-filled with NaN, so all files of a partition have the same
+    number of rows. Range queries only open the partitions they need and
+    binary-search the sorted timestamps inside them.
+
+    Parameters
+    ----------
+    root : str
+        Directory holding the partitions, e.g. "data/gmx_stats".
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _partition_dir(self, day, market):
+        # Market symbols are quoted so any name maps to a single directory
+        return os.path.join(self.root, day, quote(market, safe=""))
+
+    def _column_rows(self, directory, column):
+        path = os.path.join(directory, f"{column}.bin")
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // 8  # int64 and float64 are both 8 bytes
+
+    def _column_names(self, directory):
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".bin") and name[:-4] != TIMESTAMP)
+
+    def _repair(self, directory):
+        # Rows only count once their timestamp is written; drop any half-written tail
+        rows = self._column_rows(directory, TIMESTAMP)
+        for column in self._column_names(directory) + [TIMESTAMP]:
+            if self._column_rows(directory, column) != rows:
+                with open(os.path.join(directory, f"{column}.bin"), "r+b") as f:
+                    f.truncate(rows * 8)
+        return rows
+
+    def append(self, timestamp, rows):
+        """
+        Append one row per market at `timestamp`.
+
+        Parameters
+        ----------
+        timestamp : pandas.Timestamp, datetime, str or float
+            Time of the snapshot; floats are Unix seconds, naive times are UTC.
+        rows : dict
+            Market symbol -> {column: float}, e.g. from `snapshot_rows`.
+
+        Returns
+        -------
+        int
+            Number of markets written.
+        """
+        if isinstance(timestamp, (int, float)):
+            timestamp = pd.Timestamp(timestamp, unit="s", tz="UTC")
+        timestamp = pd.Timestamp(timestamp)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.tz_localize("UTC")
+        nanoseconds = np.array([timestamp.tz_convert("UTC").value], dtype=np.int64)
+        day = timestamp.tz_convert("UTC").strftime("%Y-%m-%d")
+
+        for market, values in rows.items():
+            directory = self._partition_dir(day, market)
+            os.makedirs(directory, exist_ok=True)
+            count = self._repair(directory)
+
+            columns = set(self._column_names(directory)) | set(values)
+            for column in sorted(columns):
+                path = os.path.join(directory, f"{column}.bin")
+                with open(path, "ab") as f:
+                    missing = count - self._column_rows(directory, column)
+                    if missing > 0:
+                        f.write(np.full(missing, np.nan).tobytes())
+                    f.write(np.array([values.get(column, np.nan)], dtype=np.float64).tobytes())
+            # Timestamp last, so the row is only visible once it is complete
+            with open(os.path.join(directory, f"{TIMESTAMP}.bin"), "ab") as f:
+                f.write(nanoseconds.tobytes())
+        return len(rows)
+
+    def record(self, snapshot, timestamp=None):
+        """
+        Append the recorded stats of a `GetGMXv2Stats.get_snapshot` result.
+
+        Parameters
+        ----------
+        snapshot : GMXStatsSnapshot
+            Snapshot to store.
+        timestamp : optional
+            Time of the snapshot, default now.
+
+        Returns
+        -------
+        int
+            Number of markets written.
+        """
+        return self.append(time.time() if timestamp is None else timestamp, snapshot_rows(snapshot))
+
+    def days(self):
+        """
+        Stored days as sorted "YYYY-MM-DD" strings.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def markets(self, start=None, end=None):
+        """
+        Market symbols with data between `start` and `end`.
+        """
+        found = set()
+        for day in self._days_between(start, end):
+            found.update(unquote(name) for name in os.listdir(os.path.join(self.root, day)))
+        return sorted(found)
+
+    def _days_between(self, start, end):
+        days = self.days()
+        if start is not None:
+            days = [day for day in days if day >= _utc(start).strftime("%Y-%m-%d")]
+        if end is not None:
+            days = [day for day in days if day <= _utc(end).strftime("%Y-%m-%d")]
+        return days
+
+    def _read_partition(self, directory, start, end, columns):
+        rows = min(
+            [self._column_rows(directory, TIMESTAMP)]
+            + [self._column_rows(directory, column) for column in self._column_names(directory)]
+        )
+        if rows == 0:
+            return None
+        timestamps = np.memmap(os.path.join(directory, f"{TIMESTAMP}.bin"), dtype=np.int64, mode="r", shape=(rows,))
+        first = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        last = rows if end is None else int(np.searchsorted(timestamps, end, side="right"))
+        if first >= last:
+            return None
+
+        names = self._column_names(directory) if columns is None else columns
+        data = {TIMESTAMP: np.array(timestamps[first:last])}
+        for column in names:
+            if self._column_rows(directory, column) == 0:
+                data[column] = np.full(last - first, np.nan)
+            else:
+                data[column] = np.fromfile(
+                    os.path.join(directory, f"{column}.bin"),
+                    dtype=np.float64,
+                    count=last - first,
+                    offset=first * 8,
+                )
+        return data
+
+    def read(self, start=None, end=None, markets=None, columns=None):
+        """
+        Query stored rows by time range, market and column.
+
+        Parameters
+        ----------
+        start, end : optional
+            Inclusive time bounds, naive times are UTC. None is unbounded.
+        markets : list of str, optional
+            Markets to read, default all.
+        columns : list of str, optional
+            Stat columns to read, default every column present.
+
+        Returns
+        -------
+        pandas.DataFrame
+            'market' and stat columns on a UTC 'Timestamp' index, sorted by time then market.
+        """
+        start_ns = None if start is None else _utc(start).value
+        end_ns = None if end is None else _utc(end).value
+
+        frames = []
+        for day in self._days_between(start, end):
+            day_dir = os.path.join(self.root, day)
+            names = sorted(os.listdir(day_dir)) if markets is None else [quote(market, safe="") for market in markets]
+            for name in names:
+                directory = os.path.join(day_dir, name)
+                if not os.path.isdir(directory):
+                    continue
+                data = self._read_partition(directory, start_ns, end_ns, columns)
+                if data is not None:
+                    frame = pd.DataFrame(data)
+                    frame.insert(1, "market", unquote(name))
+                    frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=["market"] + list(columns or []), index=pd.DatetimeIndex([], tz="UTC", name="Timestamp"))
+        result = pd.concat(frames, ignore_index=True).sort_values([TIMESTAMP, "market"], kind="stable")
+        result.index = pd.DatetimeIndex(pd.to_datetime(result.pop(TIMESTAMP).to_numpy(), utc=True), name="Timestamp")
+        return result
+
+    def disk_usage(self):
+        """
+        Total bytes used by the store.
+        """
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        return total
+
+
+def _utc(value):
+    value = pd.Timestamp(value)
+    return value.tz_localize("UTC") if value.tzinfo is None else value.tz_convert("UTC")
+
+
+def collect(store, stats, interval=60, iterations=None):
+    """
+    Record a snapshot every `interval` seconds.
+
+    Parameters
+    ----------
+    store : StatsStore
+        Store the snapshots are appended to.
+    stats : GetGMXv2Stats
+        Stats fetcher without a `store` of its own, best created with
+        to_json and to_csv disabled.
+    interval : float
+        Seconds between snapshot starts.
+    iterations : int, optional
+        Number of snapshots to take, default until interrupted.
+    """
+    taken = 0
+    while iterations is None or taken < iterations:
+        started = time.time()
+        snapshot = stats.get_snapshot(tuple(RECORDED_STATS))
+        written = store.record(snapshot, started)
+        print(f"Recorded {written} markets at block {snapshot.block_number}.")
+        taken += 1
+        if iterations is None or taken < iterations:
+            time.sleep(max(0.0, interval - (time.time() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and query GMX stats history - ACID.")
+    parser.add_argument("--store", help="Stats store directory.", default=os.path.join("data", "gmx_stats"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Append a snapshot every interval.")
+    record_parser.add_argument("--chain", default="arbitrum")
+    record_parser.add_argument("--interval", help="Seconds between snapshots.", type=float, default=60)
+    record_parser.add_argument("--iterations", help="Stop after this many snapshots.", type=int, default=None)
+
+    query_parser = commands.add_parser("query", help="Print stored rows.")
+    query_parser.add_argument("--start", default=None)
+    query_parser.add_argument("--end", default=None)
+    query_parser.add_argument("--markets", help="Comma-separated market symbols.", default=None)
+    query_parser.add_argument("--columns", help="Comma-separated stat columns.", default=None)
+    query_parser.add_argument("--output", help="Write the rows to this CSV file.", default=None)
+    args = parser.parse_args()
+
+    store = StatsStore(args.store)
+    if args.command == "record":
+        from get_gmx_stats import ConfigManager, GetGMXv2Stats
+
+        config = ConfigManager(chain=args.chain)
+        config.set_config()
+        collect(store, GetGMXv2Stats(config, to_json=False, to_csv=False), args.interval, args.iterations)
+        return
+
+    rows = store.read(
+        args.start,
+        args.end,
+        markets=None if args.markets is None else args.markets.split(","),
+        columns=None if args.columns is None else args.columns.split(","),
+    )
+    if args.output is not None:
+        rows.to_csv(args.output)
+    else:
+        print(rows)
+    print(f"{len(rows)} rows, store size {store.disk_usage() / 1024:.1f} kB.")
+
+
+if __name__ == "__main__":
+    main()
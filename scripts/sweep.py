@@ -0,0 +1,353 @@
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from backtest_engine import simulate_trades, summarize
+from indicators import get_ta
+from rules import compile_rules
+
+# Strategy keys swept over, in the order they appear in strategy.yaml
+SWEEP_KEYS = (
+    ("bollinger_bands", "length"),
+    ("bollinger_bands", "multiplier"),
+    ("rsi", "length"),
+    ("rsi", "overbought"),
+    ("rsi", "oversold"),
+    ("volume", "moving_avg_length"),
+    ("risk_management", "take_profit_percent"),
+    ("risk_management", "stop_loss_percent"),
+)
+
+# Keys that change the indicator arrays; grid points are grouped by these
+INDICATOR_KEYS = (
+    ("bollinger_bands", "length"),
+    ("rsi", "length"),
+    ("volume", "moving_avg_length"),
+)
+
+# Per-process state, set up by _attach_prices in every worker
+_prices = None
+_shared = None
+_indicator_cache = {}
+_ta = None
+
+
+def expand_range(spec):
+    """
+    Expand one sweep entry into the list of values to try.
+
+    Parameters
+    ----------
+    spec : scalar, list or dict
+        A single value, an explicit list of values, or a dict with
+        'start', 'stop' and 'step' (stop inclusive).
+
+    Returns
+    -------
+    list
+        Values for this parameter.
+    """
+    if isinstance(spec, dict):
+        values = np.arange(spec["start"], spec["stop"] + spec["step"] / 2, spec["step"])
+        if all(isinstance(spec[key], int) for key in ("start", "stop", "step")):
+            return [int(v) for v in values]
+        return [round(float(v), 10) for v in values]
+    if isinstance(spec, list):
+        return spec
+    return [spec]
+
+
+def build_grid(sweep, defaults=None):
+    """
+    Expand a sweep configuration into a list of parameter dictionaries.
+
+    Parameters
+    ----------
+    sweep : dict
+        Mapping shaped like strategy.yaml whose leaves are ranges, see `expand_range`.
+        Missing risk_management keys disable take-profit/stop-loss.
+    defaults : dict, optional
+        Strategy settings shaped like strategy.yaml, used for keys the
+        sweep leaves out.
+
+    Returns
+    -------
+    list of dict
+        Flat parameter dictionaries keyed by "section.name".
+
+    Raises
+    ------
+    ValueError
+        If a key other than a risk_management one is neither swept nor in `defaults`.
+    """
+    defaults = defaults or {}
+    names = []
+    values = []
+    for section, key in SWEEP_KEYS:
+        spec = sweep.get(section, {}).get(key)
+        if spec is None:
+            spec = (defaults.get(section) or {}).get(key)
+        if spec is None and section != "risk_management":
+            raise ValueError(f"Sweep key {section}.{key} is missing; add it to the sweep or the strategy defaults")
+        names.append(f"{section}.{key}")
+        values.append([None] if spec is None else expand_range(spec))
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def _attach_prices(name, rows, length, backend):
+    global _prices, _shared, _ta
+    _ta = get_ta(backend)
+    _shared = shared_memory.SharedMemory(name=name)
+    _prices = np.ndarray((rows, length), dtype=np.float64, buffer=_shared.buf)
+    _prices.flags.writeable = False
+
+
+def _indicator(kind, length):
+    # Indicators only depend on their length, so every worker computes each one once
+    key = (kind, length)
+    if key not in _indicator_cache:
+        close, volume = _prices[:2]
+        if kind == "sma":
+            _indicator_cache[key] = _ta.SMA(close, timeperiod=length)
+        elif kind == "stddev":
+            _indicator_cache[key] = _ta.STDDEV(close, timeperiod=length, nbdev=1)
+        elif kind == "rsi":
+            _indicator_cache[key] = _ta.RSI(close, timeperiod=length)
+        elif kind == "volume_sma":
+            _indicator_cache[key] = _ta.SMA(volume, timeperiod=length)
+    return _indicator_cache[key]
+
+
+def _evaluate_group(task):
+    group, settings = task
+    close = _prices[0]
+    first = group[0]
+
+    bb_ma = _indicator("sma", first["bollinger_bands.length"])
+    bb_std = _indicator("stddev", first["bollinger_bands.length"])
+    rsi = _indicator("rsi", first["rsi.length"])
+
+    columns = {
+        "Close": close,
+        "Volume": _prices[1],
+        "Volume_MA": _indicator("volume_sma", first["volume.moving_avg_length"]),
+        "BB_MA": bb_ma,
+        "RSI": rsi,
+    }
+
+    # Rows 2 and 3 hold the long and short holding costs accrued per bar, if any
+    holding_costs = None
+    if len(_prices) == 4:
+        holding_costs = {"long": _prices[2], "short": _prices[3]}
+
+    results = []
+    signal = np.empty_like(close)
+    for params in group:
+        # Grid points as a strategy, so rules can name any swept value, e.g. rsi.oversold
+        strategy = {"rules": settings["rules"]}
+        for name, value in params.items():
+            section, key = name.split(".")
+            strategy.setdefault(section, {})[key] = value
+        rules = compile_rules(strategy)
+
+        multiplier = params["bollinger_bands.multiplier"]
+        columns["BB_Upper"] = bb_ma + multiplier * bb_std
+        columns["BB_Lower"] = bb_ma - multiplier * bb_std
+        position = rules.signals(columns)[2]
+
+        # Same as apply_strategy: trade on the bar after the signal
+        signal[0] = np.nan
+        signal[1:] = position[:-1]
+
+        trades = simulate_trades(
+            close,
+            signal,
+            leverage=settings["leverage"],
+            trade_size_percentage=settings["trade_size_percentage"],
+            initial_balance=settings["initial_balance"],
+            take_profit_percent=params["risk_management.take_profit_percent"],
+            stop_loss_percent=params["risk_management.stop_loss_percent"],
+            fee_percent=settings["fee_percent"],
+            holding_costs=holding_costs,
+        )
+        results.append({**params, **summarize(trades, settings["initial_balance"])})
+    return results
+
+
+def run_sweep(close, volume, sweep, leverage=5, trade_size_percentage=0.1, initial_balance=10000,
+              workers=None, rank_by="final_balance", top=None, backend=None, rules=None,
+              fee_percent=0.0, holding_costs=None, defaults=None):
+    """
+    Backtest every parameter combination of a sweep over a process pool.
+
+    Prices, and holding costs if given, are placed once in shared memory
+    and mapped read-only by every worker. Grid points sharing indicator lengths are evaluated in the same
+    task, and each worker caches indicators by length across tasks.
+
+    Parameters
+    ----------
+    close : numpy.ndarray
+        Close prices.
+    volume : numpy.ndarray
+        Volumes, aligned with `close`.
+    sweep : dict
+        Parameter ranges, see `build_grid`.
+    leverage : float
+        Leverage applied to each trade.
+    trade_size_percentage : float
+        Fraction of the balance used for each trade.
+    initial_balance : float
+        Starting balance in USD.
+    workers : int, optional
+        Number of worker processes. Defaults to the CPU count.
+    rank_by : str
+        Metric to sort results by, descending.
+    top : int, optional
+        Only return the best `top` results.
+    backend : str, optional
+        Indicator backend for the workers, see `indicators.get_ta`.
+    rules : dict, optional
+        'long' and 'short' rule text, as in the `rules` section of
+        strategy.yaml. Defaults to the built-in rules.
+    fee_percent : float
+        Position fee in percent of the notional, charged on open and close.
+    holding_costs : dict, optional
+        'long' and 'short' -> cost accrued per unit of notional at every
+        bar, aligned with `close`, see `CostTable.accrued`.
+    defaults : dict, optional
+        Strategy settings for keys the sweep leaves out, see `build_grid`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per parameter combination with its metrics, best first.
+    """
+    grid = build_grid(sweep, defaults)
+    groups = {}
+    for params in grid:
+        key = tuple(params[f"{section}.{name}"] for section, name in INDICATOR_KEYS)
+        groups.setdefault(key, []).append(params)
+
+    settings = {
+        "leverage": leverage,
+        "trade_size_percentage": trade_size_percentage,
+        "initial_balance": initial_balance,
+        "rules": rules,
+        "fee_percent": fee_percent,
+    }
+    # Split large groups so every worker stays busy; the per-worker cache keeps reuse
+    workers = workers or os.cpu_count()
+    chunk_size = max(1, len(grid) // (workers * 4))
+    tasks = [
+        (group[i:i + chunk_size], settings)
+        for group in groups.values()
+        for i in range(0, len(group), chunk_size)
+    ]
+    print(f"[DEBUG] Sweeping {len(grid)} combinations in {len(groups)} indicator groups ({len(tasks)} tasks)...")
+
+    length = len(close)
+    rows = 2 if holding_costs is None else 4
+    shared = shared_memory.SharedMemory(create=True, size=rows * length * 8)
+    try:
+        prices = np.ndarray((rows, length), dtype=np.float64, buffer=shared.buf)
+        prices[0] = close
+        prices[1] = volume
+        if holding_costs is not None:
+            prices[2] = holding_costs["long"]
+            prices[3] = holding_costs["short"]
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach_prices,
+            initargs=(shared.name, rows, length, backend),
+        ) as executor:
+            results = [row for rows in executor.map(_evaluate_group, tasks) for row in rows]
+        del prices
+    finally:
+        shared.close()
+        shared.unlink()
+
+    ranked = pd.DataFrame(results).sort_values(rank_by, ascending=False).reset_index(drop=True)
+    if top is not None:
+        ranked = ranked.head(top)
+    return ranked
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweep strategy parameters over historical data - ACID."
+    )
+    parser.add_argument(
+        "--sweep",
+        help="Path to the sweep YAML file.",
+        default=os.path.join("utils", "sweep.yaml"),
+    )
+    parser.add_argument("--strategy", help="Strategy YAML file whose values fill keys missing from the sweep, and whose rules apply when the sweep has none.", default=None)
+    parser.add_argument("--symbol", help="Ticker to download.", default="ETH-USD")
+    parser.add_argument("--start", help="Start date (YYYY-MM-DD).", default="2024-09-01")
+    parser.add_argument("--end", help="End date (YYYY-MM-DD).", default="2024-10-12")
+    parser.add_argument("--interval", help="Bar interval.", default="15m")
+    parser.add_argument("--workers", help="Number of worker processes.", type=int, default=None)
+    parser.add_argument("--rank-by", help="Metric to rank results by.", default="final_balance")
+    parser.add_argument("--top", help="Number of results to print.", type=int, default=20)
+    parser.add_argument("--ta-backend", help="Indicator backend: talib, numpy or auto.", default=None)
+    parser.add_argument("--fee", help="Position fee in percent of the notional.", type=float, default=0.0)
+    parser.add_argument("--costs", help="GMX stats store directory to charge borrow and funding costs from.", default=None)
+    parser.add_argument("--market", help="Market symbol in the stats store.", default="ETH")
+    args = parser.parse_args()
+
+    with open(args.sweep, "r") as file:
+        config = yaml.safe_load(file)
+    sweep = config["sweep"]
+    trade_settings = config.get("trade_settings", {})
+    defaults = None
+    if args.strategy is not None:
+        with open(args.strategy, "r") as file:
+            defaults = yaml.safe_load(file)
+        defaults = defaults.get("strategy", defaults)  # Accept the file with or without its top-level key
+    try:
+        build_grid(sweep, defaults)  # Fail on missing keys before downloading anything
+    except ValueError as e:
+        parser.error(str(e))
+
+    import yfinance as yf
+
+    print(f"[DEBUG] Fetching {args.symbol} {args.interval} data from {args.start} to {args.end}...")
+    data = yf.download(args.symbol, start=args.start, end=args.end, interval=args.interval)
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    data.dropna(inplace=True)
+
+    holding_costs = None
+    if args.costs is not None:
+        from cost_tables import CostTable
+        from stats_store import StatsStore
+
+        holding_costs = CostTable.from_store(StatsStore(args.costs), args.market).accrued(data.index)
+
+    ranked = run_sweep(
+        data["Close"].to_numpy(dtype=np.float64),
+        data["Volume"].to_numpy(dtype=np.float64),
+        sweep,
+        leverage=trade_settings.get("leverage", 5),
+        trade_size_percentage=trade_settings.get("open_position_percentage", 0.1),
+        workers=args.workers,
+        rank_by=args.rank_by,
+        top=args.top,
+        backend=args.ta_backend,
+        rules=config.get("rules") or (defaults or {}).get("rules"),  # sweep.yaml's rules, else the strategy file's
+        fee_percent=args.fee,
+        holding_costs=holding_costs,
+        defaults=defaults,
+    )
+    print(ranked.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Pure NumPy versions of the TA-Lib indicators the bot uses.
+
+Functions take the same arguments as their TA-Lib counterparts and return
+the same values, including the NaN warm-up at the start of the output, so
+this module can stand in for `talib` where the native library is missing.
+pandas Series inputs give Series outputs with the same index.
+"""
+import numpy as np
+
+# Windows per centred block in _rolling_sums
+SUM_BLOCK = 4096
+
+
+def _as_array(real):
+    values = np.asarray(real, dtype=np.float64)
+    if values.ndim != 1:
+        raise ValueError("input array has wrong dimensions")
+    return values
+
+
+def _wrap(real, *outputs):
+    # Mirror talib's pandas wrapper: Series in, Series out
+    index = getattr(real, "index", None)
+    if index is not None:
+        import pandas as pd
+
+        outputs = tuple(pd.Series(output, index=index) for output in outputs)
+    return outputs[0] if len(outputs) == 1 else outputs
+
+
+def _first_valid(values):
+    # TA-Lib starts computing at the first non-NaN input
+    valid = np.flatnonzero(~np.isnan(values))
+    return int(valid[0]) if len(valid) else len(values)
+
+
+def _rolling_sums(values, timeperiod, squares=True, chunk=SUM_BLOCK):
+    """
+    Rolling sum of `values` and of their squares over `timeperiod` bars.
+
+    The array is cut into overlapping chunks that are each centred on their
+    own mean before the cumulative sums are taken. That keeps the sums small
+    and the variance free of cancellation error however far prices drift.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Centre, centred window sum and centred window sum of squares (None
+        unless `squares`), one per window.
+    """
+    windows = len(values) - timeperiod + 1
+    chunk = max(chunk, timeperiod)
+    chunks = -(-windows // chunk)
+    padded = np.empty(chunks * chunk + timeperiod - 1)
+    padded[:len(values)] = values
+    padded[len(values):] = values[-1]
+
+    rows = np.lib.stride_tricks.sliding_window_view(padded, chunk + timeperiod - 1)[::chunk]
+    centre = np.nanmean(rows, axis=1, keepdims=True)
+    centred = rows - centre
+    cumulative = np.zeros((chunks, chunk + timeperiod))
+    np.cumsum(centred, axis=1, out=cumulative[:, 1:])
+    window_sum = (cumulative[:, timeperiod:] - cumulative[:, :-timeperiod]).reshape(-1)[:windows]
+
+    window_sum_sq = None
+    if squares:
+        np.multiply(centred, centred, out=centred)
+        np.cumsum(centred, axis=1, out=cumulative[:, 1:])
+        window_sum_sq = (cumulative[:, timeperiod:] - cumulative[:, :-timeperiod]).reshape(-1)[:windows]
+
+    centre = np.repeat(centre.reshape(-1), chunk)[:windows]
+    return centre, window_sum, window_sum_sq
+
+
+def _window_stats(data, timeperiod, with_stddev):
+    # Mean and population stddev (None unless `with_stddev`) of every full window of `data`
+    centre, window_sum, window_sum_sq = _rolling_sums(data, timeperiod, squares=with_stddev)
+    centred_mean = window_sum / timeperiod
+    stddev = None
+    if with_stddev:
+        variance = window_sum_sq / timeperiod - centred_mean * centred_mean
+        stddev = np.sqrt(np.maximum(variance, 0.0))
+    return centre + centred_mean, stddev
+
+
+def _mean_stddev(values, timeperiod, with_stddev):
+    mean = np.full(len(values), np.nan)
+    stddev = np.full(len(values), np.nan) if with_stddev else None
+    begin = _first_valid(values)
+    data = values[begin:]
+    if timeperiod < 1 or len(data) < timeperiod or (with_stddev and timeperiod < 2):
+        return mean, stddev
+    window_mean, window_stddev = _window_stats(data, timeperiod, with_stddev)
+    mean[begin + timeperiod - 1:] = window_mean
+    if with_stddev:
+        stddev[begin + timeperiod - 1:] = window_stddev
+    return mean, stddev
+
+
+def _wilder_block(timeperiod):
+    # Largest block for which decay ** -block stays well inside float64 range
+    decay = (timeperiod - 1) / timeperiod
+    return max(1, int(200 / -np.log(decay)))
+
+
+def _wilder_blocks(initial, scaled, decay):
+    """
+    Wilder smoothing over rows of increments already divided by the period.
+
+    Returns the smoothed rows and the carry into the row after the last one.
+    """
+    block = scaled.shape[1]
+    powers = decay ** np.arange(block)
+    local = np.cumsum(scaled / powers, axis=1) * powers  # Smoothed values with zero carry-in
+
+    carries = np.empty(len(scaled))
+    carry = initial
+    block_decay = decay ** block
+    for j in range(len(scaled)):
+        carries[j] = carry
+        carry = carry * block_decay + local[j, -1]
+
+    return local + carries[:, None] * (powers * decay), carry
+
+
+def _wilder_smooth(initial, increments, timeperiod):
+    """
+    Wilder smoothing y[i] = y[i-1] * (n-1)/n + x[i]/n, starting from `initial`.
+
+    The recursion is solved in closed form over blocks: inside a block every
+    term is a positive, bounded power series so a cumulative sum is exact to
+    rounding, and the carry between blocks is a short scalar recurrence.
+    """
+    decay = (timeperiod - 1) / timeperiod
+    count = len(increments)
+    if count == 0:
+        return np.empty(0)
+    if decay == 0:
+        return increments.copy()
+
+    block = min(count, _wilder_block(timeperiod))
+    blocks = -(-count // block)
+    padded = np.zeros(blocks * block)
+    padded[:count] = increments / timeperiod
+    smoothed, _ = _wilder_blocks(initial, padded.reshape(blocks, block), decay)
+    return smoothed.reshape(-1)[:count]
+
+
+def _rsi(values, timeperiod):
+    output = np.full(len(values), np.nan)
+    begin = _first_valid(values)
+    data = values[begin:]
+    if timeperiod < 2 or len(data) <= timeperiod:
+        return output
+
+    change = np.diff(data)
+    gain = np.where(change > 0, change, 0.0)
+    loss = np.where(change < 0, -change, 0.0)
+
+    avg_gain = np.empty(len(change) - timeperiod + 1)
+    avg_loss = np.empty(len(change) - timeperiod + 1)
+    avg_gain[0] = gain[:timeperiod].sum() / timeperiod
+    avg_loss[0] = loss[:timeperiod].sum() / timeperiod
+    avg_gain[1:] = _wilder_smooth(avg_gain[0], gain[timeperiod:], timeperiod)
+    avg_loss[1:] = _wilder_smooth(avg_loss[0], loss[timeperiod:], timeperiod)
+
+    total = avg_gain + avg_loss
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(total != 0, 100.0 * avg_gain / total, 0.0)
+    output[begin + timeperiod:] = rsi
+    return output
+
+
+def SMA(real, timeperiod=30):
+    """
+    Simple moving average, as `talib.SMA`.
+    """
+    mean, _ = _mean_stddev(_as_array(real), timeperiod, with_stddev=False)
+    return _wrap(real, mean)
+
+
+def STDDEV(real, timeperiod=5, nbdev=1.0):
+    """
+    Population standard deviation times `nbdev`, as `talib.STDDEV`.
+    """
+    _, stddev = _mean_stddev(_as_array(real), timeperiod, with_stddev=True)
+    return _wrap(real, stddev * nbdev)
+
+
+def BBANDS(real, timeperiod=5, nbdevup=2.0, nbdevdn=2.0, matype=0):
+    """
+    Bollinger Bands (upper, middle, lower) over a simple moving average, as `talib.BBANDS`.
+    """
+    if matype != 0:
+        raise NotImplementedError("Only matype=0 (SMA) is supported by the NumPy backend.")
+    middle, deviation = _mean_stddev(_as_array(real), timeperiod, with_stddev=True)
+    return _wrap(real, middle + nbdevup * deviation, middle, middle - nbdevdn * deviation)
+
+
+def RSI(real, timeperiod=14):
+    """
+    Relative Strength Index with Wilder smoothing, as `talib.RSI`.
+    """
+    return _wrap(real, _rsi(_as_array(real), timeperiod))
+
+
+class StreamingMeanStd:
+    """
+    SMA and STDDEV over data pushed in pieces, identical to the whole-array functions.
+
+    Windows are computed in the same centred blocks `_rolling_sums` uses,
+    so a block is only emitted once all of its bars have arrived. At most
+    one block of input is held at a time, whatever the history length.
+
+    Parameters
+    ----------
+    timeperiod : int
+        Window length.
+    with_stddev : bool
+        Also compute the population standard deviation.
+    """
+
+    def __init__(self, timeperiod, with_stddev=True):
+        self.timeperiod = timeperiod
+        self.with_stddev = with_stddev
+        self.block = max(SUM_BLOCK, timeperiod)
+        self.valid = timeperiod >= 1 and not (with_stddev and timeperiod < 2)
+        self.started = False
+        self.seen = 0  # Inputs since the first non-NaN one
+        self.buffer = np.empty(0)
+
+    def _emit(self, parts, mean, stddev):
+        parts.append((mean, stddev if self.with_stddev else None))
+
+    def push(self, real):
+        """
+        Add bars and return (mean, stddev) for every bar that is now final.
+
+        Outputs come out in input order but may lag behind it by up to one block.
+        """
+        values = _as_array(real)
+        parts = []
+        if not self.started:
+            begin = _first_valid(values)
+            nan = np.full(begin, np.nan)
+            self._emit(parts, nan, nan)
+            values = values[begin:]
+            self.started = len(values) > 0
+        if not self.valid:
+            nan = np.full(len(values), np.nan)
+            self._emit(parts, nan, nan)
+            return self._join(parts)
+
+        # The first timeperiod - 1 bars after the first valid one have no window yet
+        warmup = max(0, min(len(values), self.timeperiod - 1 - self.seen))
+        nan = np.full(warmup, np.nan)
+        self._emit(parts, nan, nan)
+        self.seen += len(values)
+        self.buffer = np.concatenate((self.buffer, values))
+
+        span = self.block + self.timeperiod - 1
+        while len(self.buffer) >= span:
+            self._emit(parts, *_window_stats(self.buffer[:span], self.timeperiod, self.with_stddev))
+            self.buffer = self.buffer[self.block:]
+        return self._join(parts)
+
+    def finish(self):
+        """
+        Return (mean, stddev) for the bars still held back.
+        """
+        parts = []
+        if self.valid and len(self.buffer) >= self.timeperiod:
+            # Padded with the last bar, exactly as the whole-array block at the end
+            self._emit(parts, *_window_stats(self.buffer, self.timeperiod, self.with_stddev))
+        self.buffer = np.empty(0)
+        return self._join(parts)
+
+    def _join(self, parts):
+        mean = np.concatenate([part[0] for part in parts]) if parts else np.empty(0)
+        if not self.with_stddev:
+            return mean, None
+        return mean, np.concatenate([part[1] for part in parts]) if parts else np.empty(0)
+
+
+class StreamingRSI:
+    """
+    RSI over data pushed in pieces, identical to `RSI` on the whole array.
+
+    The Wilder averages are carried from one smoothing block to the next,
+    with the same block size the whole-array version uses, so only the
+    current block of price changes is held.
+
+    Parameters
+    ----------
+    timeperiod : int
+        RSI look-back period.
+    """
+
+    def __init__(self, timeperiod=14):
+        self.timeperiod = timeperiod
+        self.decay = (timeperiod - 1) / timeperiod if timeperiod >= 2 else 0.0
+        self.block = _wilder_block(timeperiod) if timeperiod >= 2 else 1
+        self.started = False
+        self.seed = []  # First timeperiod + 1 valid closes
+        self.last = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self.gains = np.empty(0)
+        self.losses = np.empty(0)
+        self.full_blocks = 0
+
+    @staticmethod
+    def _value(avg_gain, avg_loss):
+        total = avg_gain + avg_loss
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(total != 0, 100.0 * avg_gain / total, 0.0)
+
+    def _smooth(self, gains, losses):
+        # One row of increments with the carried averages; returns the RSI of each row entry
+        smoothed_gain, carry_gain = _wilder_blocks(self.avg_gain, (gains / self.timeperiod)[None, :], self.decay)
+        smoothed_loss, carry_loss = _wilder_blocks(self.avg_loss, (losses / self.timeperiod)[None, :], self.decay)
+        return smoothed_gain[0], smoothed_loss[0], carry_gain, carry_loss
+
+    def push(self, real):
+        """
+        Add closes and return the RSI of every bar that is now final.
+        """
+        values = _as_array(real)
+        parts = []
+        if not self.started:
+            begin = _first_valid(values)
+            parts.append(np.full(begin, np.nan))
+            values = values[begin:]
+            self.started = len(values) > 0
+        if self.timeperiod < 2:
+            parts.append(np.full(len(values), np.nan))
+            return np.concatenate(parts)
+
+        if self.avg_gain is None:
+            # Seed on the first timeperiod changes, like the whole-array version
+            take = min(len(values), self.timeperiod + 1 - len(self.seed))
+            self.seed.extend(values[:take])
+            values = values[take:]
+            if len(self.seed) <= self.timeperiod:
+                parts.append(np.full(take, np.nan))
+                return np.concatenate(parts)
+            change = np.diff(np.asarray(self.seed))
+            gain = np.where(change > 0, change, 0.0)
+            loss = np.where(change < 0, -change, 0.0)
+            self.avg_gain = gain[:self.timeperiod].sum() / self.timeperiod
+            self.avg_loss = loss[:self.timeperiod].sum() / self.timeperiod
+            self.last = self.seed[-1]
+            parts.append(np.full(take - 1, np.nan))
+            parts.append(self._value(np.array([self.avg_gain]), np.array([self.avg_loss])))
+
+        if len(values):
+            change = np.diff(np.concatenate(([self.last], values)))
+            self.last = values[-1]
+            self.gains = np.concatenate((self.gains, np.where(change > 0, change, 0.0)))
+            self.losses = np.concatenate((self.losses, np.where(change < 0, -change, 0.0)))
+
+        while len(self.gains) >= self.block:
+            gain, loss, self.avg_gain, self.avg_loss = self._smooth(self.gains[:self.block], self.losses[:self.block])
+            parts.append(self._value(gain, loss))
+            self.gains = self.gains[self.block:]
+            self.losses = self.losses[self.block:]
+            self.full_blocks += 1
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def finish(self):
+        """
+        Return the RSI of the bars still held back.
+        """
+        count = len(self.gains)
+        if count == 0:
+            # Also the case with too few bars for a single RSI value; their NaNs are out already
+            return np.empty(0)
+        # A history shorter than one block is smoothed as a single block of its own length
+        block = self.block if self.full_blocks else count
+        gains = np.zeros(block)
+        losses = np.zeros(block)
+        gains[:count] = self.gains
+        losses[:count] = self.losses
+        gain, loss, _, _ = self._smooth(gains, losses)
+        self.gains = self.gains[count:]
+        self.losses = self.losses[count:]
+        return self._value(gain[:count], loss[:count])
@@ -0,0 +1,328 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from web3.exceptions import TransactionNotFound
+
+from logger import get_logger
+
+log = get_logger("tx_pipeline")
+
+# Replacements must raise fees by at least 10% to be accepted by the node
+MIN_FEE_BUMP = 1.1
+
+
+class TransactionFailed(Exception):
+    """
+    Raised through a transaction's future when it was mined but reverted.
+    """
+
+    def __init__(self, nonce, tx_hash, receipt):
+        super().__init__(f"Transaction {tx_hash.hex()} with nonce {nonce} reverted.")
+        self.nonce = nonce
+        self.tx_hash = tx_hash
+        self.receipt = receipt
+
+
+class TransactionDropped(Exception):
+    """
+    Raised through a transaction's future when its nonce was used by a transaction the pipeline did not send.
+    """
+
+
+class PendingTransaction:
+    """
+    One nonce in flight: the latest signed transaction and every hash sent for it.
+    """
+
+    def __init__(self, nonce, transaction, label, on_confirmed=None, on_failed=None):
+        self.nonce = nonce
+        self.transaction = transaction
+        self.label = label
+        self.tx_hashes = []
+        self.submitted_at = time.monotonic()
+        self.sent_at = self.submitted_at
+        self.replacements = 0
+        self.future = Future()
+        if on_confirmed is not None or on_failed is not None:
+            self.future.add_done_callback(self._dispatch(on_confirmed, on_failed))
+
+    @staticmethod
+    def _dispatch(on_confirmed, on_failed):
+        def callback(future):
+            error = future.exception()
+            if error is None:
+                if on_confirmed is not None:
+                    on_confirmed(future.result())
+            elif on_failed is not None:
+                on_failed(error)
+        return callback
+
+
+class TransactionPipeline:
+    """
+    Sends transactions with locally assigned nonces and tracks their receipts.
+
+    Nonces are handed out from a local counter, so several transactions can
+    be in flight at once without waiting for each other's receipts. A
+    background worker polls receipts and resolves one future per transaction
+    with its receipt, or with TransactionFailed / TransactionDropped. Stuck
+    transactions can be replaced or sped up with higher fees.
+
+    Works with any Web3 instance, including `Web3(EthereumTesterProvider())`
+    for local testing.
+
+    Parameters
+    ----------
+    w3 : Web3
+        Connection used to sign, send and poll transactions.
+    address : str
+        Sender address.
+    private_key : str
+        Private key of `address`.
+    chain_id : int
+        Chain id set on transactions that do not carry one.
+    max_in_flight : int
+        Maximum number of unconfirmed transactions; `submit` blocks beyond it.
+    poll_interval : float
+        Seconds between receipt polls.
+    stuck_after : float, optional
+        Seconds after which an unconfirmed transaction is sped up automatically.
+    max_replacements : int
+        Maximum number of automatic speed-ups per nonce.
+    fee_bump : float
+        Fee multiplier used for replacements and speed-ups.
+    """
+
+    def __init__(self, w3, address, private_key, chain_id, max_in_flight=8, poll_interval=1.0,
+                 stuck_after=None, max_replacements=3, fee_bump=1.125):
+        self.w3 = w3
+        self.address = address
+        self.private_key = private_key
+        self.chain_id = chain_id
+        self.poll_interval = poll_interval
+        self.stuck_after = stuck_after
+        self.max_replacements = max_replacements
+        self.fee_bump = max(fee_bump, MIN_FEE_BUMP)
+
+        self.pending = {}  # nonce -> PendingTransaction
+        self._next_nonce = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._stop_worker = threading.Event()
+        self._wake_worker = threading.Event()
+        self._worker = None
+
+    def sync_nonce(self):
+        """
+        Reset the local nonce counter from the node's pending transaction count.
+        """
+        with self._lock:
+            chain_nonce = self.w3.eth.get_transaction_count(self.address, "pending")
+            in_flight = max(self.pending) + 1 if self.pending else 0
+            self._next_nonce = max(chain_nonce, in_flight)
+            return self._next_nonce
+
+    def _sign_and_send(self, transaction):
+        signed = self.w3.eth.account.sign_transaction(transaction, self.private_key)
+        raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction  # web3 7 / web3 6
+        return self.w3.eth.send_raw_transaction(raw)
+
+    def submit(self, transaction, label="transaction", on_confirmed=None, on_failed=None):
+        """
+        Assign the next nonce to `transaction`, sign and send it.
+
+        Parameters
+        ----------
+        transaction : dict
+            Unsigned transaction; 'nonce' is overwritten.
+        label : str
+            Name used in log lines.
+        on_confirmed : callable, optional
+            Called with the receipt once the transaction is mined successfully.
+        on_failed : callable, optional
+            Called with the exception if it reverts, is dropped or cannot be sent.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Resolves to the transaction receipt.
+        """
+        self._slots.acquire()
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = self.w3.eth.get_transaction_count(self.address, "pending")
+            nonce = self._next_nonce
+            transaction = dict(transaction, nonce=nonce)
+            transaction.setdefault("chainId", self.chain_id)
+            entry = PendingTransaction(nonce, transaction, label, on_confirmed, on_failed)
+            try:
+                tx_hash = self._sign_and_send(transaction)
+            except Exception as e:
+                # The nonce was not consumed; re-read it before the next submit
+                self._next_nonce = None
+                self._slots.release()
+                log.error("Sending %s with nonce %d failed: %s", label, nonce, e)
+                entry.future.set_exception(e)
+                return entry.future
+            self._next_nonce = nonce + 1
+            entry.tx_hashes.append(tx_hash)
+            self.pending[nonce] = entry
+        log.info("Sent transaction", extra={"fields": {"label": label, "nonce": nonce, "tx_hash": tx_hash.hex()}})
+        self._wake_worker.set()
+        return entry.future
+
+    def _bumped_fees(self, previous, transaction):
+        # Every fee field must rise by the bump, whatever the caller asked for
+        fees = {}
+        for field in ("gasPrice", "maxFeePerGas", "maxPriorityFeePerGas"):
+            if field in previous:
+                minimum = max(int(previous[field] * self.fee_bump), previous[field] + 1)
+                fees[field] = max(transaction.get(field, 0), minimum)
+        return fees
+
+    def replace(self, nonce, transaction=None, label=None):
+        """
+        Send a new transaction with the nonce of a pending one.
+
+        Parameters
+        ----------
+        nonce : int
+            Nonce of the pending transaction to replace.
+        transaction : dict, optional
+            Replacement transaction. Defaults to the pending transaction
+            itself, which makes this a speed-up. Fees are raised to at least
+            `fee_bump` times the previous fees.
+        label : str, optional
+            New label for log lines.
+
+        Returns
+        -------
+        bytes
+            Hash of the replacement transaction.
+        """
+        with self._lock:
+            entry = self.pending[nonce]
+            previous = entry.transaction
+            transaction = dict(previous if transaction is None else transaction, nonce=nonce)
+            transaction.setdefault("chainId", self.chain_id)
+            transaction.update(self._bumped_fees(previous, transaction))
+            tx_hash = self._sign_and_send(transaction)
+            entry.transaction = transaction
+            entry.tx_hashes.append(tx_hash)
+            entry.sent_at = time.monotonic()
+            entry.replacements += 1
+            if label is not None:
+                entry.label = label
+        log.info("Replaced transaction", extra={"fields": {"label": entry.label, "nonce": nonce, "replacement": entry.replacements, "tx_hash": tx_hash.hex()}})
+        self._wake_worker.set()
+        return tx_hash
+
+    def speed_up(self, nonce):
+        """
+        Resend the pending transaction with `nonce` with bumped fees.
+        """
+        return self.replace(nonce)
+
+    def _receipt(self, entry):
+        for tx_hash in reversed(entry.tx_hashes):
+            try:
+                return tx_hash, self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+        return None, None
+
+    def _resolve(self, entry, result=None, error=None):
+        with self._lock:
+            self.pending.pop(entry.nonce, None)
+        self._slots.release()
+        if error is None:
+            log.info("Transaction confirmed", extra={"fields": {"label": entry.label, "nonce": entry.nonce, "seconds": round(time.monotonic() - entry.submitted_at, 3)}})
+            entry.future.set_result(result)
+        else:
+            log.error("%s with nonce %d failed: %s", entry.label, entry.nonce, error)
+            entry.future.set_exception(error)
+
+    def poll(self):
+        """
+        Check every pending transaction once and resolve the finished ones.
+        """
+        with self._lock:
+            entries = sorted(self.pending.values(), key=lambda entry: entry.nonce)
+        if not entries:
+            return
+        # Read the mined nonce before receipts, so a nonce below it without a receipt was really taken by another transaction
+        mined_nonce = self.w3.eth.get_transaction_count(self.address, "latest")
+
+        for entry in entries:
+            tx_hash, receipt = self._receipt(entry)
+            if receipt is not None:
+                if receipt["status"] == 1:
+                    self._resolve(entry, result=receipt)
+                else:
+                    self._resolve(entry, error=TransactionFailed(entry.nonce, tx_hash, receipt))
+            elif entry.nonce < mined_nonce:
+                self._resolve(entry, error=TransactionDropped(f"Nonce {entry.nonce} was used by another transaction."))
+            elif (
+                self.stuck_after is not None
+                and time.monotonic() - entry.sent_at > self.stuck_after
+                and entry.replacements < self.max_replacements
+            ):
+                try:
+                    self.speed_up(entry.nonce)
+                except Exception as e:
+                    log.error("Speeding up %s with nonce %d failed: %s", entry.label, entry.nonce, e)
+
+    def start(self):
+        """
+        Start the background receipt worker.
+        """
+        if self._worker is not None:
+            return
+
+        def receipt_loop():
+            while not self._stop_worker.is_set():
+                try:
+                    self.poll()
+                except Exception as e:
+                    log.error("Receipt polling failed: %s", e)
+                self._wake_worker.wait(self.poll_interval)
+                self._wake_worker.clear()
+
+        self._stop_worker.clear()
+        self._worker = threading.Thread(target=receipt_loop, name="tx-receipt-worker", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """
+        Stop the background receipt worker; pending futures stay unresolved.
+        """
+        self._stop_worker.set()
+        self._wake_worker.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def wait_all(self, timeout=None):
+        """
+        Block until every transaction submitted so far is resolved.
+
+        Returns
+        -------
+        bool
+            True if nothing is pending anymore, False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                futures = [entry.future for entry in self.pending.values()]
+            if not futures:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            for future in futures:
+                try:
+                    future.exception(timeout=remaining)
+                except Exception:
+                    return False
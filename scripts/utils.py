@@ -1,5 +1,8 @@
 import sys
 import os
+import subprocess
+
+import yaml
 
 
 def _set_paths():
@@ -23,6 +26,8 @@ def load_yaml(filepath):
 
 # Initialize configuration
 def setup_config(config_path):
+    from gmx_python_sdk.scripts.v2.gmx_utils import ConfigManager
+
     print(f"Setting up configuration from: {config_path}")
     config = ConfigManager("arbitrum")
     config.set_config(filepath=config_path)